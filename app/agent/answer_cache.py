@@ -0,0 +1,153 @@
+"""Кэш готовых ответов на запросы о цене и новостях.
+
+Ответ на «сколько стоит BTC» в пределах минуты одинаков для всех пользователей,
+поэтому после `classify_intent` граф сначала ищет готовый ответ по ключу
+(intent, CoinGecko ID монеты, временной бакет, язык запроса) и при попадании сразу
+завершает прогон. Бакет — номер интервала длиной в TTL intent'а, так что записи
+перестают находиться на границе интервала. Записи о цене дополнительно
+сбрасываются, если цена монеты, увиденная другими запросами (промахи кэша,
+аналитика), ушла от закэшированной больше чем на `ANSWER_CACHE_PRICE_MOVE_PCT`.
+
+Текст вопроса в ключ не входит, поэтому вопросы, требующие рассуждений
+(`templates.is_open_ended`: «почему BTC упал?»), не кэшируются и не читают кэш:
+ответ на них не подходит к простому «цена BTC», и наоборот.
+"""
+
+import logging
+import re
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from numbers import Real
+
+from app.agent.templates import is_open_ended
+from app.config import get_settings
+from app.metrics import CACHE_REQUESTS
+from app.tools.coingecko import resolve_coin_id
+
+LOGGER = logging.getLogger(__name__)
+
+_CYRILLIC_RE = re.compile(r"[а-яё]", re.IGNORECASE)
+
+CacheKey = tuple[str, str, int, str]
+
+
+@dataclass(frozen=True)
+class CachedAnswer:
+    response: str
+    price_usd: float | None = None
+
+
+def detect_language(query: str) -> str:
+    """Язык запроса для ключа кэша: ru, если есть кириллица, иначе en."""
+
+    return "ru" if _CYRILLIC_RE.search(query) else "en"
+
+
+class AnswerCache:
+    """LRU-кэш ответов с TTL по intent и сбросом при движении цены."""
+
+    def __init__(
+        self,
+        ttl_seconds: dict[str, float],
+        max_entries: int,
+        price_move_pct: float,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ttl_seconds = {intent: ttl for intent, ttl in ttl_seconds.items() if ttl > 0}
+        self.max_entries = max(1, max_entries)
+        self.price_move_pct = price_move_pct
+        self._clock = clock
+        self._entries: OrderedDict[CacheKey, CachedAnswer] = OrderedDict()
+        self._last_price: dict[str, float] = {}
+
+    def key(self, intent: str, coin: str | None, query: str) -> CacheKey | None:
+        """Ключ записи или None, если ответ на такой вопрос не кэшируется."""
+
+        ttl = self.ttl_seconds.get(intent)
+        if ttl is None or is_open_ended(query):
+            return None
+        coin_id = resolve_coin_id(coin or "")
+        return (intent, coin_id, int(self._clock() // ttl), detect_language(query))
+
+    def get(self, intent: str, coin: str | None, query: str) -> str | None:
+        key = self.key(intent, coin, query)
+        if key is None:
+            return None
+        entry = self._entries.get(key)
+        if entry is not None and self._price_moved(key[1], entry):
+            LOGGER.info("[answer_cache] price moved, dropping %s", key)
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            CACHE_REQUESTS.inc("answer", "miss")
+            return None
+        self._entries.move_to_end(key)
+        CACHE_REQUESTS.inc("answer", "hit")
+        return entry.response
+
+    def put(
+        self,
+        intent: str,
+        coin: str | None,
+        query: str,
+        response: str,
+        price_usd: float | None = None,
+    ) -> None:
+        key = self.key(intent, coin, query)
+        if key is None:
+            return
+        self._entries[key] = CachedAnswer(response, price_usd)
+        self._entries.move_to_end(key)
+        if price_usd is not None:
+            self._last_price[key[1]] = price_usd
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def observe_price(self, coin: str | None, price_usd: object) -> None:
+        """Запоминает свежую цену монеты; записи проверяются по ней при чтении."""
+
+        if isinstance(price_usd, Real) and not isinstance(price_usd, bool):
+            self._last_price[resolve_coin_id(coin or "")] = float(price_usd)
+
+    def _price_moved(self, coin_id: str, entry: CachedAnswer) -> bool:
+        latest = self._last_price.get(coin_id)
+        if entry.price_usd is None or latest is None or not entry.price_usd:
+            return False
+        return abs(latest - entry.price_usd) / abs(entry.price_usd) * 100 > self.price_move_pct
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def is_cacheable(intent: str, api_data: dict) -> bool:
+    """Ответ построен на данных без ошибок и его можно отдавать другим запросам."""
+
+    if intent == "price":
+        return "error" not in api_data and api_data.get("price_usd") is not None
+    if intent == "news":
+        return not any("error" in article for article in api_data.get("articles") or [])
+    return False
+
+
+_cache: AnswerCache | None = None
+
+
+def get_answer_cache() -> AnswerCache:
+    """Возвращает singleton-кэш ответов, настроенный из Settings."""
+    global _cache
+    if _cache is None:
+        settings = get_settings()
+        _cache = AnswerCache(
+            settings.answer_cache_ttl_seconds,
+            settings.answer_cache_max_entries,
+            settings.answer_cache_price_move_pct,
+        )
+    return _cache
+
+
+def reset_answer_cache() -> None:
+    """Сбрасывает singleton-кэш (для тестов и перезагрузки настроек)."""
+    global _cache
+    _cache = None
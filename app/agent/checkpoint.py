@@ -0,0 +1,680 @@
+"""Checkpointer графа: выбор реализации по настройкам, SQLite и ограниченная память."""
+
+import asyncio
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable, Iterator, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, TypeVar
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+from app.config import Settings, get_settings
+
+LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Значения крупнее порога дополнительно сжимаются zlib поверх msgpack.
+COMPRESS_MIN_BYTES = 1024
+COMPRESSED_SUFFIX = "+zlib"
+# Как часто (не чаще) удалять простаивающие диалоги и сколько за один проход.
+SWEEP_INTERVAL_SECONDS = 60.0
+SWEEP_BATCH = 1000
+# Оценка накладных расходов Python на одну запись хранилища (ключ, кортеж, dict).
+ENTRY_OVERHEAD_BYTES = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_updated_at ON threads (updated_at);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+) WITHOUT ROWID;
+"""
+
+
+class SQLiteConnectionPool:
+    """Пул соединений SQLite с асинхронным доступом через пул потоков.
+
+    sqlite3 блокирует поток на время запроса, поэтому асинхронные вызовы
+    выполняются в `asyncio.to_thread`. WAL позволяет читателям работать
+    параллельно с единственным писателем.
+    """
+
+    def __init__(self, path: str, size: int = 4, busy_timeout_ms: int = 5000):
+        if size < 1:
+            raise ValueError("SQLiteConnectionPool size must be >= 1")
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._idle: queue.Queue[sqlite3.Connection] = queue.Queue()
+        self._connections: list[sqlite3.Connection] = []
+        for _ in range(size):
+            conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            self._connections.append(conn)
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def call(self, fn: Callable[..., T], *args: Any) -> T:
+        with self.connection() as conn:
+            return fn(conn, *args)
+
+    async def acall(self, fn: Callable[..., T], *args: Any) -> T:
+        return await asyncio.to_thread(self.call, fn, *args)
+
+    def close(self) -> None:
+        for conn in self._connections:
+            conn.close()
+        self._connections.clear()
+
+
+@contextmanager
+def _write_transaction(conn: sqlite3.Connection) -> Iterator[None]:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[int]):
+    """Checkpointer LangGraph поверх SQLite в режиме WAL.
+
+    Чекпоинты сериализуются в msgpack (serde LangGraph) и сжимаются zlib, если
+    крупнее `COMPRESS_MIN_BYTES`. Для каждого диалога хранятся только
+    `keep_last` последних чекпоинтов, а диалоги без новых чекпоинтов дольше
+    `ttl_seconds` удаляются целиком.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        pool_size: int = 4,
+        ttl_seconds: float = 0.0,
+        keep_last: int = 3,
+    ):
+        super().__init__()
+        self.pool = SQLiteConnectionPool(path, pool_size)
+        self.ttl_seconds = ttl_seconds
+        self.keep_last = max(1, keep_last)
+        self._sweep_lock = threading.Lock()
+        self._next_sweep_at = 0.0
+        self.pool.call(lambda conn: conn.executescript(SCHEMA))
+
+    # --- сериализация ---
+
+    def _dump(self, value: Any) -> tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(value)
+        if len(data) >= COMPRESS_MIN_BYTES:
+            return type_ + COMPRESSED_SUFFIX, zlib.compress(data, 1)
+        return type_, data
+
+    def _load(self, type_: str, data: bytes) -> Any:
+        if type_.endswith(COMPRESSED_SUFFIX):
+            type_ = type_[: -len(COMPRESSED_SUFFIX)]
+            data = zlib.decompress(data)
+        return self.serde.loads_typed((type_, data))
+
+    # --- операции над соединением (выполняются в потоке пула) ---
+
+    def _row_to_tuple(self, conn: sqlite3.Connection, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, data, meta_type, meta = row
+        writes = conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self._load(type_, data),
+            metadata=self._load(meta_type, meta),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self._load(w_type, value))
+                for task_id, channel, w_type, value in writes
+            ],
+        )
+
+    def _get_tuple(
+        self, conn: sqlite3.Connection, config: RunnableConfig
+    ) -> CheckpointTuple | None:
+        configurable = config["configurable"]
+        params: tuple = (configurable["thread_id"], configurable.get("checkpoint_ns", ""))
+        query = "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params += (checkpoint_id,)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        row = conn.execute(query, params).fetchone()
+        return self._row_to_tuple(conn, row) if row else None
+
+    def _list(
+        self,
+        conn: sqlite3.Connection,
+        config: RunnableConfig | None,
+        filter: dict[str, Any] | None,
+        before: RunnableConfig | None,
+        limit: int | None,
+    ) -> list[CheckpointTuple]:
+        clauses: list[str] = []
+        params: list[Any] = []
+        if config:
+            configurable = config["configurable"]
+            clauses.append("thread_id = ?")
+            params.append(configurable["thread_id"])
+            if configurable.get("checkpoint_ns") is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(configurable["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        query = "SELECT * FROM checkpoints"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        result: list[CheckpointTuple] = []
+        for row in conn.execute(query, params).fetchall():
+            if limit is not None and len(result) >= limit:
+                break
+            if filter:
+                metadata = self._load(row[6], row[7])
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            result.append(self._row_to_tuple(conn, row))
+        return result
+
+    def _put(
+        self,
+        conn: sqlite3.Connection,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+    ) -> RunnableConfig:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        type_, data = self._dump(checkpoint)
+        meta_type, meta = self._dump(get_checkpoint_metadata(config, metadata))
+        now = time.time()
+        with _write_transaction(conn):
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    configurable.get("checkpoint_id"),
+                    type_,
+                    data,
+                    meta_type,
+                    meta,
+                ),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO threads (thread_id, updated_at) VALUES (?, ?)",
+                (thread_id, now),
+            )
+            self._prune_thread(conn, thread_id, checkpoint_ns)
+        self._maybe_sweep(conn, now)
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def _prune_thread(self, conn: sqlite3.Connection, thread_id: str, checkpoint_ns: str) -> None:
+        """Оставляет только `keep_last` последних чекпоинтов диалога и их записи."""
+        row = conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep_last - 1),
+        ).fetchone()
+        if row is None:
+            return
+        for table in ("checkpoints", "writes"):
+            conn.execute(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? "
+                "AND checkpoint_id < ?",
+                (thread_id, checkpoint_ns, row[0]),
+            )
+
+    def _put_writes(
+        self,
+        conn: sqlite3.Connection,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str,
+    ) -> None:
+        configurable = config["configurable"]
+        # Служебные каналы (ошибки, прерывания) перезаписываются, обычные — нет.
+        verb = "REPLACE" if all(w[0] in WRITES_IDX_MAP for w in writes) else "IGNORE"
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, data = self._dump(value)
+            rows.append(
+                (
+                    configurable["thread_id"],
+                    configurable.get("checkpoint_ns", ""),
+                    configurable["checkpoint_id"],
+                    task_id,
+                    WRITES_IDX_MAP.get(channel, idx),
+                    channel,
+                    type_,
+                    data,
+                    task_path,
+                )
+            )
+        with _write_transaction(conn):
+            conn.executemany(
+                f"INSERT OR {verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def _delete_threads(self, conn: sqlite3.Connection, thread_ids: Sequence[str]) -> None:
+        params = [(thread_id,) for thread_id in thread_ids]
+        with _write_transaction(conn):
+            for table in ("checkpoints", "writes", "threads"):
+                conn.executemany(f"DELETE FROM {table} WHERE thread_id = ?", params)
+
+    def _expire(self, conn: sqlite3.Connection, now: float) -> int:
+        """Удаляет диалоги, не обновлявшиеся дольше `ttl_seconds`."""
+        if self.ttl_seconds <= 0:
+            return 0
+        removed = 0
+        while True:
+            expired = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT thread_id FROM threads WHERE updated_at < ? LIMIT ?",
+                    (now - self.ttl_seconds, SWEEP_BATCH),
+                )
+            ]
+            if not expired:
+                break
+            self._delete_threads(conn, expired)
+            removed += len(expired)
+        if removed:
+            LOGGER.info("[checkpoint] expired %d idle threads", removed)
+        return removed
+
+    def _maybe_sweep(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl_seconds <= 0 or now < self._next_sweep_at:
+            return
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sweep_at = now + SWEEP_INTERVAL_SECONDS
+            self._expire(conn, now)
+        finally:
+            self._sweep_lock.release()
+
+    # --- синхронный API BaseCheckpointSaver ---
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return self.pool.call(self._get_tuple, config)
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        yield from self.pool.call(self._list, config, filter, before, limit)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.pool.call(self._put, config, checkpoint, metadata)
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self.pool.call(self._put_writes, config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.pool.call(self._delete_threads, [thread_id])
+
+    def expire(self) -> int:
+        """Немедленно удаляет простаивающие диалоги; возвращает их число."""
+        return self.pool.call(self._expire, time.time())
+
+    # --- асинхронный API ---
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await self.pool.acall(self._get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for item in await self.pool.acall(self._list, config, filter, before, limit):
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await self.pool.acall(self._put, config, checkpoint, metadata)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await self.pool.acall(self._put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.pool.acall(self._delete_threads, [thread_id])
+
+    async def aexpire(self) -> int:
+        return await self.pool.acall(self._expire, time.time())
+
+    def stats(self) -> dict:
+        """Число диалогов и размер файлов БД для мониторинга."""
+        threads = self.pool.call(
+            lambda conn: conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0]
+        )
+        path = Path(self.pool.path)
+        files = (path, path.with_name(path.name + "-wal"))
+        return {
+            "type": "sqlite",
+            "threads": threads,
+            "estimated_bytes": sum(f.stat().st_size for f in files if f.exists()),
+        }
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """MemorySaver с ограничениями для долгоживущего процесса.
+
+    На каждый диалог хранится `keep_last` последних чекпоинтов. Диалоги
+    упорядочены по последнему обращению (LRU): простаивающие дольше
+    `ttl_seconds` удаляются, а при превышении `max_threads` или `max_bytes`
+    вытесняются самые давние. Размер оценивается по длине сериализованных
+    значений плюс фиксированные накладные расходы на запись.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 0.0,
+        keep_last: int = 3,
+        max_threads: int = 0,
+        max_bytes: int = 0,
+    ):
+        super().__init__()
+        self.ttl_seconds = ttl_seconds
+        self.keep_last = max(1, keep_last)
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.evicted_total = 0
+        self.expired_total = 0
+        # thread_id -> (время последнего обращения, оценка размера в байтах)
+        self._threads: OrderedDict[str, tuple[float, int]] = OrderedDict()
+        self._blob_keys: dict[str, set[tuple]] = {}
+        # thread_id -> (checkpoint_ns, checkpoint_id) -> channel_versions чекпоинта:
+        # по ним _prune находит живые blobs, не десериализуя сохранённые чекпоинты.
+        self._versions: dict[str, dict[tuple[str, str], dict]] = {}
+        self._lock = threading.RLock()
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            result = super().get_tuple(config)
+            if thread_id in self._threads:
+                self._touch(thread_id, time.monotonic())
+            else:
+                # InMemorySaver создаёт пустые записи при чтении неизвестного диалога.
+                self.storage.pop(thread_id, None)
+            return result
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            result = super().put(config, checkpoint, metadata, new_versions)
+            self._blob_keys.setdefault(thread_id, set()).update(
+                (thread_id, checkpoint_ns, channel, version)
+                for channel, version in new_versions.items()
+            )
+            self._versions.setdefault(thread_id, {})[(checkpoint_ns, checkpoint["id"])] = dict(
+                checkpoint["channel_versions"]
+            )
+            self._prune(thread_id, checkpoint_ns)
+            self._account(thread_id)
+            self._enforce_limits(protect=thread_id)
+            return result
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+            self._account(thread_id)
+            self._enforce_limits(protect=thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._drop(thread_id)
+
+    def stats(self) -> dict:
+        """Число диалогов и оценка занятой памяти для мониторинга."""
+        with self._lock:
+            return {
+                "type": "memory",
+                "threads": len(self._threads),
+                "estimated_bytes": self.total_bytes,
+                "max_threads": self.max_threads,
+                "max_bytes": self.max_bytes,
+                "evicted_total": self.evicted_total,
+                "expired_total": self.expired_total,
+            }
+
+    def _touch(self, thread_id: str, now: float) -> None:
+        _, size = self._threads[thread_id]
+        self._threads[thread_id] = (now, size)
+        self._threads.move_to_end(thread_id)
+
+    def _prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        """Удаляет старые чекпоинты пространства имён и неиспользуемые ими blobs."""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self.keep_last:
+            return
+        versions = self._versions.get(thread_id, {})
+        for checkpoint_id in sorted(checkpoints)[: -self.keep_last]:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            versions.pop((checkpoint_ns, checkpoint_id), None)
+        referenced = {
+            (thread_id, checkpoint_ns, channel, version)
+            for checkpoint_id in checkpoints
+            for channel, version in versions.get((checkpoint_ns, checkpoint_id), {}).items()
+        }
+        keys = self._blob_keys.get(thread_id, set())
+        for key in [k for k in keys if k[1] == checkpoint_ns and k not in referenced]:
+            self.blobs.pop(key, None)
+            keys.discard(key)
+
+    def _thread_bytes(self, thread_id: str) -> int:
+        size = 0
+        for checkpoint_ns, checkpoints in self.storage.get(thread_id, {}).items():
+            for checkpoint_id, (saved, metadata, _) in checkpoints.items():
+                size += len(saved[1]) + len(metadata[1]) + ENTRY_OVERHEAD_BYTES
+                for write in self.writes.get((thread_id, checkpoint_ns, checkpoint_id), {}).values():
+                    size += len(write[2][1]) + ENTRY_OVERHEAD_BYTES
+        for key in self._blob_keys.get(thread_id, ()):
+            if (blob := self.blobs.get(key)) is not None:
+                size += len(blob[1]) + ENTRY_OVERHEAD_BYTES
+        return size
+
+    def _account(self, thread_id: str) -> None:
+        _, previous = self._threads.get(thread_id, (0.0, 0))
+        size = self._thread_bytes(thread_id)
+        self.total_bytes += size - previous
+        self._threads[thread_id] = (time.monotonic(), size)
+        self._threads.move_to_end(thread_id)
+
+    def _drop(self, thread_id: str) -> None:
+        for checkpoint_ns, checkpoints in self.storage.pop(thread_id, {}).items():
+            for checkpoint_id in checkpoints:
+                self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        for key in self._blob_keys.pop(thread_id, ()):
+            self.blobs.pop(key, None)
+        self._versions.pop(thread_id, None)
+        _, size = self._threads.pop(thread_id, (0.0, 0))
+        self.total_bytes -= size
+
+    def _enforce_limits(self, protect: str) -> None:
+        """Удаляет простаивающие диалоги и вытесняет давние сверх лимитов."""
+        if self.ttl_seconds > 0:
+            deadline = time.monotonic() - self.ttl_seconds
+            while self._threads:
+                thread_id, (last_access, _) = next(iter(self._threads.items()))
+                if last_access >= deadline:
+                    break
+                self._drop(thread_id)
+                self.expired_total += 1
+        while len(self._threads) > 1 and (
+            (self.max_threads and len(self._threads) > self.max_threads)
+            or (self.max_bytes and self.total_bytes > self.max_bytes)
+        ):
+            thread_id = next(iter(self._threads))
+            if thread_id == protect:
+                break
+            self._drop(thread_id)
+            self.evicted_total += 1
+            LOGGER.debug("[checkpoint] evicted thread %s", thread_id)
+
+
+def build_checkpointer(settings: Settings | None = None) -> BaseCheckpointSaver:
+    """Создаёт checkpointer графа согласно `CHECKPOINTER`."""
+    cfg = settings or get_settings()
+    if cfg.checkpointer == "sqlite":
+        LOGGER.info("[checkpoint] using SQLite at %s", cfg.checkpoint_sqlite_path)
+        return SQLiteCheckpointSaver(
+            cfg.checkpoint_sqlite_path,
+            pool_size=cfg.checkpoint_pool_size,
+            ttl_seconds=cfg.checkpoint_ttl_seconds,
+            keep_last=cfg.checkpoint_keep_last,
+        )
+    return BoundedMemorySaver(
+        ttl_seconds=cfg.checkpoint_ttl_seconds,
+        keep_last=cfg.checkpoint_keep_last,
+        max_threads=cfg.checkpoint_memory_max_threads,
+        max_bytes=cfg.checkpoint_memory_max_bytes,
+    )
+
+
+def close_checkpointer(checkpointer: object) -> None:
+    """Закрывает соединения checkpointer, если они у него есть."""
+    if isinstance(checkpointer, SQLiteCheckpointSaver):
+        checkpointer.close()
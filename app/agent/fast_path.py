@@ -0,0 +1,110 @@
+"""Быстрый исполнитель линейных ходов диалога в обход LangGraph.
+
+Для `price`, `news` и `chat` граф — фиксированная цепочка: классификация,
+инструмент, генерация ответа. Каждый шаг графа платит за обновление каналов,
+запись чекпоинта и прокидывание config. Исполнитель вызывает те же функции
+узлов напрямую (с теми же метриками, спанами и debug-логами шагов) и пишет
+один чекпоинт на ход через `aupdate_state`. Состояние в чекпоинте такое же,
+какое оставил бы граф, поэтому ходы одного диалога могут чередоваться между
+исполнителем и графом.
+
+Ход с intent вне `FAST_PATH_INTENTS` (в том числе аналитика) передаётся графу
+вместе с готовой классификацией: повторного вызова LLM нет.
+"""
+
+from collections.abc import Callable
+from functools import lru_cache
+from typing import Any
+
+from langgraph.graph.message import add_messages
+
+from app.agent.graph import _route_after_cache, _route_after_classify, _wrap_step
+from app.agent.nodes import (
+    cached_answer_node,
+    clarify_coin_node,
+    generate_response_node,
+    get_news_node,
+    get_price_node,
+    web_search_node,
+)
+from app.agent.router import PRECLASSIFIED, classify_intent
+from app.agent.state import ConversationState, merge_api_data
+from app.config import get_settings
+
+# Маршрут после классификации -> узел-инструмент перед generate_response (как в графе).
+TOOL_STEPS = {"price": "get_price", "news": "get_news", "chat": "web_search"}
+PERSISTED_KEYS = frozenset(ConversationState.__annotations__)
+
+
+@lru_cache
+def _steps(debug: bool, answer_cache: bool) -> dict[str, Callable[[dict], Any]]:
+    """Шаги с обёрткой графа: метрика NODE_SECONDS, спан трейса, debug-лог."""
+    plain = {
+        "classify_intent": classify_intent,
+        "cached_answer": cached_answer_node,
+        "route_by_intent": _route_after_cache if answer_cache else _route_after_classify,
+        "get_price": get_price_node,
+        "get_news": get_news_node,
+        "web_search": web_search_node,
+        "clarify_coin": clarify_coin_node,
+        "generate_response": generate_response_node,
+    }
+    return {name: _wrap_step(name, step, debug) for name, step in plain.items()}
+
+
+def _apply(state: dict, update: dict, written: dict) -> None:
+    """Применяет обновление шага редьюсерами графа и копит то, что уйдёт в чекпоинт."""
+    for key, value in update.items():
+        if key == "messages":
+            state[key] = add_messages(state.get(key, []), value)
+            written[key] = [*written.get(key, []), *value]
+            continue
+        state[key] = merge_api_data(state.get(key), value) if key == "api_data" else value
+        if key in PERSISTED_KEYS:
+            written[key] = value
+
+
+async def run_turn(graph: Any, input_state: dict, config: dict) -> dict:
+    """Один ход диалога: линейный маршрут — напрямую, остальные — графом.
+
+    Возвращает состояние после хода, как `graph.ainvoke`. С пустым
+    `FAST_PATH_INTENTS` — просто `graph.ainvoke`.
+    """
+    settings = get_settings()
+    if not settings.fast_path_intents:
+        return await graph.ainvoke(input_state, config=config)
+    steps = _steps(settings.graph_debug_nodes, settings.answer_cache_enabled)
+    snapshot = await graph.aget_state(config)
+    state = {k: v for k, v in (snapshot.values or {}).items() if k in PERSISTED_KEYS}
+    written: dict = {}
+    _apply(state, input_state, written)
+
+    classified = await steps["classify_intent"](state)
+    if classified.get("intent") not in settings.fast_path_intents:
+        token = PRECLASSIFIED.set(classified)
+        try:
+            return await graph.ainvoke(input_state, config=config)
+        finally:
+            PRECLASSIFIED.reset(token)
+    _apply(state, classified, written)
+
+    last_step = "classify_intent"
+    if settings.answer_cache_enabled:
+        _apply(state, await steps["cached_answer"](state), written)
+        last_step = "cached_answer"
+    route = await steps["route_by_intent"](state)
+    if route == "cached":
+        # Ребро после cached_answer смотрит на `response`, которого нет в чекпоинте:
+        # запись от его имени оставила бы в очереди get_price. Ход закрывается
+        # от имени generate_response, чьё ребро ведёт в END.
+        last_step = "generate_response"
+    elif route == "clarify_coin":
+        _apply(state, await steps["clarify_coin"](state), written)
+        last_step = "clarify_coin"
+    else:
+        _apply(state, await steps[TOOL_STEPS[route]](state), written)
+        _apply(state, await steps["generate_response"](state), written)
+        last_step = "generate_response"
+
+    await graph.aupdate_state(config, written, as_node=last_step)
+    return state
@@ -1,27 +1,37 @@
-"""Сборка LangGraph графа с MemorySaver."""
+"""Сборка LangGraph графа с checkpointer из настроек."""
 
 import inspect
 import logging
-import time
 from collections.abc import Callable
+from time import perf_counter
 from typing import Any
 
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, StateGraph
 
+from app.agent.checkpoint import build_checkpointer
 from app.agent.nodes import (
-    analyze_node,
+    analytics_join_node,
+    analytics_market_node,
+    analytics_news_node,
     analytics_search_node,
+    analyze_node,
+    cached_answer_node,
     clarify_coin_node,
     generate_response_node,
-    get_analytics_data_node,
     get_news_node,
     get_price_node,
     web_search_node,
 )
-from app.agent.router import classify_intent, route_by_intent, route_needs_search
+from app.agent.router import (
+    analytics_branches,
+    classify_intent,
+    route_by_intent,
+    route_needs_search,
+)
 from app.agent.state import AgentState
 from app.config import get_settings
+from app.metrics import NODE_SECONDS
+from app.tracing import CURRENT_SPAN, span
 
 LOGGER = logging.getLogger(__name__)
 
@@ -73,33 +83,64 @@ def _format_result_preview(result: Any) -> str:
 
 
 def _wrap_step(name: str, step: Callable[..., Any], debug: bool) -> Callable[..., Any]:
-    """Оборачивает шаг графа логами при включённом debug-режиме."""
-    if not debug:
-        return step
-
-    async def wrapped(*args: Any, **kwargs: Any) -> Any:
-        state = args[0] if args else None
-        start = time.perf_counter()
-        LOGGER.info("[graph] -> %s | %s", name, _format_state_preview(state))
+    """Оборачивает шаг графа замером времени в метрики, спаном трейса и логами (debug)."""
+    if not debug and inspect.iscoroutinefunction(step):
+
+        async def timed(state: Any) -> Any:
+            start = perf_counter()
+            try:
+                if CURRENT_SPAN.get() is None:
+                    return await step(state)
+                with span(name, "node"):
+                    return await step(state)
+            finally:
+                NODE_SECONDS.observe(perf_counter() - start, name)
+
+        return timed
+
+    async def wrapped(state: Any) -> Any:
+        start = perf_counter()
+        if debug:
+            LOGGER.info("[graph] -> %s | %s", name, _format_state_preview(state))
         try:
-            result = step(*args, **kwargs)
-            if inspect.isawaitable(result):
-                result = await result
+            with span(name, "node"):
+                result = step(state)
+                if inspect.isawaitable(result):
+                    result = await result
         except Exception:
-            LOGGER.exception("[graph] !! %s failed", name)
+            if debug:
+                LOGGER.exception("[graph] !! %s failed", name)
             raise
-        elapsed_ms = (time.perf_counter() - start) * 1000
-        LOGGER.info(
-            "[graph] <- %s | %.1f ms | %s",
-            name,
-            elapsed_ms,
-            _format_result_preview(result),
-        )
+        finally:
+            elapsed = perf_counter() - start
+            NODE_SECONDS.observe(elapsed, name)
+        if debug:
+            LOGGER.info(
+                "[graph] <- %s | %.1f ms | %s",
+                name,
+                elapsed * 1000,
+                _format_result_preview(result),
+            )
         return result
 
     return wrapped
 
 
+async def _route_after_classify(state: dict) -> str | list[str]:
+    """Маршрут после классификации: для аналитики — параллельные ветки сбора данных."""
+    intent_route = await route_by_intent(state)
+    if intent_route == "analytics":
+        return analytics_branches(state)
+    return intent_route
+
+
+async def _route_after_cache(state: dict) -> str | list[str]:
+    """После кэша ответов: при попадании — сразу END, иначе обычный маршрут по intent."""
+    if state.get("response"):
+        return "cached"
+    return await _route_after_classify(state)
+
+
 def build_graph() -> StateGraph:
     """Собирает и компилирует граф агента."""
     debug_enabled = _is_debug_enabled()
@@ -116,13 +157,22 @@ def build_graph() -> StateGraph:
     graph.add_node("get_price", _wrap_step("get_price", get_price_node, debug_enabled))
     graph.add_node("get_news", _wrap_step("get_news", get_news_node, debug_enabled))
     graph.add_node(
-        "get_analytics_data",
-        _wrap_step("get_analytics_data", get_analytics_data_node, debug_enabled),
+        "analytics_market",
+        _wrap_step("analytics_market", analytics_market_node, debug_enabled),
+    )
+    graph.add_node(
+        "analytics_news",
+        _wrap_step("analytics_news", analytics_news_node, debug_enabled),
     )
     graph.add_node(
         "analytics_search",
         _wrap_step("analytics_search", analytics_search_node, debug_enabled),
     )
+    graph.add_node(
+        "analytics_join",
+        _wrap_step("analytics_join", analytics_join_node, debug_enabled),
+        defer=True,
+    )
     graph.add_node("analyze", _wrap_step("analyze", analyze_node, debug_enabled))
     graph.add_node("web_search", _wrap_step("web_search", web_search_node, debug_enabled))
     graph.add_node(
@@ -135,17 +185,33 @@ def build_graph() -> StateGraph:
 
     graph.set_entry_point("classify_intent")
 
-    graph.add_conditional_edges(
-        "classify_intent",
-        _wrap_step("route_by_intent", route_by_intent, debug_enabled),
-        {
-            "price": "get_price",
-            "news": "get_news",
-            "analytics": "get_analytics_data",
-            "chat": "web_search",
-            "clarify_coin": "clarify_coin",
-        },
-    )
+    intent_routes = {
+        "price": "get_price",
+        "news": "get_news",
+        "analytics_market": "analytics_market",
+        "analytics_news": "analytics_news",
+        "analytics_search": "analytics_search",
+        "chat": "web_search",
+        "clarify_coin": "clarify_coin",
+    }
+    if get_settings().answer_cache_enabled:
+        # Кэш готовых ответов проверяется сразу после классификации: при попадании
+        # ответ и AI-сообщение пишутся в состояние, и прогон завершается.
+        graph.add_node(
+            "cached_answer", _wrap_step("cached_answer", cached_answer_node, debug_enabled)
+        )
+        graph.add_edge("classify_intent", "cached_answer")
+        graph.add_conditional_edges(
+            "cached_answer",
+            _wrap_step("route_by_intent", _route_after_cache, debug_enabled),
+            {**intent_routes, "cached": END},
+        )
+    else:
+        graph.add_conditional_edges(
+            "classify_intent",
+            _wrap_step("route_by_intent", _route_after_classify, debug_enabled),
+            intent_routes,
+        )
 
     graph.add_edge("get_price", "generate_response")
     graph.add_edge("get_news", "generate_response")
@@ -153,8 +219,14 @@ def build_graph() -> StateGraph:
     graph.add_edge("clarify_coin", END)
     graph.add_edge("generate_response", END)
 
+    # Аналитика: ветки сбора данных идут параллельно и сходятся в analytics_join
+    # (defer=True — узел ждёт завершения всех веток). Поиск, не запущенный сразу,
+    # может добавить вложенный роутер; после него данные снова проходят через join.
+    for branch in ("analytics_market", "analytics_news", "analytics_search"):
+        graph.add_edge(branch, "analytics_join")
+
     graph.add_conditional_edges(
-        "get_analytics_data",
+        "analytics_join",
         _wrap_step("route_needs_search", route_needs_search, debug_enabled),
         {
             "needs_search": "analytics_search",
@@ -162,11 +234,17 @@ def build_graph() -> StateGraph:
         },
     )
 
-    graph.add_edge("analytics_search", "analyze")
     graph.add_edge("analyze", END)
 
-    memory = MemorySaver()
-    return graph.compile(checkpointer=memory)
+    return graph.compile(checkpointer=build_checkpointer())
+
+
+_agent_graph: StateGraph | None = None
 
 
-agent_graph = build_graph()
+def get_agent_graph() -> StateGraph:
+    """Возвращает singleton скомпилированного графа, собирая его при первом вызове."""
+    global _agent_graph
+    if _agent_graph is None:
+        _agent_graph = build_graph()
+    return _agent_graph
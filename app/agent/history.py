@@ -0,0 +1,119 @@
+"""Сжатие истории диалога: окно последних сообщений и накопительное резюме."""
+
+import asyncio
+import logging
+from typing import Any
+
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage, SystemMessage
+
+from app.config import get_settings
+from app.llm.gigachat import get_llm, llm_session
+from app.llm.scheduler import LLMPriority, llm_slot
+from app.thread_queue import get_thread_queue
+
+LOGGER = logging.getLogger(__name__)
+
+SUMMARY_MAX_CHARS = 600
+
+SUMMARY_PROMPT = """Ты ведёшь краткий конспект диалога пользователя с крипто-консультантом.
+Обнови конспект с учётом новых сообщений: какие монеты обсуждались, что спрашивал
+пользователь, ключевые цифры и выводы. Не более 3–4 предложений, только факты из
+диалога, на русском языке. Ответь только текстом конспекта."""
+
+# Ссылки на фоновые задачи, чтобы их не собрал сборщик мусора до завершения.
+_background_tasks: set[asyncio.Task] = set()
+
+
+def needs_compaction(messages: list[Any]) -> bool:
+    """True, если история выросла сверх `HISTORY_COMPACT_THRESHOLD` сообщений."""
+    settings = get_settings()
+    if settings.history_window_messages <= 0:
+        return False
+    return len(messages) > max(settings.history_compact_threshold, settings.history_window_messages)
+
+
+def _format_messages(messages: list[BaseMessage]) -> str:
+    lines = []
+    for msg in messages:
+        role = "user" if msg.type == "human" else "assistant"
+        content = msg.content if isinstance(msg.content, str) else str(msg.content)
+        lines.append(f"{role}: {' '.join(content.split())}")
+    return "\n".join(lines)
+
+
+async def summarize_history(previous_summary: str, messages: list[BaseMessage]) -> str:
+    """Дополняет резюме диалога сообщениями, которые уходят из окна истории."""
+    llm = get_llm("summarize")
+    prompt = [
+        SystemMessage(content=SUMMARY_PROMPT),
+        HumanMessage(
+            content=(
+                f"Текущий конспект:\n{previous_summary or '(пусто)'}\n\n"
+                f"Новые сообщения:\n{_format_messages(messages)}"
+            )
+        ),
+    ]
+    async with llm_slot(LLMPriority.BACKGROUND):
+        result = await llm.ainvoke(prompt)
+    return result.content.strip()[:SUMMARY_MAX_CHARS]
+
+
+async def compact_history(graph: Any, thread_id: str) -> bool:
+    """Сворачивает сообщения за пределами окна в резюме и удаляет их из состояния.
+
+    Последняя определённая монета хранится в `last_coin` отдельно от истории,
+    поэтому переживает удаление сообщений. Если резюме получить не удалось,
+    сообщения всё равно удаляются, чтобы размер чекпоинта оставался ограниченным.
+    """
+    config = {"configurable": {"thread_id": thread_id}}
+    snapshot = await graph.aget_state(config)
+    values = snapshot.values or {}
+    messages = values.get("messages", [])
+    if not needs_compaction(messages):
+        return False
+
+    stale = messages[: -get_settings().history_window_messages]
+    summary = values.get("summary", "")
+    try:
+        with llm_session(thread_id, "summarize"):
+            summary = await summarize_history(summary, stale)
+    except Exception:
+        LOGGER.warning("[history] summary failed | thread_id=%r", thread_id, exc_info=True)
+
+    # От имени узла, чьё ребро ведёт в END: без as_node LangGraph возьмёт последний
+    # узел хода (например, cached_answer), заново вычислит его маршрут без
+    # `response` и оставит в чекпоинте невыполненный шаг.
+    await graph.aupdate_state(
+        config,
+        {"messages": [RemoveMessage(id=msg.id) for msg in stale], "summary": summary},
+        as_node="generate_response",
+    )
+    LOGGER.info("[history] compacted %d messages | thread_id=%r", len(stale), thread_id)
+    return True
+
+
+def schedule_history_compaction(graph: Any, thread_id: str) -> asyncio.Task:
+    """Запускает сжатие истории в фоне, не задерживая ответ пользователю.
+
+    Сжатие читает и переписывает состояние диалога, поэтому идёт через очередь
+    ходов этого thread_id и не пересекается с новым ходом.
+    """
+
+    async def run() -> None:
+        try:
+            await get_thread_queue().exclusive(
+                thread_id, lambda: compact_history(graph, thread_id)
+            )
+        except Exception:
+            LOGGER.exception("[history] compaction failed | thread_id=%r", thread_id)
+
+    task = asyncio.create_task(run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def wait_for_background_compaction() -> None:
+    """Дожидается фоновых задач сжатия (при остановке приложения)."""
+    if _background_tasks:
+        await asyncio.gather(*_background_tasks, return_exceptions=True)
@@ -1,33 +1,80 @@
 """Функции узлов графа LangGraph."""
 
 import asyncio
-import json
 import logging
+import time
+from collections.abc import Awaitable, Callable
 from datetime import datetime, timezone
 from numbers import Real
+from typing import Any, TypeVar
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
-from app.llm.gigachat import get_llm
-from app.tools.coingecko import get_market_data, get_price
+from app.agent.answer_cache import get_answer_cache, is_cacheable
+from app.agent.prompt_data import compact_api_data
+from app.agent.templates import render_answer
+from app.config import get_settings
+from app.llm.gigachat import get_llm, llm_session
+from app.llm.scheduler import LLMPriority, llm_slot
+from app.market_snapshot import lookup_price
+from app.metrics import RESPONSE_RENDERS, TIMEOUTS, UPSTREAM_SECONDS
+from app.recording import current_tape
+from app.singleflight import current_flights
+from app.tracing import span
+from app.tools.coingecko import get_market_data, get_price, resolve_coin_id
 from app.tools.news import get_crypto_news
 from app.tools.websearch import search_web
 
 LOGGER = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+async def _call_upstream(target: str, call: Awaitable[T], key: Any = None) -> T:
+    """Выполняет вызов внешнего API: время в метриках по цели и спан в трейсе запроса.
+
+    `key` — аргументы вызова; внутри пакетного запроса одинаковые (цель, key)
+    выполняются один раз на пакет. При записи запроса ответ сохраняется, при
+    воспроизведении — берётся из записи.
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    flights = current_flights() if key is not None else None
+    tape = current_tape()
+    try:
+        with span(target, "upstream"):
+            if flights is not None:
+                call = flights.do((target, key), call)
+            if tape is not None:
+                call = tape.upstream(target, key, call)
+            result = await call
+        outcome = "ok"
+        return result
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, target, outcome)
+
+
 # ─── Узел: получение цены ───
 
 
 async def get_price_node(state: dict) -> dict:
-    """Получает цену криптовалюты через CoinGecko."""
+    """Получает цену криптовалюты: из снимка в разделяемой памяти или через CoinGecko."""
     coin = state.get("coin", "bitcoin")
-    api_call = "coingecko:/coins/markets"
-    try:
-        data = await get_price(coin)
-    except Exception as e:
-        _log_node_error("get_price", state, e)
-        data = {"error": str(e)}
+    data = lookup_price(coin)
+    if data is not None:
+        api_call = "shm:market_snapshot"
+    else:
+        api_call = "coingecko:/coins/markets"
+        try:
+            data = await _call_upstream(api_call, get_price(coin), key=resolve_coin_id(coin))
+        except Exception as e:
+            _log_node_error("get_price", state, e)
+            data = {"error": str(e)}
     if isinstance(data, dict):
+        _observe_price(coin, data)
         data["_api_calls"] = [api_call]
     return {"api_data": data}
 
@@ -40,60 +87,115 @@ async def get_news_node(state: dict) -> dict:
     coin = state.get("coin", "crypto")
     api_call = "newsapi:/v2/everything"
     try:
-        articles = await get_crypto_news(coin)
+        articles = await _call_upstream(api_call, get_crypto_news(coin), key=(coin, 5))
     except Exception as e:
         _log_node_error("get_news", state, e)
         articles = [{"error": str(e)}]
     return {"api_data": {"articles": articles, "_api_calls": [api_call]}}
 
 
-# ─── Узел: сбор данных для аналитики ───
+# ─── Ветки сбора данных для аналитики ───
+#
+# Ветки запускаются графом параллельно и сливаются в `api_data` редьюсером
+# `merge_api_data`. У каждой ветки свой таймаут: медленный источник не задерживает
+# остальные и не валит прогон, а отдаёт запись об ошибке.
 
 
-async def get_analytics_data_node(state: dict) -> dict:
-    """Собирает рыночные данные и новости для аналитики."""
-    coin = state.get("coin", "bitcoin")
-    api_calls = ["coingecko:/coins/{id}", "newsapi:/v2/everything"]
-    market_result, news_result = await asyncio.gather(
-        get_market_data(coin),
-        get_crypto_news(coin, max_results=3),
-        return_exceptions=True,
+async def _run_branch(
+    branch: str, state: dict, call: Awaitable[Any], fallback: Callable[[str], Any]
+) -> tuple[Any, float]:
+    """Выполняет внешний вызов ветки с таймаутом; возвращает результат и время, мс."""
+    start = time.perf_counter()
+    try:
+        async with asyncio.timeout(get_settings().analytics_branch_timeout_seconds):
+            result = await call
+    except Exception as e:
+        if isinstance(e, TimeoutError):
+            TIMEOUTS.inc(f"analytics_{branch}")
+        _log_node_error(f"analytics_{branch}", state, e)
+        result = fallback(str(e) or type(e).__name__)
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+    LOGGER.info(
+        "[node:analytics_%s] %.1f ms | thread_id=%r",
+        branch,
+        elapsed_ms,
+        state.get("thread_id", ""),
     )
+    return result, elapsed_ms
 
-    if isinstance(market_result, Exception):
-        _log_node_error("get_analytics_data.market", state, market_result)
-        market = {"error": str(market_result)}
-    else:
-        market = market_result
-
-    if isinstance(news_result, Exception):
-        _log_node_error("get_analytics_data.news", state, news_result)
-        news = [{"error": str(news_result)}]
-    else:
-        news = news_result
 
-    return {"api_data": {"market": market, "news": news, "_api_calls": api_calls}}
+async def analytics_market_node(state: dict) -> dict:
+    """Ветка аналитики: рыночные данные CoinGecko (цена, объёмы, динамика 24ч/7д/30д)."""
+    coin = state.get("coin", "bitcoin")
+    market, elapsed_ms = await _run_branch(
+        "market",
+        state,
+        _call_upstream(
+            "coingecko:/coins/{id}", get_market_data(coin), key=resolve_coin_id(coin)
+        ),
+        lambda error: {"error": error},
+    )
+    if isinstance(market, dict):
+        _observe_price(coin, market)
+    return {
+        "api_data": {
+            "market": market,
+            "_api_calls": ["coingecko:/coins/{id}"],
+            "_timings_ms": {"market": elapsed_ms},
+        }
+    }
 
 
-# ─── Узел: дополнительный веб-поиск для аналитики ───
+async def analytics_news_node(state: dict) -> dict:
+    """Ветка аналитики: последние новости по монете."""
+    coin = state.get("coin", "bitcoin")
+    news, elapsed_ms = await _run_branch(
+        "news",
+        state,
+        _call_upstream(
+            "newsapi:/v2/everything", get_crypto_news(coin, max_results=3), key=(coin, 3)
+        ),
+        lambda error: [{"error": error}],
+    )
+    return {
+        "api_data": {
+            "news": news,
+            "_api_calls": ["newsapi:/v2/everything"],
+            "_timings_ms": {"news": elapsed_ms},
+        }
+    }
 
 
 async def analytics_search_node(state: dict) -> dict:
-    """Доп. веб-поиск для обогащения аналитики."""
+    """Ветка аналитики: доп. веб-поиск для обогащения аналитики."""
     coin = state.get("coin", "crypto")
-    query = _build_analytics_search_query(coin)
-    try:
-        results = await search_web(query, max_results=3)
-    except Exception as e:
-        _log_node_error("analytics_search", state, e)
-        results = [{"error": str(e)}]
+    query = str(state.get("search_query", "") or "").strip() or _build_analytics_search_query(
+        coin
+    )
+    results, elapsed_ms = await _run_branch(
+        "search",
+        state,
+        _call_upstream("ddgs:text", search_web(query, max_results=3), key=(query, 3)),
+        lambda error: [{"error": error}],
+    )
+    return {
+        "api_data": {
+            "web_search": results,
+            "_api_calls": ["ddgs:text"],
+            "_timings_ms": {"search": elapsed_ms},
+        }
+    }
 
-    api_data = state.get("api_data", {})
-    api_data["web_search"] = results
-    api_calls = list(api_data.get("_api_calls", []))
-    api_calls.append("ddgs:text")
-    api_data["_api_calls"] = api_calls
-    return {"api_data": api_data}
+
+async def analytics_join_node(state: dict) -> dict:
+    """Точка сбора веток аналитики: дожидается всех и фиксирует их задержки."""
+    timings = state.get("api_data", {}).get("_timings_ms", {})
+    LOGGER.info(
+        "[node:analytics_join] branches=%s | thread_id=%r",
+        timings,
+        state.get("thread_id", ""),
+    )
+    return {}
 
 
 # ─── Узел: аналитика (отдельный промпт) ───
@@ -101,8 +203,9 @@ async def analytics_search_node(state: dict) -> dict:
 
 async def analyze_node(state: dict) -> dict:
     """LLM-анализ с аналитическим системным промптом."""
-    llm = get_llm()
+    llm = get_llm("analyze")
     api_data = state.get("api_data", {})
+    budget = get_settings().prompt_budget_analyze_tokens
 
     system_prompt = """Ты — опытный криптоаналитик. Проанализируй предоставленные данные и дай \
 развёрнутый аналитический ответ на русском языке.
@@ -121,11 +224,13 @@ async def analyze_node(state: dict) -> dict:
         HumanMessage(
             content=(
                 f"Запрос пользователя: {state['user_query']}\n\n"
-                f"Собранные данные:\n{json.dumps(api_data, ensure_ascii=False, indent=2, default=str)}"
+                f"Собранные данные:\n{compact_api_data(api_data, budget)}"
             )
         ),
     ]
-    result = await llm.ainvoke(messages)
+    with llm_session(state.get("thread_id"), "analyze"):
+        async with llm_slot(LLMPriority.ANALYZE):
+            result = await llm.ainvoke(messages)
     return {
         "response": result.content,
         "messages": [AIMessage(content=result.content)],
@@ -139,7 +244,9 @@ async def web_search_node(state: dict) -> dict:
     """Веб-поиск через DuckDuckGo для общих вопросов."""
     query = state.get("user_query", "")
     try:
-        results = await search_web(query, max_results=5)
+        results = await _call_upstream(
+            "ddgs:text", search_web(query, max_results=5), key=(query, 5)
+        )
     except Exception as e:
         _log_node_error("web_search", state, e)
         results = [{"error": str(e)}]
@@ -170,11 +277,26 @@ async def clarify_coin_node(state: dict) -> dict:
 
 
 async def generate_response_node(state: dict) -> dict:
-    """GigaChat формирует финальный ответ."""
-    llm = get_llm()
+    """GigaChat формирует финальный ответ; простые ответы о цене и новостях — шаблоны."""
     intent = state.get("intent", "chat")
     api_data = state.get("api_data", {})
 
+    if intent in get_settings().fast_render_intents:
+        text = render_answer(
+            intent,
+            state["user_query"],
+            api_data,
+            coin=state.get("coin"),
+            seed=f"{state.get('thread_id') or ''}:{state['user_query']}",
+        )
+        if text is not None:
+            RESPONSE_RENDERS.inc(intent, "template")
+            _remember_answer(state, intent, api_data, text)
+            return {"response": text, "messages": [AIMessage(content=text)]}
+    RESPONSE_RENDERS.inc(intent, "llm")
+
+    llm = get_llm("generate")
+
     system_prompt = """Ты — дружелюбный крипто-консультант. Отвечай на русском языке, \
 кратко и по делу. Используй предоставленные данные для формирования ответа.
 
@@ -197,13 +319,48 @@ async def generate_response_node(state: dict) -> dict:
             )
         ),
     ]
-    result = await llm.ainvoke(messages)
+    with llm_session(state.get("thread_id"), "generate"):
+        async with llm_slot(LLMPriority.GENERATE):
+            result = await llm.ainvoke(messages)
+    _remember_answer(state, intent, api_data, result.content)
     return {
         "response": result.content,
         "messages": [AIMessage(content=result.content)],
     }
 
 
+# ─── Кэш готовых ответов ───
+
+
+async def cached_answer_node(state: dict) -> dict:
+    """Отдаёт готовый ответ из кэша ответов; при промахе ничего не меняет."""
+    response = get_answer_cache().get(
+        state.get("intent", ""), state.get("coin"), state.get("user_query", "")
+    )
+    if response is None:
+        return {}
+    return {"response": response, "messages": [AIMessage(content=response)]}
+
+
+def _remember_answer(state: dict, intent: str, api_data: dict, response: str) -> None:
+    """Кладёт ответ в кэш ответов, если кэш включён и данные без ошибок."""
+    if not get_settings().answer_cache_enabled or not is_cacheable(intent, api_data):
+        return
+    get_answer_cache().put(
+        intent,
+        state.get("coin"),
+        state.get("user_query", ""),
+        response,
+        price_usd=api_data.get("price_usd") if intent == "price" else None,
+    )
+
+
+def _observe_price(coin: str, data: dict) -> None:
+    """Сообщает кэшу ответов свежую цену монеты для проверки записей о цене."""
+    if "price_usd" in data and get_settings().answer_cache_enabled:
+        get_answer_cache().observe_price(coin, data["price_usd"])
+
+
 # ─── Форматирование данных ───
 
 
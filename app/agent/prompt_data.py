@@ -0,0 +1,144 @@
+"""Компактная сериализация данных инструментов для промптов с бюджетом токенов."""
+
+import json
+import math
+import re
+from numbers import Real
+
+# Ключи, которые LLM не нужны: служебная бухгалтерия и ссылки.
+DROPPED_KEYS = frozenset({"url", "href"})
+DEFAULT_MAX_TEXT_CHARS = 200
+MIN_TEXT_CHARS = 40
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_CHARS_PER_WORD_TOKEN = 6
+
+
+def estimate_tokens(text: str) -> int:
+    """Приближённо оценивает число токенов: слова по ~6 символов плюс пунктуация."""
+
+    total = 0
+    for match in _TOKEN_RE.finditer(text):
+        piece = match.group(0)
+        total += math.ceil(len(piece) / _CHARS_PER_WORD_TOKEN) if piece[0].isalnum() else 1
+    return total
+
+
+def compact_api_data(api_data: dict, budget_tokens: int | None = None) -> str:
+    """Сериализует api_data компактно и, при необходимости, укладывает в бюджет токенов.
+
+    Служебные ключи (`_api_calls` и т.п.) и ссылки отбрасываются, числа округляются,
+    длинные тексты обрезаются. Если результат не помещается в бюджет, сначала
+    сокращаются самые длинные списки (новости, результаты поиска), затем тексты.
+    """
+
+    max_chars = DEFAULT_MAX_TEXT_CHARS
+    data = _normalize(api_data, max_chars)
+    rendered = _render(data)
+    if budget_tokens is None or estimate_tokens(rendered) <= budget_tokens:
+        return rendered
+
+    while estimate_tokens(rendered) > budget_tokens and _drop_last_item(data):
+        rendered = _render(data)
+
+    while estimate_tokens(rendered) > budget_tokens and max_chars > MIN_TEXT_CHARS:
+        max_chars = max(MIN_TEXT_CHARS, max_chars // 2)
+        data = _truncate_texts(data, max_chars)
+        rendered = _render(data)
+
+    if estimate_tokens(rendered) > budget_tokens:
+        rendered = _truncate_rendered(rendered, budget_tokens)
+    return rendered
+
+
+def _render(data: object) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _normalize(value: object, max_chars: int, key: str = "") -> object:
+    """Рекурсивно чистит значение: ключи, числа, тексты, пустые поля."""
+
+    if isinstance(value, dict):
+        result = {}
+        for k, v in value.items():
+            name = str(k)
+            if name.startswith("_") or name in DROPPED_KEYS or v is None or v == "":
+                continue
+            result[name] = _normalize(v, max_chars, name)
+        return result
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item, max_chars, key) for item in value]
+    if isinstance(value, str):
+        return _truncate_text(" ".join(value.split()), max_chars)
+    if isinstance(value, Real) and not isinstance(value, bool):
+        return _round_number(key, value)
+    return value
+
+
+def _round_number(key: str, value: Real) -> Real:
+    """Округляет число до точности, достаточной для анализа."""
+
+    if isinstance(value, int):
+        return value
+    number = float(value)
+    if not math.isfinite(number):
+        return number
+    if key.endswith("_pct"):
+        return round(number, 2)
+    magnitude = abs(number)
+    if magnitude >= 1000:
+        return int(round(number))
+    if magnitude >= 1:
+        return round(number, 2)
+    return float(f"{number:.4g}")
+
+
+def _truncate_text(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[: max_chars - 1].rstrip() + "…"
+
+
+def _truncate_texts(value: object, max_chars: int) -> object:
+    if isinstance(value, dict):
+        return {k: _truncate_texts(v, max_chars) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_truncate_texts(item, max_chars) for item in value]
+    if isinstance(value, str):
+        return _truncate_text(value, max_chars)
+    return value
+
+
+def _drop_last_item(data: object) -> bool:
+    """Удаляет последний элемент самого длинного списка; False, если сокращать нечего."""
+
+    candidates: list[list] = []
+    _collect_lists(data, candidates)
+    candidates = [items for items in candidates if len(items) > 1]
+    if not candidates:
+        return False
+    longest = max(candidates, key=lambda items: len(_render(items)))
+    longest.pop()
+    return True
+
+
+def _collect_lists(value: object, acc: list[list]) -> None:
+    if isinstance(value, dict):
+        for item in value.values():
+            _collect_lists(item, acc)
+    elif isinstance(value, list):
+        acc.append(value)
+        for item in value:
+            _collect_lists(item, acc)
+
+
+def _truncate_rendered(rendered: str, budget_tokens: int) -> str:
+    """Крайняя мера: обрезает готовую строку до бюджета."""
+
+    low, high = 0, len(rendered)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(rendered[:middle]) < budget_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return rendered[:low] + "…"
@@ -1,11 +1,22 @@
 """Роутинг: классификация intent и маршрутизация."""
 
 import json
+import logging
 import re
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Literal
 
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from pydantic import BaseModel, Field, ValidationError
 
-from app.llm.gigachat import get_llm
+from app.agent.prompt_data import compact_api_data
+from app.config import get_settings
+from app.llm.gigachat import get_llm, llm_session
+from app.llm.scheduler import LLMPriority, llm_slot
+from app.metrics import INTENTS
+
+LOGGER = logging.getLogger(__name__)
 
 CLASSIFY_PROMPT = """Ты — классификатор запросов пользователя о криптовалютах.
 
@@ -38,26 +49,107 @@ CLASSIFY_PROMPT = """Ты — классификатор запросов пол
 """
 
 
+STRUCTURED_CLASSIFY_PROMPT = """Ты — классификатор запросов пользователя о криптовалютах.
+
+Вызови функцию classify_request и заполни все её поля:
+- intent: "price" (текущая цена/курс), "news" (новости), "analytics" (аналитика, \
+прогноз, рекомендация по покупке/продаже) или "chat" (общий вопрос о крипте, блокчейне, DeFi);
+- coins: CoinGecko-идентификаторы упомянутых монет в нижнем регистре (bitcoin, ethereum, \
+solana), пустой список, если монета не названа;
+- needs_search: true, если для качественной аналитики нужен дополнительный веб-поиск \
+(прогнозы, свежие события, регуляторика), иначе false;
+- search_query: короткий англоязычный поисковый запрос, если needs_search = true.
+"""
+
+COREFERENCE_HINT = (
+    "Если в текущем вопросе используются местоимения ('он', 'она', "
+    "'эта монета', 'она сейчас дешёвая') и явная монета не названа, "
+    "используй монету из истории диалога."
+)
+
+
+# Результат классификации, уже полученный быстрым исполнителем (`app.agent.fast_path`)
+# для хода, который он передал графу: `classify_intent` отдаёт его без вызова LLM.
+PRECLASSIFIED: ContextVar[dict | None] = ContextVar("preclassified", default=None)
+
+
+class RequestDecision(BaseModel):
+    """Классификация запроса пользователя о криптовалютах."""
+
+    intent: Literal["price", "news", "analytics", "chat"] = Field(
+        description="Намерение пользователя"
+    )
+    coins: list[str] = Field(
+        default_factory=list, description="CoinGecko-идентификаторы упомянутых монет"
+    )
+    needs_search: bool = Field(
+        default=False, description="Нужен ли дополнительный веб-поиск для аналитики"
+    )
+    search_query: str = Field(default="", description="Поисковый запрос для веб-поиска")
+
+
+@lru_cache
+def _classify_function() -> dict:
+    """Описание функции classify_request для function calling GigaChat."""
+    from langchain_gigachat.utils.function_calling import convert_to_gigachat_function
+
+    function = dict(convert_to_gigachat_function(RequestDecision))
+    function["name"] = "classify_request"
+    return function
+
+
 async def classify_intent(state: dict) -> dict:
     """Классифицирует intent пользователя через GigaChat."""
-    llm = get_llm()
+    decided = PRECLASSIFIED.get()
+    if decided is not None:
+        return decided
+    llm = get_llm("classify")
     user_query = state["user_query"]
-    previous_coin = str(state.get("coin", "") or "").strip()
+    previous_coin = str(state.get("coin", "") or state.get("last_coin", "") or "").strip()
     history = _format_recent_history(state.get("messages", []))
+    summary = str(state.get("summary", "") or "").strip()
+    summary_block = f"Краткое содержание более раннего диалога:\n{summary}\n\n" if summary else ""
+    # Статичные инструкции — в системном сообщении, изменчивая часть — в конце,
+    # чтобы префикс промпта совпадал между ходами и кэшировался в сессии GigaChat.
+    user_message = HumanMessage(
+        content=(
+            f"{summary_block}"
+            f"История диалога (последние сообщения):\n{history}\n\n"
+            f"Текущий вопрос пользователя: {user_query}"
+        )
+    )
+
+    needs_search: bool | None = None
+    search_query = ""
+    with llm_session(state.get("thread_id"), "classify"):
+        if get_settings().classify_mode == "structured":
+            decision = await _classify_structured(llm, user_message)
+            intent = decision.intent
+            coin = next((c.strip() for c in decision.coins if c.strip()), "")
+            if intent == "analytics":
+                needs_search = decision.needs_search
+                search_query = decision.search_query.strip() if decision.needs_search else ""
+        else:
+            intent, coin = await _classify_text(llm, user_message)
 
-    messages = [
-        SystemMessage(content=CLASSIFY_PROMPT),
-        HumanMessage(
-            content=(
-                f"История диалога (последние сообщения):\n{history}\n\n"
-                f"Текущий вопрос пользователя: {user_query}\n\n"
-                "Если в текущем вопросе используются местоимения ('он', 'она', "
-                "'эта монета', 'она сейчас дешёвая') и явная монета не названа, "
-                "используй монету из истории диалога."
-            )
-        ),
-    ]
-    result = await llm.ainvoke(messages)
+    if not coin and intent in {"price", "news", "analytics"} and previous_coin:
+        coin = previous_coin
+
+    INTENTS.inc(intent)
+    return {
+        "intent": intent,
+        "coin": coin,
+        "last_coin": coin or previous_coin,
+        "needs_search": needs_search,
+        "search_query": search_query,
+    }
+
+
+async def _classify_text(llm, user_message: HumanMessage) -> tuple[str, str]:
+    """Классификация свободным текстом с разбором JSON из ответа."""
+    messages = [SystemMessage(content=f"{CLASSIFY_PROMPT}\n{COREFERENCE_HINT}"), user_message]
+    async with llm_slot(LLMPriority.CLASSIFY):
+        result = await llm.ainvoke(messages)
 
     try:
         # Извлекаем JSON из ответа
@@ -71,11 +163,29 @@ async def classify_intent(state: dict) -> dict:
     except (json.JSONDecodeError, KeyError):
         intent = "chat"
         coin = ""
+    return intent, coin
 
-    if not coin and intent in {"price", "news", "analytics"} and previous_coin:
-        coin = previous_coin
 
-    return {"intent": intent, "coin": coin}
+async def _classify_structured(llm, user_message: HumanMessage) -> RequestDecision:
+    """Один вызов с function calling: intent, монеты и решение о поиске по схеме."""
+    function = _classify_function()
+    messages = [
+        SystemMessage(content=f"{STRUCTURED_CLASSIFY_PROMPT}\n{COREFERENCE_HINT}"),
+        user_message,
+    ]
+    async with llm_slot(LLMPriority.CLASSIFY):
+        result = await llm.ainvoke(
+            messages,
+            functions=[function],
+            function_call={"name": function["name"]},
+        )
+
+    tool_calls = getattr(result, "tool_calls", None) or []
+    try:
+        return RequestDecision.model_validate(tool_calls[0]["args"] if tool_calls else {})
+    except ValidationError:
+        LOGGER.warning("[router] classify_request returned invalid arguments: %r", tool_calls)
+        return RequestDecision(intent="chat")
 
 
 async def route_by_intent(state: dict) -> str:
@@ -89,10 +199,31 @@ async def route_by_intent(state: dict) -> str:
     return "chat"
 
 
+def analytics_branches(state: dict) -> list[str]:
+    """Ветки сбора данных для аналитики, запускаемые параллельно.
+
+    Если структурная классификация уже решила, что нужен веб-поиск, он
+    запускается сразу, вместе с рыночными данными и новостями.
+    """
+    branches = ["analytics_market", "analytics_news"]
+    if state.get("needs_search") is True:
+        branches.append("analytics_search")
+    return branches
+
+
 async def route_needs_search(state: dict) -> str:
     """Вложенный роутер: решает, нужен ли доп. поиск для аналитики."""
-    llm = get_llm()
     api_data = state.get("api_data", {})
+    if "web_search" in api_data:
+        # Поиск уже выполнен (параллельной веткой или на предыдущем шаге).
+        return "no_search"
+    decided = state.get("needs_search")
+    if decided is not None:
+        # Решение уже принято структурной классификацией — без отдельного вызова LLM.
+        return "needs_search" if decided else "no_search"
+
+    llm = get_llm("route")
+    budget = get_settings().prompt_budget_route_tokens
 
     messages = [
         SystemMessage(
@@ -107,11 +238,13 @@ async def route_needs_search(state: dict) -> str:
         HumanMessage(
             content=(
                 f"Запрос пользователя: {state['user_query']}\n"
-                f"Собранные данные: {json.dumps(api_data, ensure_ascii=False, default=str)}"
+                f"Собранные данные: {compact_api_data(api_data, budget)}"
             )
         ),
     ]
-    result = await llm.ainvoke(messages)
+    with llm_session(state.get("thread_id"), "route"):
+        async with llm_slot(LLMPriority.ROUTE):
+            result = await llm.ainvoke(messages)
     answer = _parse_yes_no_answer(result.content)
 
     if answer == "yes":
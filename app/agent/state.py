@@ -1,18 +1,90 @@
 """Определение State для LangGraph графа."""
 
-from typing import Annotated
+from collections.abc import Callable, Sequence
+from typing import Annotated, Any
 
+from langgraph.channels import UntrackedValue
 from langgraph.graph.message import add_messages
-from typing_extensions import TypedDict
+from typing_extensions import Self, TypedDict
 
 
-class AgentState(TypedDict):
-    """Состояние агента, передаваемое между узлами графа."""
+def merge_api_data(current: dict | None, update: dict | None) -> dict:
+    """Сливает данные параллельных веток аналитики.
+
+    Ключи данных перезаписываются, служебные (`_api_calls`, `_timings_ms`)
+    накапливаются: списки склеиваются, словари объединяются. `None` сбрасывает
+    накопленное значение.
+    """
+    if update is None:
+        return {}
+    merged = dict(current or {})
+    for key, value in update.items():
+        previous = merged.get(key)
+        if key.startswith("_") and isinstance(previous, list) and isinstance(value, list):
+            merged[key] = [*previous, *value]
+        elif key.startswith("_") and isinstance(previous, dict) and isinstance(value, dict):
+            merged[key] = {**previous, **value}
+        else:
+            merged[key] = value
+    return merged
+
+
+class UntrackedMerge(UntrackedValue):
+    """Канал без чекпоинтов, который сводит несколько записей за шаг редьюсером."""
+
+    __slots__ = ("reducer",)
+
+    def __init__(self, typ: type, reducer: Callable[[Any, Any], Any]) -> None:
+        super().__init__(typ, guard=False)
+        self.reducer = reducer
+
+    def __eq__(self, value: object) -> bool:
+        return isinstance(value, UntrackedMerge) and value.reducer is self.reducer
+
+    def copy(self) -> Self:
+        empty = self.from_checkpoint(None)
+        if self.is_available():
+            empty.value = self.get()
+        return empty
+
+    def from_checkpoint(self, checkpoint: Any) -> Self:
+        empty = self.__class__(self.typ, self.reducer)
+        empty.key = self.key
+        return empty
+
+    def update(self, values: Sequence[Any]) -> bool:
+        if not values:
+            return False
+        value = self.get() if self.is_available() else None
+        for update in values:
+            value = self.reducer(value, update)
+        self.value = value
+        return True
+
+
+class ConversationState(TypedDict):
+    """Долговременная часть состояния: сохраняется в чекпоинтах между ходами."""
 
     messages: Annotated[list, add_messages]
     user_query: str
     thread_id: str
     intent: str
     coin: str
-    api_data: dict
-    response: str
+    last_coin: str
+    summary: str
+
+
+class RunState(TypedDict):
+    """Данные одного прогона графа: живут только в памяти и не попадают в чекпоинты."""
+
+    needs_search: Annotated[bool | None, UntrackedValue(object)]
+    search_query: Annotated[str, UntrackedValue(str)]
+    api_data: Annotated[dict, UntrackedMerge(dict, merge_api_data)]
+    response: Annotated[str, UntrackedValue(str)]
+
+
+class AgentState(ConversationState, RunState):
+    """Состояние агента, передаваемое между узлами графа."""
+
+
+TRANSIENT_KEYS = frozenset(RunState.__annotations__)
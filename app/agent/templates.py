@@ -0,0 +1,213 @@
+"""Шаблонные ответы без LLM для простых запросов о цене и новостях.
+
+Карточка цены и список новостей уже содержат всё, что нужно пользователю, и
+перефразирование через GigaChat стоит секунды задержки и квоту. Если intent
+включён в `FAST_RENDER_INTENTS`, данные получены без ошибок, а вопрос не требует
+рассуждений («почему», «стоит ли», «прогноз»...), ответ собирается из шаблонов.
+В остальных случаях `render_answer` возвращает None и отвечает LLM.
+"""
+
+import math
+import zlib
+from datetime import datetime
+from numbers import Real
+
+NBSP = "\u00a0"
+MAX_SIMPLE_QUERY_WORDS = 12
+MAX_NEWS_ITEMS = 3
+
+# Формулировки, для которых нужен ответ LLM, а не карточка с данными.
+OPEN_ENDED_MARKERS = (
+    "почему",
+    "зачем",
+    "стоит ли",
+    "стоит покупать",
+    "стоит продавать",
+    "объясни",
+    "расскажи подробн",
+    "прогноз",
+    "сравни",
+    "лучше",
+    "думаешь",
+    "посоветуй",
+    "совет",
+    "что будет",
+    "вырастет",
+    "упадет",
+    "упадёт",
+    "анализ",
+    "повлия",
+    "why",
+    "should",
+    "explain",
+    "predict",
+)
+
+PRICE_INTROS = (
+    "{coin} сейчас стоит {price}.",
+    "Текущая цена {coin} — {price}.",
+    "{coin} торгуется по {price}.",
+)
+PRICE_UP = (
+    "За сутки курс вырос на {change}.",
+    "За последние 24 часа цена прибавила {change}.",
+)
+PRICE_DOWN = (
+    "За сутки курс снизился на {change}.",
+    "За последние 24 часа цена потеряла {change}.",
+)
+PRICE_FLAT = "За сутки цена почти не изменилась."
+NEWS_INTROS = (
+    "Свежие новости по {topic}:",
+    "Что нового по {topic}:",
+    "Последние публикации по {topic}:",
+)
+NEWS_EMPTY = "Свежих новостей по {topic} не нашлось — попробуйте спросить позже."
+
+
+def render_answer(
+    intent: str, query: str, api_data: dict, coin: str | None = None, seed: str = ""
+) -> str | None:
+    """Ответ по шаблону или None, если нужен LLM (ошибка данных, открытый вопрос)."""
+
+    if is_open_ended(query):
+        return None
+    if intent == "price":
+        return render_price(api_data, seed)
+    if intent == "news":
+        return render_news(api_data, coin, seed)
+    return None
+
+
+def is_open_ended(query: str) -> bool:
+    """Вопрос требует рассуждений или слишком длинный для шаблонного ответа."""
+
+    normalized = " ".join(query.lower().split())
+    if len(normalized.split()) > MAX_SIMPLE_QUERY_WORDS:
+        return True
+    return any(marker in normalized for marker in OPEN_ENDED_MARKERS)
+
+
+def render_price(data: dict, seed: str = "") -> str | None:
+    """Ответ о цене монеты; None при ошибке или без цены."""
+
+    price = data.get("price_usd")
+    if "error" in data or not _is_number(price):
+        return None
+    name = data.get("name") or data.get("symbol") or "Монета"
+    coin = f"{name} ({data['symbol']})" if data.get("symbol") else name
+    sentences = [_pick(PRICE_INTROS, seed).format(coin=coin, price=format_usd(price))]
+
+    change = data.get("price_change_24h_pct")
+    if _is_number(change):
+        if abs(change) < 0.05:
+            sentences.append(PRICE_FLAT)
+        else:
+            variants = PRICE_UP if change > 0 else PRICE_DOWN
+            sentences.append(_pick(variants, seed).format(change=format_percent(abs(change))))
+
+    details = []
+    if _is_number(data.get("market_cap_usd")):
+        details.append(f"капитализация — {format_usd_compact(data['market_cap_usd'])}")
+    if _is_number(data.get("total_volume_usd")):
+        volume = format_usd_compact(data["total_volume_usd"])
+        details.append(f"объём торгов за 24{NBSP}ч — {volume}")
+    if details:
+        text = ", ".join(details)
+        sentences.append(text[0].upper() + text[1:] + ".")
+    return " ".join(sentences)
+
+
+def render_news(data: dict, coin: str | None = None, seed: str = "") -> str | None:
+    """Список свежих новостей; None при ошибке источника."""
+
+    articles = data.get("articles") or []
+    if any("error" in article for article in articles):
+        return None
+    topic = _news_topic(coin)
+    if not articles:
+        return NEWS_EMPTY.format(topic=topic)
+
+    lines = [_pick(NEWS_INTROS, seed).format(topic=topic)]
+    for i, article in enumerate(articles[:MAX_NEWS_ITEMS], 1):
+        title = article.get("title") or "Без заголовка"
+        meta = ", ".join(
+            part
+            for part in (article.get("source"), format_date(article.get("published_at")))
+            if part
+        )
+        lines.append(f"{i}. {title} ({meta})" if meta else f"{i}. {title}")
+        if article.get("url"):
+            lines.append(f"   {article['url']}")
+    return "\n".join(lines)
+
+
+# ─── Форматирование чисел и дат ───
+
+
+def format_number(value: float, decimals: int) -> str:
+    """Число по-русски: неразрывный пробел между разрядами и десятичная запятая."""
+
+    text = f"{value:,.{decimals}f}"
+    return text.replace(",", NBSP).replace(".", ",")
+
+
+def format_usd(value: float) -> str:
+    """Цена в долларах; у монет дешевле $1 — до четырёх значащих цифр.
+
+    Значение сначала округляется, и уже по результату выбирается формат:
+    0,99999 — это «$1,00», а не «$1,».
+    """
+
+    if value != 0 and abs(value) < 1:
+        value = round(value, min(10, 3 - math.floor(math.log10(abs(value)))))
+    if value == 0 or abs(value) >= 1:
+        return f"${format_number(value, 2)}"
+    decimals = min(10, 3 - math.floor(math.log10(abs(value))))
+    text = format_number(value, decimals).rstrip("0").rstrip(",")
+    return f"${text}"
+
+
+def format_usd_compact(value: float) -> str:
+    """Крупная сумма в долларах в млн, млрд или трлн.
+
+    Единица выбирается по округлённому значению: 999,999 млрд — это «1,00 трлн».
+    """
+
+    for threshold, suffix in ((1e12, "трлн"), (1e9, "млрд"), (1e6, "млн")):
+        scaled = round(value / threshold, 2)
+        if abs(scaled) >= 1:
+            return f"${format_number(scaled, 2)}{NBSP}{suffix}"
+    return f"${format_number(value, 0)}"
+
+
+def format_percent(value: float) -> str:
+    return f"{format_number(value, 2)}{NBSP}%"
+
+
+def format_date(value: object) -> str:
+    """ISO-дата NewsAPI в формате ДД.ММ.ГГГГ; нераспознанная строка — как есть."""
+
+    if not isinstance(value, str) or not value:
+        return ""
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).strftime("%d.%m.%Y")
+    except ValueError:
+        return value
+
+
+def _is_number(value: object) -> bool:
+    return isinstance(value, Real) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _pick(variants: tuple[str, ...], seed: str) -> str:
+    """Детерминированный выбор формулировки: один диалог — одна манера."""
+
+    return variants[zlib.crc32(seed.encode("utf-8")) % len(variants)]
+
+
+def _news_topic(coin: object) -> str:
+    coin = str(coin or "").strip()
+    if not coin or coin == "crypto":
+        return "криптовалютам"
+    return coin[:1].upper() + coin[1:]
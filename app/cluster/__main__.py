@@ -0,0 +1,45 @@
+"""Запуск кластера: входной процесс и N воркеров графа.
+
+Запуск:
+    python -m app.cluster [--workers N] [--host 0.0.0.0] [--port 8000]
+
+Число воркеров по умолчанию — `CLUSTER_WORKERS`, а если он равен 0 — число ядер.
+"""
+
+import argparse
+import logging
+import os
+
+import uvicorn
+
+from app.cluster.proxy import create_proxy_app
+from app.cluster.supervisor import Supervisor
+from app.config import get_settings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s"
+    )
+    # Проверки здоровья идут каждые несколько секунд — не засоряем ими лог.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    settings = get_settings()
+    count = args.workers or settings.cluster_workers or os.cpu_count() or 1
+    supervisor = Supervisor(
+        count,
+        settings.cluster_socket_dir,
+        health_interval=settings.cluster_health_interval_seconds,
+        failure_threshold=settings.cluster_health_failures,
+        drain_timeout=settings.cluster_drain_timeout_seconds,
+    )
+    uvicorn.run(create_proxy_app(supervisor), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
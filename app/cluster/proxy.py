@@ -0,0 +1,230 @@
+"""Входной процесс кластера: маршрутизирует запросы к воркерам по thread_id.
+
+`/chat` и `/debug/traces/{thread_id}` уходят воркеру, которому thread_id
+принадлежит по кольцу (запрос без thread_id получает его здесь, чтобы следующий
+ход пришёл туда же). `/chat/batch` разбивается на под-пакеты по воркерам и
+собирается обратно в исходном порядке. Остальные GET-эндпоинты (`/metrics`,
+`/llm/*`, `/checkpointer`) отдаёт первый здоровый воркер или указанный в
+`?worker=`.
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from app.cluster.supervisor import Supervisor, Worker
+from app.config import get_settings
+from app.market_snapshot import start_market_snapshot, stop_market_snapshot
+
+LOGGER = logging.getLogger(__name__)
+
+NO_WORKERS_DETAIL = "Нет доступных воркеров. Попробуйте повторить запрос позже."
+# Заголовки ответа воркера, которые имеет смысл отдать клиенту.
+FORWARDED_HEADERS = ("content-type", "retry-after")
+
+
+def create_proxy_app(supervisor: Supervisor) -> FastAPI:
+    """Собирает FastAPI-приложение входного процесса над набором воркеров."""
+
+    @asynccontextmanager
+    async def lifespan(_app: FastAPI):
+        # Снимок рынка публикует входной процесс: он захватывает блокировку раньше
+        # воркеров, и те только читают сегмент.
+        snapshot_publisher = await start_market_snapshot()
+        await supervisor.start()
+        try:
+            yield
+        finally:
+            await supervisor.stop()
+            if snapshot_publisher is not None:
+                await stop_market_snapshot(snapshot_publisher)
+
+    app = FastAPI(title="Крипто-консультант (кластер)", lifespan=lifespan)
+    app.state.supervisor = supervisor
+
+    @app.post("/chat")
+    async def chat(request: Request) -> Response:
+        body = await _json_object(request)
+        thread_id = body.get("thread_id") or str(uuid.uuid4())
+        body["thread_id"] = thread_id
+        return await _forward_thread(supervisor, thread_id, "POST", "/chat", json=body)
+
+    @app.post("/chat/batch", response_model=None)
+    async def chat_batch(request: Request, stream: bool = False) -> Response:
+        body = await _json_object(request)
+        items = body.get("items")
+        if not isinstance(items, list) or not items:
+            # Пусть ответ о невалидном теле сформирует сам воркер.
+            worker = supervisor.any_worker()
+            return await _forward(supervisor, worker, "POST", "/chat/batch", json=body)
+        max_items = get_settings().chat_batch_max_items
+        if len(items) > max_items:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Слишком много элементов в пакете: максимум {max_items}.",
+            )
+        results = _run_split_batch(supervisor, body, items)
+        if stream:
+            return StreamingResponse(
+                (json.dumps(item, ensure_ascii=False) + "\n" async for item in results),
+                media_type="application/x-ndjson",
+            )
+        collected = [item async for item in results]
+        return JSONResponse({"results": sorted(collected, key=lambda item: item["index"])})
+
+    @app.get("/debug/traces/{thread_id}")
+    async def debug_traces(thread_id: str, request: Request) -> Response:
+        return await _forward_thread(
+            supervisor,
+            thread_id,
+            "GET",
+            f"/debug/traces/{thread_id}",
+            params=request.query_params,
+        )
+
+    @app.get("/cluster")
+    async def cluster_state() -> dict:
+        """Воркеры, их здоровье и запросы в работе, состав кольца."""
+        return supervisor.snapshot()
+
+    @app.get("/health")
+    async def health() -> Response:
+        healthy = len(supervisor.ring)
+        status = "ok" if healthy else "unavailable"
+        return JSONResponse(
+            {"status": status, "workers": healthy, "total": len(supervisor.workers)},
+            status_code=200 if healthy else 503,
+        )
+
+    @app.get("/{path:path}")
+    async def passthrough(path: str, request: Request, worker: str | None = None) -> Response:
+        params = {k: v for k, v in request.query_params.items() if k != "worker"}
+        target = supervisor.any_worker(worker)
+        if worker is not None and target is None:
+            raise HTTPException(status_code=404, detail=f"Воркер не найден: {worker}")
+        return await _forward(supervisor, target, "GET", f"/{path}", params=params)
+
+    return app
+
+
+async def _json_object(request: Request) -> dict:
+    try:
+        body = await request.json()
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail="Тело запроса должно быть JSON.") from exc
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=422, detail="Тело запроса должно быть JSON-объектом.")
+    return body
+
+
+async def _send(supervisor: Supervisor, worker: Worker, method: str, path: str, **kwargs: Any):
+    """Отправляет запрос воркеру; при отказе соединения сразу снимает его с кольца."""
+    try:
+        return await supervisor.client(worker).request(method, path, **kwargs)
+    except httpx.ConnectError:
+        supervisor.mark_down(worker, "connection refused")
+        raise
+
+
+def _to_response(response: httpx.Response) -> Response:
+    headers = {k: v for k, v in response.headers.items() if k.lower() in FORWARDED_HEADERS}
+    return Response(content=response.content, status_code=response.status_code, headers=headers)
+
+
+async def _forward(
+    supervisor: Supervisor, worker: Worker | None, method: str, path: str, **kwargs: Any
+) -> Response:
+    if worker is None:
+        raise HTTPException(status_code=503, detail=NO_WORKERS_DETAIL, headers={"Retry-After": "1"})
+    try:
+        with supervisor.track(worker):
+            return _to_response(await _send(supervisor, worker, method, path, **kwargs))
+    except httpx.HTTPError as exc:
+        raise HTTPException(status_code=502, detail=f"Воркер {worker.name} недоступен.") from exc
+
+
+async def _forward_thread(
+    supervisor: Supervisor, thread_id: str, method: str, path: str, **kwargs: Any
+) -> Response:
+    """Запрос диалога к его воркеру; если воркер не принял соединение — к следующему по кольцу."""
+    worker = supervisor.route(thread_id)
+    for attempt in range(2):
+        if worker is None:
+            break
+        try:
+            with supervisor.track(worker, [thread_id]):
+                return _to_response(await _send(supervisor, worker, method, path, **kwargs))
+        except httpx.ConnectError as exc:
+            # Запрос до воркера не дошёл — повтор безопасен.
+            next_worker = supervisor.route(thread_id)
+            if attempt or next_worker is None or next_worker is worker:
+                raise HTTPException(
+                    status_code=502, detail=f"Воркер {worker.name} недоступен."
+                ) from exc
+            worker = next_worker
+        except httpx.HTTPError as exc:
+            raise HTTPException(status_code=502, detail=f"Воркер {worker.name} недоступен.") from exc
+    raise HTTPException(status_code=503, detail=NO_WORKERS_DETAIL, headers={"Retry-After": "1"})
+
+
+async def _run_split_batch(
+    supervisor: Supervisor, body: dict, items: list
+) -> AsyncIterator[dict]:
+    """Разбивает пакет по воркерам диалогов и отдаёт результаты под-пакетов по готовности."""
+    groups: dict[str, tuple[Worker, list[tuple[int, dict]]]] = {}
+    unrouted: list[int] = []
+    for index, item in enumerate(items):
+        item = dict(item) if isinstance(item, dict) else {"message": item}
+        item["thread_id"] = item.get("thread_id") or str(uuid.uuid4())
+        worker = supervisor.route(item["thread_id"])
+        if worker is None:
+            unrouted.append(index)
+            continue
+        groups.setdefault(worker.name, (worker, []))[1].append((index, item))
+
+    for index in unrouted:
+        yield _item_error(index, 503, NO_WORKERS_DETAIL)
+
+    async def run(worker: Worker, group: list[tuple[int, dict]]) -> list[dict]:
+        sub_body = {**body, "items": [item for _, item in group]}
+        try:
+            with supervisor.track(worker, [item["thread_id"] for _, item in group]):
+                response = await _send(supervisor, worker, "POST", "/chat/batch", json=sub_body)
+        except httpx.HTTPError:
+            detail = f"Воркер {worker.name} недоступен."
+            return [_item_error(index, 502, detail) for index, _ in group]
+        if response.status_code != 200:
+            detail = _error_detail(response)
+            return [_item_error(index, response.status_code, detail) for index, _ in group]
+        results = response.json()["results"]
+        for result in results:
+            result["index"] = group[result["index"]][0]
+        return results
+
+    tasks = [asyncio.create_task(run(worker, group)) for worker, group in groups.values()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for result in await next_done:
+                yield result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _error_detail(response: httpx.Response) -> str:
+    try:
+        return str(response.json()["detail"])
+    except (ValueError, KeyError, TypeError):
+        return response.text or f"HTTP {response.status_code}"
+
+
+def _item_error(index: int, status: int, error: str) -> dict:
+    return {"index": index, "status": status, "elapsed_ms": 0.0, "result": None, "error": error}
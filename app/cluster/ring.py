@@ -0,0 +1,56 @@
+"""Консистентное хеширование thread_id по воркерам кластера."""
+
+import hashlib
+from bisect import bisect, insort
+
+DEFAULT_REPLICAS = 64
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Кольцо с виртуальными узлами: при смене состава переезжает ~1/N ключей."""
+
+    def __init__(self, nodes: tuple[str, ...] = (), replicas: int = DEFAULT_REPLICAS):
+        self.replicas = replicas
+        self._points: list[int] = []
+        self._owners: dict[int, str] = {}
+        self._nodes: set[str] = set()
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str) -> None:
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for i in range(self.replicas):
+            point = _hash(f"{node}#{i}")
+            if point not in self._owners:
+                self._owners[point] = node
+                insort(self._points, point)
+
+    def remove(self, node: str) -> None:
+        if node not in self._nodes:
+            return
+        self._nodes.discard(node)
+        self._points = [point for point in self._points if self._owners[point] != node]
+        self._owners = {point: self._owners[point] for point in self._points}
+
+    def owner(self, key: str) -> str | None:
+        """Узел, которому принадлежит ключ, или None для пустого кольца."""
+        if not self._points:
+            return None
+        index = bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+    @property
+    def nodes(self) -> frozenset[str]:
+        return frozenset(self._nodes)
+
+    def __contains__(self, node: str) -> bool:
+        return node in self._nodes
+
+    def __len__(self) -> int:
+        return len(self._nodes)
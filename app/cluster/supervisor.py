@@ -0,0 +1,276 @@
+"""Процессы-воркеры кластера: запуск, проверка здоровья, перезапуск и drain.
+
+Каждый воркер — отдельный процесс uvicorn с `app.main:app` на Unix-сокете.
+Здоровые воркеры стоят в кольце консистентного хеширования; воркер, не
+ответивший на `/health` `CLUSTER_HEALTH_FAILURES` раз подряд или завершившийся,
+убирается из кольца, а упавший процесс перезапускается. Пока у диалога есть
+запросы в работе, новые запросы этого диалога идут на тот же воркер: при
+перестройке кольца диалог переезжает только после того, как его запросы
+завершились.
+"""
+
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from app.cluster.ring import HashRing
+
+LOGGER = logging.getLogger(__name__)
+
+HEALTH_TIMEOUT_SECONDS = 2.0
+# Отдельные запросы и пакеты ограничены таймаутами самих воркеров.
+FORWARD_TIMEOUT = httpx.Timeout(None, connect=5.0)
+
+
+@dataclass
+class Worker:
+    name: str
+    socket_path: str
+    process: Any = None
+    healthy: bool = False
+    failures: int = 0
+    in_flight: int = 0
+    restarts: int = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.name,
+            "pid": getattr(self.process, "pid", None),
+            "alive": self.alive,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "restarts": self.restarts,
+        }
+
+
+def spawn_uvicorn_worker(worker: Worker) -> subprocess.Popen:
+    """Запускает воркер uvicorn с приложением на Unix-сокете воркера."""
+    Path(worker.socket_path).unlink(missing_ok=True)
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--uds",
+            worker.socket_path,
+            "--log-level",
+            "warning",
+        ],
+        env={**os.environ, "CLUSTER_WORKER_NAME": worker.name},
+    )
+
+
+def uds_transport(worker: Worker) -> httpx.AsyncBaseTransport:
+    return httpx.AsyncHTTPTransport(uds=worker.socket_path)
+
+
+class Supervisor:
+    """Набор воркеров, их здоровье и маршрутизация диалогов по кольцу."""
+
+    def __init__(
+        self,
+        count: int,
+        socket_dir: str,
+        *,
+        health_interval: float = 2.0,
+        failure_threshold: int = 3,
+        drain_timeout: float = 30.0,
+        spawn: Callable[[Worker], Any] = spawn_uvicorn_worker,
+        transport: Callable[[Worker], httpx.AsyncBaseTransport] = uds_transport,
+    ):
+        self.socket_dir = socket_dir
+        self.health_interval = health_interval
+        self.failure_threshold = max(1, failure_threshold)
+        self.drain_timeout = drain_timeout
+        self.workers = [
+            Worker(f"worker-{i}", os.path.join(socket_dir, f"worker-{i}.sock"))
+            for i in range(max(1, count))
+        ]
+        self.ring = HashRing()
+        self._by_name = {worker.name: worker for worker in self.workers}
+        self._spawn = spawn
+        self._transport = transport
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        # Диалоги с запросами в работе: thread_id -> (воркер, число запросов).
+        self._pinned: dict[str, tuple[Worker, int]] = {}
+        self._monitor: asyncio.Task | None = None
+
+    # ─── Жизненный цикл ───
+
+    async def start(self, ready_timeout: float = 60.0) -> None:
+        """Запускает воркеры, ждёт их готовности и включает мониторинг."""
+        Path(self.socket_dir).mkdir(parents=True, exist_ok=True)
+        for worker in self.workers:
+            worker.process = self._spawn(worker)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + ready_timeout
+        while True:
+            await asyncio.gather(*(self.check(worker) for worker in self.workers))
+            if all(worker.healthy for worker in self.workers):
+                break
+            if loop.time() >= deadline:
+                LOGGER.warning(
+                    "[cluster] started with %d/%d healthy workers",
+                    len(self.ring),
+                    len(self.workers),
+                )
+                break
+            await asyncio.sleep(0.2)
+        self._monitor = asyncio.create_task(self._monitor_loop())
+
+    async def stop(self) -> None:
+        """Снимает воркеры с кольца, дожидается их запросов и останавливает процессы."""
+        if self._monitor is not None:
+            self._monitor.cancel()
+            await asyncio.gather(self._monitor, return_exceptions=True)
+            self._monitor = None
+        await asyncio.gather(*(self.drain(worker) for worker in self.workers))
+        await asyncio.gather(*(self._terminate(worker) for worker in self.workers))
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    async def _monitor_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await asyncio.gather(*(self._supervise(worker) for worker in self.workers))
+
+    async def _supervise(self, worker: Worker) -> None:
+        try:
+            if worker.alive:
+                await self.check(worker)
+            else:
+                await self.restart(worker, reason="exited")
+        except Exception:
+            LOGGER.exception("[cluster] supervising %s failed", worker.name)
+
+    # ─── Здоровье и перестройка кольца ───
+
+    async def check(self, worker: Worker) -> bool:
+        """Проверяет `/health` воркера и добавляет его в кольцо или убирает из него."""
+        ok = False
+        if worker.alive:
+            try:
+                response = await self.client(worker).get("/health", timeout=HEALTH_TIMEOUT_SECONDS)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+        if ok:
+            worker.failures = 0
+            if not worker.healthy:
+                worker.healthy = True
+                self.ring.add(worker.name)
+                LOGGER.info("[cluster] %s joined the ring", worker.name)
+            return True
+        worker.failures += 1
+        if not worker.alive or worker.failures >= self.failure_threshold:
+            self.mark_down(worker, "health check failed")
+        return False
+
+    def mark_down(self, worker: Worker, reason: str) -> None:
+        """Убирает воркер из кольца: его диалоги переходят к соседям по кольцу."""
+        if worker.healthy:
+            LOGGER.warning("[cluster] %s left the ring: %s", worker.name, reason)
+        worker.healthy = False
+        self.ring.remove(worker.name)
+
+    async def drain(self, worker: Worker) -> None:
+        """Снимает воркер с кольца и ждёт завершения его запросов (до drain_timeout)."""
+        self.mark_down(worker, "drain")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.drain_timeout
+        while worker.in_flight and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        if worker.in_flight:
+            LOGGER.warning(
+                "[cluster] %s drain timed out with %d requests in flight",
+                worker.name,
+                worker.in_flight,
+            )
+
+    async def restart(self, worker: Worker, reason: str = "restart") -> None:
+        """Перезапускает процесс воркера; в кольцо он вернётся после проверки здоровья."""
+        LOGGER.warning("[cluster] restarting %s: %s", worker.name, reason)
+        await self.drain(worker)
+        await self._terminate(worker)
+        client = self._clients.pop(worker.name, None)
+        if client is not None:
+            await client.aclose()
+        worker.process = self._spawn(worker)
+        worker.failures = 0
+        worker.restarts += 1
+
+    async def _terminate(self, worker: Worker) -> None:
+        if not worker.alive:
+            return
+        worker.process.terminate()
+        try:
+            await asyncio.to_thread(worker.process.wait, 10)
+        except subprocess.TimeoutExpired:
+            worker.process.kill()
+
+    # ─── Маршрутизация ───
+
+    def client(self, worker: Worker) -> httpx.AsyncClient:
+        client = self._clients.get(worker.name)
+        if client is None:
+            client = self._clients[worker.name] = httpx.AsyncClient(
+                transport=self._transport(worker),
+                base_url="http://worker",
+                timeout=FORWARD_TIMEOUT,
+            )
+        return client
+
+    def route(self, thread_id: str) -> Worker | None:
+        """Воркер для диалога: текущий, пока у диалога есть запросы в работе, иначе — по кольцу."""
+        pinned = self._pinned.get(thread_id)
+        if pinned is not None and pinned[0].alive:
+            return pinned[0]
+        name = self.ring.owner(thread_id)
+        return self._by_name[name] if name is not None else None
+
+    def any_worker(self, name: str | None = None) -> Worker | None:
+        """Воркер по имени или первый здоровый (для эндпоинтов без thread_id)."""
+        if name is not None:
+            return self._by_name.get(name)
+        return next((worker for worker in self.workers if worker.healthy), None)
+
+    @contextmanager
+    def track(self, worker: Worker, thread_ids: Iterable[str] = ()) -> Iterator[None]:
+        """Учитывает запрос в работе на воркере и закрепляет за ним его диалоги."""
+        thread_ids = list(thread_ids)
+        worker.in_flight += 1
+        for thread_id in thread_ids:
+            _, count = self._pinned.get(thread_id, (worker, 0))
+            self._pinned[thread_id] = (worker, count + 1)
+        try:
+            yield
+        finally:
+            worker.in_flight -= 1
+            for thread_id in thread_ids:
+                pinned_worker, count = self._pinned[thread_id]
+                if count <= 1:
+                    del self._pinned[thread_id]
+                else:
+                    self._pinned[thread_id] = (pinned_worker, count - 1)
+
+    def snapshot(self) -> dict:
+        return {
+            "workers": [worker.snapshot() for worker in self.workers],
+            "ring": sorted(self.ring.nodes),
+            "pinned_threads": len(self._pinned),
+        }
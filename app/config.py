@@ -1,11 +1,20 @@
 """Централизованная конфигурация приложения."""
 
 from functools import lru_cache
+from typing import Literal
 
-from pydantic import Field
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class GigaChatEndpoint(BaseModel):
+    """Дополнительный клиент пула GigaChat (свои credentials и/или модель)."""
+
+    credentials: str
+    model: str | None = None
+    scope: str | None = None
+
+
 class Settings(BaseSettings):
     """Настройки приложения, загружаемые из .env и переменных окружения."""
 
@@ -13,17 +22,149 @@ class Settings(BaseSettings):
 
     gigachat_credentials: str | None = Field(default=None, alias="GIGACHAT_CREDENTIALS")
     gigachat_model: str = Field(default="GigaChat-2-Max", alias="GIGACHAT_MODEL")
+    gigachat_model_classify: str | None = Field(
+        default=None, alias="GIGACHAT_MODEL_CLASSIFY"
+    )
+    gigachat_model_route: str | None = Field(default=None, alias="GIGACHAT_MODEL_ROUTE")
+    gigachat_model_generate: str | None = Field(
+        default=None, alias="GIGACHAT_MODEL_GENERATE"
+    )
+    gigachat_model_analyze: str | None = Field(
+        default=None, alias="GIGACHAT_MODEL_ANALYZE"
+    )
+    gigachat_model_summarize: str | None = Field(
+        default=None, alias="GIGACHAT_MODEL_SUMMARIZE"
+    )
     gigachat_scope: str = Field(default="GIGACHAT_API_B2B", alias="GIGACHAT_SCOPE")
     gigachat_verify_ssl_certs: bool = Field(
         default=False, alias="GIGACHAT_VERIFY_SSL_CERTS"
     )
+    gigachat_pool: list[GigaChatEndpoint] = Field(
+        default_factory=list, alias="GIGACHAT_POOL"
+    )
+    llm_pool_eject_seconds: float = Field(default=30.0, alias="LLM_POOL_EJECT_SECONDS")
+    llm_pool_error_threshold: float = Field(
+        default=0.5, alias="LLM_POOL_ERROR_THRESHOLD"
+    )
 
+    gigachat_base_url: str | None = Field(default=None, alias="GIGACHAT_BASE_URL")
+    gigachat_auth_url: str | None = Field(default=None, alias="GIGACHAT_AUTH_URL")
+
+    coingecko_base_url: str = Field(
+        default="https://api.coingecko.com/api/v3", alias="COINGECKO_BASE_URL"
+    )
+    newsapi_base_url: str = Field(default="https://newsapi.org/v2", alias="NEWSAPI_BASE_URL")
+    ddgs_base_url: str | None = Field(default=None, alias="DDGS_BASE_URL")
     news_api_key: str | None = Field(default=None, alias="NEWS_API_KEY")
     telegram_bot_token: str | None = Field(default=None, alias="TELEGRAM_BOT_TOKEN")
     fastapi_url: str = Field(default="http://localhost:8000", alias="FASTAPI_URL")
 
     graph_timeout_seconds: float = Field(default=30.0, alias="GRAPH_TIMEOUT_SECONDS")
     graph_debug_nodes: bool = Field(default=False, alias="GRAPH_DEBUG_NODES")
+    analytics_branch_timeout_seconds: float = Field(
+        default=8.0, alias="ANALYTICS_BRANCH_TIMEOUT_SECONDS"
+    )
+
+    fast_render_intents: list[Literal["price", "news"]] = Field(
+        default_factory=list, alias="FAST_RENDER_INTENTS"
+    )
+    fast_path_intents: list[Literal["price", "news", "chat"]] = Field(
+        default_factory=list, alias="FAST_PATH_INTENTS"
+    )
+
+    answer_cache_enabled: bool = Field(default=False, alias="ANSWER_CACHE_ENABLED")
+    answer_cache_ttl_seconds: dict[str, float] = Field(
+        default_factory=lambda: {"price": 60.0, "news": 300.0},
+        alias="ANSWER_CACHE_TTL_SECONDS",
+    )
+    answer_cache_max_entries: int = Field(default=2048, alias="ANSWER_CACHE_MAX_ENTRIES")
+    answer_cache_price_move_pct: float = Field(
+        default=0.5, alias="ANSWER_CACHE_PRICE_MOVE_PCT"
+    )
+
+    chat_thread_mode: Literal["off", "serialize", "coalesce"] = Field(
+        default="serialize", alias="CHAT_THREAD_MODE"
+    )
+    chat_batch_concurrency: int = Field(default=4, alias="CHAT_BATCH_CONCURRENCY")
+    chat_batch_max_items: int = Field(default=50, alias="CHAT_BATCH_MAX_ITEMS")
+
+    cluster_workers: int = Field(default=0, alias="CLUSTER_WORKERS")
+    cluster_socket_dir: str = Field(default="data/workers", alias="CLUSTER_SOCKET_DIR")
+    cluster_health_interval_seconds: float = Field(
+        default=2.0, alias="CLUSTER_HEALTH_INTERVAL_SECONDS"
+    )
+    cluster_health_failures: int = Field(default=3, alias="CLUSTER_HEALTH_FAILURES")
+    cluster_drain_timeout_seconds: float = Field(
+        default=30.0, alias="CLUSTER_DRAIN_TIMEOUT_SECONDS"
+    )
+
+    market_snapshot_enabled: bool = Field(default=False, alias="MARKET_SNAPSHOT_ENABLED")
+    market_snapshot_name: str = Field(default="crypto-market", alias="MARKET_SNAPSHOT_NAME")
+    market_snapshot_coins: list[str] = Field(
+        default_factory=list, alias="MARKET_SNAPSHOT_COINS"
+    )
+    market_snapshot_interval_seconds: float = Field(
+        default=30.0, alias="MARKET_SNAPSHOT_INTERVAL_SECONDS"
+    )
+    market_snapshot_max_age_seconds: float = Field(
+        default=120.0, alias="MARKET_SNAPSHOT_MAX_AGE_SECONDS"
+    )
+
+    trace_enabled: bool = Field(default=True, alias="TRACE_ENABLED")
+    trace_buffer_size: int = Field(default=500, alias="TRACE_BUFFER_SIZE")
+    trace_export_path: str | None = Field(default=None, alias="TRACE_EXPORT_PATH")
+    # Запись запросов /chat с ответами внешних API и LLM для воспроизведения.
+    record_trace_path: str | None = Field(default=None, alias="RECORD_TRACE_PATH")
+
+    llm_warmup_enabled: bool = Field(default=True, alias="LLM_WARMUP_ENABLED")
+    llm_token_refresh_margin_seconds: float = Field(
+        default=120.0, alias="LLM_TOKEN_REFRESH_MARGIN_SECONDS"
+    )
+    llm_keepalive_seconds: float = Field(default=0.0, alias="LLM_KEEPALIVE_SECONDS")
+
+    llm_session_cache_enabled: bool = Field(
+        default=True, alias="LLM_SESSION_CACHE_ENABLED"
+    )
+
+    llm_max_in_flight: int = Field(default=8, alias="LLM_MAX_IN_FLIGHT")
+    llm_max_queue: int = Field(default=32, alias="LLM_MAX_QUEUE")
+    llm_queue_timeout_seconds: float = Field(
+        default=10.0, alias="LLM_QUEUE_TIMEOUT_SECONDS"
+    )
+
+    classify_mode: Literal["text", "structured"] = Field(
+        default="text", alias="CLASSIFY_MODE"
+    )
+
+    checkpointer: Literal["memory", "sqlite"] = Field(
+        default="memory", alias="CHECKPOINTER"
+    )
+    checkpoint_sqlite_path: str = Field(
+        default="data/checkpoints.sqlite3", alias="CHECKPOINT_SQLITE_PATH"
+    )
+    checkpoint_pool_size: int = Field(default=4, alias="CHECKPOINT_POOL_SIZE")
+    checkpoint_ttl_seconds: float = Field(
+        default=7 * 24 * 3600, alias="CHECKPOINT_TTL_SECONDS"
+    )
+    checkpoint_keep_last: int = Field(default=3, alias="CHECKPOINT_KEEP_LAST")
+    checkpoint_memory_max_threads: int = Field(
+        default=100_000, alias="CHECKPOINT_MEMORY_MAX_THREADS"
+    )
+    checkpoint_memory_max_bytes: int = Field(
+        default=512 * 1024 * 1024, alias="CHECKPOINT_MEMORY_MAX_BYTES"
+    )
+
+    history_window_messages: int = Field(default=6, alias="HISTORY_WINDOW_MESSAGES")
+    history_compact_threshold: int = Field(
+        default=12, alias="HISTORY_COMPACT_THRESHOLD"
+    )
+
+    prompt_budget_route_tokens: int = Field(
+        default=400, alias="PROMPT_BUDGET_ROUTE_TOKENS"
+    )
+    prompt_budget_analyze_tokens: int = Field(
+        default=1200, alias="PROMPT_BUDGET_ANALYZE_TOKENS"
+    )
 
 
 def _require_non_empty(value: str | None, env_name: str) -> str:
@@ -1,35 +1,141 @@
 """Настройка GigaChat LLM."""
 
+import asyncio
 import inspect
-
-from langchain_gigachat import GigaChat
+import logging
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
 
 from app.config import get_settings, require_gigachat_credentials
+from app.llm.pool import LLMPool, PoolMember
+
+LOGGER = logging.getLogger(__name__)
+# Пауза перед повтором, если фоновое обновление токена завершилось ошибкой.
+MAINTENANCE_RETRY_SECONDS = 30.0
+
+LLM_ROLES = ("classify", "route", "generate", "analyze", "summarize")
+DEFAULT_ROLE = "generate"
+SESSION_NAMESPACE = uuid.UUID("8b6f1f0e-3c9a-4f57-9d52-6a1c2e7b0f41")
+
+_llm_instances: dict[str, LLMPool] = {}
+
+# Класс клиента langchain-gigachat. Импорт SDK тяжёлый, поэтому выполняется при
+# построении первого пула, а не при импорте модуля.
+GigaChat: type | None = None
+
 
-_llm_instance: GigaChat | None = None
+def _client_class() -> type:
+    """Лениво импортирует и возвращает класс клиента `langchain_gigachat.GigaChat`."""
+    global GigaChat
+    if GigaChat is None:
+        from langchain_gigachat import GigaChat
+    return GigaChat
 
 
-def get_llm() -> GigaChat:
-    """Возвращает singleton-экземпляр GigaChat LLM."""
-    global _llm_instance
-    if _llm_instance is None:
+def _role_model(settings: object, role: str) -> str | None:
+    """Модель, заданная для роли (`GIGACHAT_MODEL_<ROLE>`), или None."""
+    return getattr(settings, f"gigachat_model_{role}", None) or None
+
+
+def get_llm(role: str = DEFAULT_ROLE) -> LLMPool:
+    """Возвращает singleton-пул клиентов GigaChat для роли вызова.
+
+    Роли (`classify`, `route`, `generate`, `analyze`, `summarize`) получают отдельные клиенты,
+    чтобы короткие структурные вызовы можно было отправлять в более лёгкую модель
+    через `GIGACHAT_MODEL_<ROLE>`. Первый клиент пула строится из
+    `GIGACHAT_CREDENTIALS`, остальные — из `GIGACHAT_POOL`.
+    """
+    if role not in LLM_ROLES:
+        raise ValueError(f"Неизвестная роль LLM: {role}")
+    pool = _llm_instances.get(role)
+    if pool is None:
         settings = get_settings()
-        _llm_instance = GigaChat(
-            credentials=require_gigachat_credentials(settings),
-            verify_ssl_certs=settings.gigachat_verify_ssl_certs,
-            model=settings.gigachat_model,
-            scope=settings.gigachat_scope,
+        client_class = _client_class()
+        role_model = _role_model(settings, role)
+        primary_model = role_model or settings.gigachat_model
+        # Адреса API и авторизации переопределяются, например, для симулятора.
+        urls = {
+            key: value
+            for key, value in (
+                ("base_url", settings.gigachat_base_url),
+                ("auth_url", settings.gigachat_auth_url),
+            )
+            if value
+        }
+        members = [
+            PoolMember(
+                name=f"{primary_model}#0",
+                llm=client_class(
+                    credentials=require_gigachat_credentials(settings),
+                    verify_ssl_certs=settings.gigachat_verify_ssl_certs,
+                    model=primary_model,
+                    scope=settings.gigachat_scope,
+                    **urls,
+                ),
+            )
+        ]
+        for index, endpoint in enumerate(settings.gigachat_pool, start=1):
+            model = role_model or endpoint.model or settings.gigachat_model
+            members.append(
+                PoolMember(
+                    name=f"{model}#{index}",
+                    llm=client_class(
+                        credentials=endpoint.credentials,
+                        verify_ssl_certs=settings.gigachat_verify_ssl_certs,
+                        model=model,
+                        scope=endpoint.scope or settings.gigachat_scope,
+                        **urls,
+                    ),
+                )
+            )
+        pool = LLMPool(
+            members,
+            eject_seconds=settings.llm_pool_eject_seconds,
+            error_threshold=settings.llm_pool_error_threshold,
+            name=role,
         )
-    return _llm_instance
+        _llm_instances[role] = pool
+    return pool
 
 
-async def close_llm() -> None:
-    """Закрывает сетевые ресурсы LLM-клиента."""
-    global _llm_instance
-    if _llm_instance is None:
+def _built_pools() -> list[LLMPool]:
+    return list(_llm_instances.values())
+
+
+def llm_pool_snapshot() -> dict:
+    """Статистика пулов по ролям; клиенты, которые ещё не построены, не создаются."""
+    return {role: pool.snapshot() for role, pool in _llm_instances.items()}
+
+
+def session_id_for(thread_id: str, role: str) -> str:
+    """Стабильный идентификатор сессии GigaChat для пары (thread_id, роль)."""
+    return str(uuid.uuid5(SESSION_NAMESPACE, f"{role}:{thread_id}"))
+
+
+@contextmanager
+def llm_session(thread_id: str | None, role: str) -> Iterator[None]:
+    """Привязывает вызовы LLM внутри блока к сессии диалога (заголовок X-Session-ID).
+
+    GigaChat кэширует контекст на сервере по идентификатору сессии, поэтому
+    повторно отправляемый неизменный префикс промпта не обрабатывается заново.
+    У каждой роли свой системный промпт, поэтому и своя сессия.
+    """
+    if not thread_id or not get_settings().llm_session_cache_enabled:
+        yield
         return
+    from gigachat.context import session_id_cvar
 
-    close_target = getattr(_llm_instance, "_client", _llm_instance)
+    token = session_id_cvar.set(session_id_for(thread_id, role))
+    try:
+        yield
+    finally:
+        session_id_cvar.reset(token)
+
+
+async def _close_client(llm: object) -> None:
+    close_target = getattr(llm, "_client", llm)
     aclose = getattr(close_target, "aclose", None)
     close = getattr(close_target, "close", None)
 
@@ -40,4 +146,130 @@ async def close_llm() -> None:
     elif callable(close):
         close()
 
-    _llm_instance = None
+
+async def close_llm() -> None:
+    """Закрывает сетевые ресурсы всех клиентов всех ролей."""
+    pools = _built_pools()
+    _llm_instances.clear()
+    for pool in pools:
+        for member in pool.members:
+            await _close_client(member.llm)
+
+
+def _sdk_client(llm: object) -> object:
+    """Возвращает нижележащий SDK-клиент gigachat (или сам объект)."""
+    return getattr(llm, "_client", llm)
+
+
+async def warmup_llm() -> None:
+    """Создаёт клиенты всех ролей, получает OAuth-токены и открывает соединения."""
+    start = time.perf_counter()
+    members = [member for role in LLM_ROLES for member in get_llm(role).members]
+    LOGGER.info(
+        "[llm] warm-up: %d client(s) built in %.1f ms", len(members), _elapsed_ms(start)
+    )
+
+    for member in members:
+        sdk = _sdk_client(member.llm)
+
+        step = time.perf_counter()
+        await sdk.aget_token()
+        LOGGER.info(
+            "[llm] warm-up: %s access token acquired in %.1f ms", member.name, _elapsed_ms(step)
+        )
+
+        step = time.perf_counter()
+        await sdk.aget_models()
+        LOGGER.info(
+            "[llm] warm-up: %s connection opened in %.1f ms", member.name, _elapsed_ms(step)
+        )
+    LOGGER.info("[llm] warm-up finished in %.1f ms", _elapsed_ms(start))
+
+
+def _seconds_until_refresh(sdk: object, margin: float) -> float | None:
+    """Сколько секунд до планового обновления токена; None, если срок неизвестен."""
+    token = getattr(sdk, "_access_token", None)
+    expires_at_ms = getattr(token, "expires_at", 0) or 0
+    if not expires_at_ms:
+        return None
+    return expires_at_ms / 1000 - time.time() - margin
+
+
+async def _refresh_token(name: str, sdk: object) -> None:
+    """Принудительно получает новый access token вне критического пути запроса."""
+    start = time.perf_counter()
+    reset_token = getattr(sdk, "_reset_token", None)
+    if callable(reset_token):
+        reset_token()
+    await sdk.aget_token()
+    LOGGER.info("[llm] %s access token refreshed in %.1f ms", name, _elapsed_ms(start))
+
+
+async def _maintenance_loop(refresh_margin: float, keepalive_interval: float) -> None:
+    """Фоновый цикл: обновляет токены до истечения и поддерживает соединения."""
+    # Пробуждения ради обновления токена не должны сдвигать keep-alive: пинг — не
+    # чаще раза в `keepalive_interval` от предыдущего.
+    last_ping = time.monotonic()
+    while True:
+        try:
+            clients = [
+                (f"{pool.name}:{m.name}", _sdk_client(m.llm))
+                for pool in _built_pools()
+                for m in pool.members
+            ]
+            delays = [
+                delay
+                for _, sdk in clients
+                if (delay := _seconds_until_refresh(sdk, refresh_margin)) is not None
+            ]
+            if keepalive_interval:
+                delays.append(keepalive_interval - (time.monotonic() - last_ping))
+            if not delays:
+                return
+            await asyncio.sleep(max(0.0, min(delays)))
+
+            ping_due = bool(keepalive_interval) and (
+                time.monotonic() - last_ping >= keepalive_interval
+            )
+            if ping_due:
+                last_ping = time.monotonic()
+            for name, sdk in clients:
+                until_refresh = _seconds_until_refresh(sdk, refresh_margin)
+                if until_refresh is not None and until_refresh <= 0:
+                    await _refresh_token(name, sdk)
+                elif ping_due:
+                    start = time.perf_counter()
+                    await sdk.aget_models()
+                    LOGGER.debug(
+                        "[llm] %s keep-alive ping in %.1f ms", name, _elapsed_ms(start)
+                    )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            LOGGER.warning("[llm] background maintenance failed", exc_info=True)
+            await asyncio.sleep(MAINTENANCE_RETRY_SECONDS)
+
+
+def start_llm_maintenance() -> asyncio.Task:
+    """Запускает фоновое обновление токенов и keep-alive соединений."""
+    settings = get_settings()
+    return asyncio.create_task(
+        _maintenance_loop(
+            settings.llm_token_refresh_margin_seconds,
+            settings.llm_keepalive_seconds,
+        ),
+        name="gigachat-maintenance",
+    )
+
+
+async def stop_llm_maintenance(task: asyncio.Task) -> None:
+    """Останавливает фоновую задачу обслуживания клиентов."""
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def _elapsed_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
@@ -0,0 +1,170 @@
+"""Пул LLM-клиентов с маршрутизацией по задержке и отказоустойчивостью."""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+
+from app.metrics import Histogram, llm_usage, record_llm_call
+from app.recording import current_tape
+from app.tracing import span
+
+LOGGER = logging.getLogger(__name__)
+
+EWMA_ALPHA = 0.3
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+LATENCY_BUCKETS_SECONDS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0)
+# Задержка клиента без единого успешного вызова: с нулём `score` не учитывал бы
+# ни загрузку, ни ошибки, и все параллельные вызовы шли бы в один новый клиент.
+PRIOR_LATENCY_SECONDS = 1.0
+
+
+@dataclass
+class PoolMember:
+    """Клиент пула и его скользящая статистика."""
+
+    name: str
+    llm: Any
+    in_flight: int = 0
+    ewma_latency: float = 0.0
+    ewma_error: float = 0.0
+    ejected_until: float = 0.0
+    calls_total: int = 0
+    errors_total: int = 0
+
+    def is_healthy(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+    def score(self) -> float:
+        """Ожидаемая стоимость вызова: быстрые и незагруженные клиенты — первыми."""
+        latency = self.ewma_latency or PRIOR_LATENCY_SECONDS
+        return latency * (self.in_flight + 1) * (1 + self.ewma_error)
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """True для ошибок, при которых имеет смысл повторить вызов на другом клиенте."""
+    status_code = getattr(exc, "status_code", None)
+    if isinstance(status_code, int):
+        return status_code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, (httpx.TransportError, TimeoutError, ConnectionError))
+
+
+class LLMPool:
+    """Набор LLM-клиентов (разные credentials/модели) за единым `ainvoke`.
+
+    Каждый вызов уходит на здоровый клиент с наименьшим `score`. При 429/5xx или
+    сетевой ошибке вызов повторяется на следующем клиенте, а клиент с высокой
+    долей ошибок (или получивший 429) временно исключается из ротации.
+    """
+
+    def __init__(
+        self,
+        members: list[PoolMember],
+        eject_seconds: float = 30.0,
+        error_threshold: float = 0.5,
+        name: str = "default",
+    ):
+        if not members:
+            raise ValueError("LLMPool requires at least one member")
+        self.members = members
+        self.eject_seconds = eject_seconds
+        self.error_threshold = error_threshold
+        self.name = name
+        self.latency_seconds = Histogram(LATENCY_BUCKETS_SECONDS)
+
+    def candidates(self) -> list[PoolMember]:
+        """Клиенты в порядке предпочтения; исключённые — в конце, как крайняя мера."""
+        now = time.monotonic()
+        healthy = [m for m in self.members if m.is_healthy(now)]
+        ejected = [m for m in self.members if not m.is_healthy(now)]
+        healthy.sort(key=PoolMember.score)
+        ejected.sort(key=lambda m: m.ejected_until)
+        return healthy + ejected
+
+    async def ainvoke(self, input: Any, config: Any = None, **kwargs: Any) -> Any:
+        """Вызывает лучший клиент, переключаясь на следующий при сбое.
+
+        При записи запроса ответ сохраняется, при воспроизведении — берётся из записи.
+        """
+        tape = current_tape()
+        if tape is not None:
+            return await tape.llm(self.name, self._ainvoke(input, config, **kwargs))
+        return await self._ainvoke(input, config, **kwargs)
+
+    async def _ainvoke(self, input: Any, config: Any = None, **kwargs: Any) -> Any:
+        with span(self.name, "llm") as call_span:
+            last_error: BaseException | None = None
+            for attempt, member in enumerate(self.candidates(), start=1):
+                member.in_flight += 1
+                member.calls_total += 1
+                start = time.perf_counter()
+                try:
+                    result = await member.llm.ainvoke(input, config, **kwargs)
+                except Exception as exc:
+                    if not is_retryable_error(exc):
+                        raise
+                    self._record_failure(member, exc)
+                    last_error = exc
+                    continue
+                finally:
+                    # И при отмене (таймаут /chat): CancelledError — не Exception.
+                    member.in_flight -= 1
+                latency = time.perf_counter() - start
+                self._record_success(member, latency)
+                self.latency_seconds.observe(latency)
+                record_llm_call(self.name, latency, result)
+                call_span.set(member=member.name, attempts=attempt, **(llm_usage(result) or {}))
+                LOGGER.debug(
+                    "[llm-pool] %s/%s call %.1f ms", self.name, member.name, latency * 1000
+                )
+                return result
+            assert last_error is not None
+            raise last_error
+
+    def _record_success(self, member: PoolMember, latency: float) -> None:
+        if member.ewma_latency == 0.0:
+            member.ewma_latency = latency
+        else:
+            member.ewma_latency += EWMA_ALPHA * (latency - member.ewma_latency)
+        member.ewma_error -= EWMA_ALPHA * member.ewma_error
+
+    def _record_failure(self, member: PoolMember, exc: BaseException) -> None:
+        member.errors_total += 1
+        member.ewma_error += EWMA_ALPHA * (1.0 - member.ewma_error)
+        eject_for = None
+        if getattr(exc, "status_code", None) == 429:
+            eject_for = getattr(exc, "retry_after", None) or self.eject_seconds
+        elif member.ewma_error >= self.error_threshold:
+            eject_for = self.eject_seconds
+        if eject_for is not None:
+            member.ejected_until = time.monotonic() + eject_for
+            member.ewma_error = 0.0
+            LOGGER.warning(
+                "[llm-pool] %s ejected for %.1f s after error: %s",
+                member.name,
+                eject_for,
+                exc,
+            )
+        else:
+            LOGGER.warning("[llm-pool] %s failed, failing over: %s", member.name, exc)
+
+    def snapshot(self) -> dict:
+        """Статистика клиентов пула для мониторинга."""
+        now = time.monotonic()
+        return {
+            "latency_seconds": self.latency_seconds.snapshot(),
+            "members": [
+                {
+                    "name": m.name,
+                    "healthy": m.is_healthy(now),
+                    "in_flight": m.in_flight,
+                    "ewma_latency_seconds": round(m.ewma_latency, 4),
+                    "ewma_error_rate": round(m.ewma_error, 4),
+                    "calls_total": m.calls_total,
+                    "errors_total": m.errors_total,
+                }
+                for m in self.members
+            ]
+        }
@@ -0,0 +1,163 @@
+"""Планировщик вызовов LLM: лимит параллелизма и приоритетная очередь."""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from enum import IntEnum
+
+from app.config import get_settings
+from app.metrics import TIMEOUTS, Histogram
+from app.tracing import span
+
+WAIT_BUCKETS_SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class LLMPriority(IntEnum):
+    """Приоритет вызова: меньшее значение обслуживается раньше."""
+
+    CLASSIFY = 0
+    ROUTE = 1
+    GENERATE = 2
+    ANALYZE = 3
+    # Фоновые вызовы (сжатие истории) не должны задерживать ответы пользователям.
+    BACKGROUND = 4
+
+
+class LLMOverloadedError(RuntimeError):
+    """LLM перегружена: запрос не получил слот выполнения."""
+
+
+class LLMQueueFullError(LLMOverloadedError):
+    """Очередь ожидания LLM заполнена, запрос отклонён сразу."""
+
+
+class LLMQueueTimeoutError(LLMOverloadedError):
+    """Запрос простоял в очереди LLM дольше допустимого."""
+
+
+class LLMScheduler:
+    """Ограничивает число одновременных вызовов LLM и упорядочивает ожидающих."""
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._in_flight = 0
+        self._queued = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self.rejected_total = 0
+        self.timeouts_total = 0
+        self.wait_seconds = Histogram(WAIT_BUCKETS_SECONDS)
+        self.queue_depth = Histogram(DEPTH_BUCKETS)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def is_saturated(self) -> bool:
+        """True, если новый запрос к LLM будет отклонён без ожидания."""
+        return self._in_flight >= self.max_in_flight and self._queued >= self.max_queue
+
+    async def acquire(self, priority: int = LLMPriority.GENERATE) -> None:
+        """Ждёт свободный слот с учётом приоритета и таймаута очереди."""
+        self.queue_depth.observe(self._queued)
+        if self._in_flight < self.max_in_flight and not self._queued:
+            self._in_flight += 1
+            self.wait_seconds.observe(0.0)
+            return
+        if self._queued >= self.max_queue:
+            self.rejected_total += 1
+            raise LLMQueueFullError("Очередь запросов к LLM переполнена.")
+
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), future))
+        self._queued += 1
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await future
+        except BaseException as exc:
+            if future.done() and not future.cancelled():
+                # Слот уже передан этому ожидающему — возвращаем его следующему.
+                self.release()
+            else:
+                future.cancel()
+                self._queued -= 1
+            if isinstance(exc, TimeoutError):
+                self.timeouts_total += 1
+                TIMEOUTS.inc("llm_queue")
+                raise LLMQueueTimeoutError(
+                    "Превышено время ожидания в очереди запросов к LLM."
+                ) from exc
+            raise
+        self.wait_seconds.observe(time.perf_counter() - start)
+
+    def release(self) -> None:
+        """Освобождает слот или передаёт его самому приоритетному ожидающему."""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._queued -= 1
+            future.set_result(None)
+            return
+        self._in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int = LLMPriority.GENERATE) -> AsyncIterator[None]:
+        """Контекст выполнения одного вызова LLM."""
+        with span("llm_queue", "queue", priority=LLMPriority(priority).name):
+            await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def snapshot(self) -> dict:
+        """Текущее состояние планировщика для мониторинга."""
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queued": self._queued,
+            "rejected_total": self.rejected_total,
+            "timeouts_total": self.timeouts_total,
+            "wait_seconds": self.wait_seconds.snapshot(),
+            "queue_depth": self.queue_depth.snapshot(),
+        }
+
+
+_scheduler: LLMScheduler | None = None
+
+
+def get_scheduler() -> LLMScheduler:
+    """Возвращает singleton-планировщик, настроенный из Settings."""
+    global _scheduler
+    if _scheduler is None:
+        settings = get_settings()
+        _scheduler = LLMScheduler(
+            max_in_flight=settings.llm_max_in_flight,
+            max_queue=settings.llm_max_queue,
+            queue_timeout=settings.llm_queue_timeout_seconds,
+        )
+    return _scheduler
+
+
+def reset_scheduler() -> None:
+    """Сбрасывает singleton-планировщик (для тестов и перезагрузки настроек)."""
+    global _scheduler
+    _scheduler = None
+
+
+def llm_slot(priority: int = LLMPriority.GENERATE):
+    """Shortcut: слот выполнения в глобальном планировщике."""
+    return get_scheduler().slot(priority)
@@ -1,24 +1,89 @@
 """FastAPI-приложение: эндпоинты крипто-консультанта."""
 
 import asyncio
+import logging
 import uuid
+from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import Any, Literal
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from langchain_core.messages import HumanMessage
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
-from app.agent.graph import agent_graph
+from app.agent.history import (
+    needs_compaction,
+    schedule_history_compaction,
+    wait_for_background_compaction,
+)
 from app.config import get_settings, require_gigachat_credentials
-from app.llm.gigachat import close_llm
+from app.llm.gigachat import (
+    close_llm,
+    llm_pool_snapshot,
+    start_llm_maintenance,
+    stop_llm_maintenance,
+    warmup_llm,
+)
+from app.llm.scheduler import LLMOverloadedError, get_scheduler
+from app.market_snapshot import (
+    reset_market_snapshot,
+    start_market_snapshot,
+    stop_market_snapshot,
+)
+from app.metrics import REGISTRY, TIMEOUTS
+from app.recording import close_record_writer, record_request
+from app.singleflight import batch_flights
+from app.thread_queue import get_thread_queue
+from app.tracing import get_trace_store, render_waterfall, reset_trace_store, trace_request
+
+LOGGER = logging.getLogger(__name__)
+OVERLOADED_DETAIL = "Сервис перегружен. Попробуйте повторить запрос позже."
+
+# Скомпилированный граф агента. Собирается в lifespan (или при первом запросе,
+# если приложение запущено без него): импорт LangGraph и узлов графа не
+# замедляет импорт модуля.
+agent_graph: Any = None
+
+
+def get_graph() -> Any:
+    """Возвращает граф агента, компилируя его при первом обращении."""
+    global agent_graph
+    if agent_graph is None:
+        from app.agent.graph import get_agent_graph
+
+        agent_graph = get_agent_graph()
+    return agent_graph
 
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
+    get_graph()
+    snapshot_publisher = await start_market_snapshot()
+    maintenance = None
+    if get_settings().llm_warmup_enabled:
+        try:
+            await warmup_llm()
+            maintenance = start_llm_maintenance()
+        except Exception:
+            LOGGER.warning("[llm] warm-up failed, client will be built lazily", exc_info=True)
     try:
         yield
     finally:
+        await wait_for_background_compaction()
+        if maintenance is not None:
+            await stop_llm_maintenance(maintenance)
         await close_llm()
+        if snapshot_publisher is not None:
+            await stop_market_snapshot(snapshot_publisher)
+        reset_market_snapshot()
+        reset_trace_store()
+        close_record_writer()
+        if agent_graph is not None:
+            from app.agent.checkpoint import close_checkpointer
+
+            close_checkpointer(agent_graph.checkpointer)
 
 
 app = FastAPI(
@@ -44,33 +109,153 @@ class ChatResponse(BaseModel):
     intent: str
 
 
+class ChatBatchRequest(BaseModel):
+    """Пакет вопросов; concurrency не может превышать CHAT_BATCH_CONCURRENCY."""
+
+    items: list[ChatRequest] = Field(min_length=1)
+    concurrency: int | None = Field(default=None, ge=1)
+
+
+class ChatBatchItem(BaseModel):
+    """Результат одного элемента пакета: HTTP-статус, время и ответ или ошибка."""
+
+    index: int
+    status: int
+    elapsed_ms: float
+    result: ChatResponse | None = None
+    error: str | None = None
+
+
+class ChatBatchResponse(BaseModel):
+    """Результаты пакета в порядке элементов запроса."""
+
+    results: list[ChatBatchItem]
+
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """Основной эндпоинт чата с крипто-консультантом."""
     require_gigachat_credentials()
+    return await _run_chat(request)
+
+
+@app.post("/chat/batch", response_model=None)
+async def chat_batch(
+    request: ChatBatchRequest, stream: bool = False
+) -> ChatBatchResponse | StreamingResponse:
+    """Пакет вопросов с ограниченной параллельностью.
+
+    Одинаковые внешние запросы (цена, новости, поиск) выполняются один раз на пакет.
+    С `?stream=true` результаты отдаются NDJSON по мере готовности, иначе — списком
+    в порядке элементов.
+    """
+    require_gigachat_credentials()
+    settings = get_settings()
+    if len(request.items) > settings.chat_batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Слишком много элементов в пакете: максимум {settings.chat_batch_max_items}.",
+        )
+    limit = max(1, settings.chat_batch_concurrency)
+    if request.concurrency is not None:
+        limit = min(limit, request.concurrency)
+    results = _run_batch(request.items, limit)
+    if stream:
+        return StreamingResponse(
+            (item.model_dump_json() + "\n" async for item in results),
+            media_type="application/x-ndjson",
+        )
+    collected = [item async for item in results]
+    return ChatBatchResponse(results=sorted(collected, key=lambda item: item.index))
+
+
+async def _run_batch(items: list[ChatRequest], limit: int) -> AsyncIterator[ChatBatchItem]:
+    """Прогоняет элементы пакета не более `limit` одновременно; отдаёт по готовности."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(index: int, item: ChatRequest) -> ChatBatchItem:
+        async with semaphore:
+            start = perf_counter()
+            try:
+                response = await _run_chat(item)
+            except HTTPException as exc:
+                status, error, response = exc.status_code, str(exc.detail), None
+            except Exception as exc:
+                LOGGER.exception("[batch] item %d failed", index)
+                status, error, response = 500, str(exc) or type(exc).__name__, None
+            else:
+                status, error = 200, None
+            return ChatBatchItem(
+                index=index,
+                status=status,
+                elapsed_ms=round((perf_counter() - start) * 1000, 1),
+                result=response,
+                error=error,
+            )
+
+    # Задачи наследуют область дедупликации из контекста, в котором созданы.
+    with batch_flights():
+        tasks = [asyncio.create_task(run(i, item)) for i, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _run_chat(request: ChatRequest) -> ChatResponse:
+    """Один ход диалога через граф; ошибки — HTTPException с кодом ответа."""
+    if get_scheduler().is_saturated():
+        raise HTTPException(
+            status_code=503, detail=OVERLOADED_DETAIL, headers={"Retry-After": "1"}
+        )
 
     thread_id = request.thread_id or str(uuid.uuid4())
 
     config = {"configurable": {"thread_id": thread_id}}
 
-    input_state = {
-        "messages": [HumanMessage(content=request.message)],
-        "user_query": request.message,
-        "thread_id": thread_id,
-    }
+    async def run_turn(message: str) -> dict:
+        input_state = {
+            "messages": [HumanMessage(content=message)],
+            "user_query": message,
+            "thread_id": thread_id,
+        }
+        from app.agent.fast_path import run_turn as run_graph_turn
 
-    try:
-        result = await asyncio.wait_for(
-            agent_graph.ainvoke(input_state, config=config),
+        return await asyncio.wait_for(
+            run_graph_turn(get_graph(), input_state, config),
             timeout=get_settings().graph_timeout_seconds,
         )
-    except asyncio.TimeoutError as exc:
-        raise HTTPException(
-            status_code=504,
-            detail="Таймаут обработки запроса. Попробуйте повторить запрос.",
-        ) from exc
-    except RuntimeError as exc:
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+    with (
+        record_request(thread_id, request.message) as recording,
+        trace_request(thread_id, query=request.message[:80]) as trace,
+    ):
+        try:
+            # Ходы одного диалога не идут параллельно (CHAT_THREAD_MODE); таймаут
+            # графа отсчитывается от начала своего прогона, а не от постановки в очередь.
+            result = await get_thread_queue().run(thread_id, request.message, run_turn)
+        except asyncio.TimeoutError as exc:
+            TIMEOUTS.inc("graph")
+            trace.set(status=504)
+            raise HTTPException(
+                status_code=504,
+                detail="Таймаут обработки запроса. Попробуйте повторить запрос.",
+            ) from exc
+        except LLMOverloadedError as exc:
+            trace.set(status=503)
+            raise HTTPException(
+                status_code=503, detail=OVERLOADED_DETAIL, headers={"Retry-After": "1"}
+            ) from exc
+        except RuntimeError as exc:
+            trace.set(status=500)
+            raise HTTPException(status_code=500, detail=str(exc)) from exc
+        trace.set(status=200, intent=result.get("intent", "unknown"))
+        recording.set(status=200, intent=result.get("intent"), response=result.get("response"))
+
+    if needs_compaction(result.get("messages", [])):
+        schedule_history_compaction(get_graph(), thread_id)
 
     return ChatResponse(
         response=result.get("response", "Не удалось получить ответ."),
@@ -83,3 +268,40 @@ async def chat(request: ChatRequest):
 async def health():
     """Проверка работоспособности сервиса."""
     return {"status": "ok"}
+
+
+@app.get("/llm/scheduler")
+async def llm_scheduler_stats():
+    """Состояние очереди LLM: занятость, отказы, гистограммы ожидания и глубины."""
+    return get_scheduler().snapshot()
+
+
+@app.get("/checkpointer")
+async def checkpointer_stats():
+    """Хранилище состояния диалогов: число диалогов и оценка занятой памяти."""
+    return await asyncio.to_thread(get_graph().checkpointer.stats)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Метрики в текстовом формате Prometheus: задержки узлов, внешних API и LLM."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/traces/{thread_id}", response_model=None)
+async def debug_traces(
+    thread_id: str, limit: int = 5, format: Literal["text", "json"] = "text"
+) -> PlainTextResponse | list[dict]:
+    """Последние трейсы диалога: waterfall узлов, внешних вызовов и LLM."""
+    traces = get_trace_store().latest(thread_id, limit=max(1, limit))
+    if not traces:
+        raise HTTPException(status_code=404, detail="Трейсы для диалога не найдены.")
+    if format == "json":
+        return traces
+    return PlainTextResponse(render_waterfall(traces))
+
+
+@app.get("/llm/pool")
+async def llm_pool_stats():
+    """Состояние пула клиентов GigaChat: здоровье, EWMA задержки и доля ошибок."""
+    return llm_pool_snapshot()
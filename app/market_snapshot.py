@@ -0,0 +1,322 @@
+"""Снимок цен монет в разделяемой памяти, общий для всех процессов API.
+
+Один процесс-публикатор раз в `MARKET_SNAPSHOT_INTERVAL_SECONDS` получает цены
+всех монет снимка одним запросом к CoinGecko и пишет их в сегмент
+`multiprocessing.shared_memory` фиксированной раскладки. Остальные процессы
+(воркеры кластера или uvicorn) читают цену прямо из сегмента, без своих
+HTTP-запросов. Чтение согласовано через seqlock: на время записи публикатор
+делает счётчик версии нечётным, а читатель повторяет чтение, если счётчик был
+нечётным или изменился за время чтения.
+
+Публикатором становится процесс, первым захвативший файловую блокировку снимка
+(в кластере это входной процесс). Остальные процессы только читают.
+"""
+
+import asyncio
+import fcntl
+import logging
+import math
+import os
+import struct
+import tempfile
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import IO, Any
+
+from app.config import get_settings
+from app.metrics import CACHE_REQUESTS
+from app.tools.coingecko import TICKER_MAP, get_markets, resolve_coin_id
+
+LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"CMS1"
+# Заголовок: magic и вместимость; версия (seqlock); время публикации и число монет.
+PREFIX = struct.Struct("<4sI")
+VERSION = struct.Struct("<Q")
+BODY = struct.Struct("<dI4x")
+VERSION_OFFSET = PREFIX.size
+BODY_OFFSET = VERSION_OFFSET + VERSION.size
+HEADER_SIZE = BODY_OFFSET + BODY.size
+# Слот монеты: CoinGecko ID, название, тикер, цена, изменение за 24ч, капитализация, объём.
+SLOT = struct.Struct("<40s40s16sdddd")
+READ_ATTEMPTS = 100
+ATTACH_RETRY_SECONDS = 1.0
+
+
+def default_coins() -> list[str]:
+    """Монеты снимка по умолчанию — все CoinGecko ID из TICKER_MAP."""
+    return list(dict.fromkeys(TICKER_MAP.values()))
+
+
+def _encode(value: Any, size: int) -> bytes:
+    return str(value or "").encode("utf-8")[:size]
+
+
+def _decode(raw: bytes) -> str:
+    return raw.rstrip(b"\0").decode("utf-8", errors="ignore")
+
+
+def _to_float(value: Any) -> float:
+    return math.nan if value is None else float(value)
+
+
+def _from_float(value: float) -> float | None:
+    return None if math.isnan(value) else value
+
+
+def _open_untracked(name: str) -> shared_memory.SharedMemory:
+    """Подключается к сегменту так, чтобы выход читателя его не удалил."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # До Python 3.13 resource_tracker считает подключившийся процесс владельцем
+        # сегмента и удаляет сегмент при выходе этого процесса.
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class MarketSnapshot:
+    """Сегмент разделяемой памяти со слотами цен монет."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool = False):
+        magic, capacity = PREFIX.unpack_from(shm.buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Сегмент {shm.name} не является снимком рынка.")
+        self._shm = shm
+        self.owner = owner
+        self.capacity = capacity
+        # Индекс coin_id -> слот, построенный для версии _index_version.
+        self._index: dict[str, int] = {}
+        self._index_version = -1
+
+    @classmethod
+    def create(cls, name: str, capacity: int) -> "MarketSnapshot":
+        """Создаёт сегмент на `capacity` монет (или переиспользует оставшийся от прошлого запуска)."""
+        size = HEADER_SIZE + capacity * SLOT.size
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            shm = shared_memory.SharedMemory(name=name)
+            capacity = min(capacity, (shm.size - HEADER_SIZE) // SLOT.size)
+        PREFIX.pack_into(shm.buf, 0, MAGIC, capacity)
+        VERSION.pack_into(shm.buf, VERSION_OFFSET, 0)
+        BODY.pack_into(shm.buf, BODY_OFFSET, 0.0, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "MarketSnapshot":
+        """Подключается к сегменту публикатора; FileNotFoundError, если его ещё нет."""
+        return cls(_open_untracked(name))
+
+    @property
+    def version(self) -> int:
+        return VERSION.unpack_from(self._shm.buf, VERSION_OFFSET)[0]
+
+    @property
+    def published_at(self) -> float:
+        """Время последней публикации (time.time()) или 0.0, если публикаций не было."""
+        return BODY.unpack_from(self._shm.buf, BODY_OFFSET)[0]
+
+    def publish(self, entries: dict[str, dict], now: float | None = None) -> None:
+        """Записывает цены монет (CoinGecko ID -> данные как у get_price)."""
+        buf = self._shm.buf
+        items = list(entries.items())[: self.capacity]
+        version = self.version
+        VERSION.pack_into(buf, VERSION_OFFSET, version + 1)
+        try:
+            for slot, (coin_id, entry) in enumerate(items):
+                SLOT.pack_into(
+                    buf,
+                    HEADER_SIZE + slot * SLOT.size,
+                    _encode(coin_id, 40),
+                    _encode(entry.get("name"), 40),
+                    _encode(entry.get("symbol"), 16),
+                    _to_float(entry.get("price_usd")),
+                    _to_float(entry.get("price_change_24h_pct")),
+                    _to_float(entry.get("market_cap_usd")),
+                    _to_float(entry.get("total_volume_usd")),
+                )
+            BODY.pack_into(buf, BODY_OFFSET, time.time() if now is None else now, len(items))
+        finally:
+            VERSION.pack_into(buf, VERSION_OFFSET, version + 2)
+
+    def read(self, coin_id: str) -> tuple[dict, float] | None:
+        """Данные монеты и время публикации; None, если монеты нет или запись не закончилась."""
+        buf = self._shm.buf
+        for _ in range(READ_ATTEMPTS):
+            version = VERSION.unpack_from(buf, VERSION_OFFSET)[0]
+            if version % 2:
+                continue
+            published_at, count = BODY.unpack_from(buf, BODY_OFFSET)
+            slot = self._slot(coin_id, version, count)
+            fields = SLOT.unpack_from(buf, HEADER_SIZE + slot * SLOT.size) if slot is not None else None
+            if VERSION.unpack_from(buf, VERSION_OFFSET)[0] != version:
+                self._index_version = -1
+                continue
+            if fields is None:
+                return None
+            _, name, symbol, price, change_24h, market_cap, volume = fields
+            data = {
+                "name": _decode(name),
+                "symbol": _decode(symbol),
+                "price_usd": _from_float(price),
+                "price_change_24h_pct": _from_float(change_24h),
+                "market_cap_usd": _from_float(market_cap),
+                "total_volume_usd": _from_float(volume),
+            }
+            return data, published_at
+        return None
+
+    def _slot(self, coin_id: str, version: int, count: int) -> int | None:
+        if self._index_version != version:
+            buf = self._shm.buf
+            self._index = {
+                _decode(SLOT.unpack_from(buf, HEADER_SIZE + slot * SLOT.size)[0]): slot
+                for slot in range(min(count, self.capacity))
+            }
+            self._index_version = version
+        return self._index.get(coin_id)
+
+    def close(self) -> None:
+        self._shm.close()
+
+    def unlink(self) -> None:
+        self._shm.unlink()
+
+
+class SnapshotPublisher:
+    """Фоновое обновление снимка; держит блокировку публикатора."""
+
+    def __init__(
+        self,
+        snapshot: MarketSnapshot,
+        coins: list[str],
+        interval: float,
+        lock: IO | None = None,
+    ):
+        self.snapshot = snapshot
+        self.coins = coins
+        self.interval = interval
+        self._lock = lock
+        self._task: asyncio.Task | None = None
+
+    async def refresh(self) -> None:
+        entries = await get_markets(self.coins)
+        self.snapshot.publish(entries)
+        missing = set(self.coins) - set(entries)
+        if missing:
+            LOGGER.debug("[snapshot] CoinGecko returned no data for %s", sorted(missing))
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as exc:
+                LOGGER.warning("[snapshot] refresh failed: %s", exc)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run(), name="market-snapshot")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.snapshot.close()
+        self.snapshot.unlink()
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+
+
+def _acquire_publisher_lock(name: str) -> IO | None:
+    """Файловая блокировка публикатора снимка или None, если её держит другой процесс."""
+    lock = open(os.path.join(tempfile.gettempdir(), f"{name}.lock"), "a")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return None
+    return lock
+
+
+# ─── Снимок процесса ───
+
+_snapshot: MarketSnapshot | None = None
+_attach_retry_at = 0.0
+
+
+async def start_market_snapshot() -> SnapshotPublisher | None:
+    """Запускает публикатор снимка, если этот процесс первым захватил блокировку."""
+    global _snapshot
+    settings = get_settings()
+    if not settings.market_snapshot_enabled:
+        return None
+    name = settings.market_snapshot_name
+    lock = _acquire_publisher_lock(name)
+    if lock is None:
+        LOGGER.info("[snapshot] reading %s published by another process", name)
+        return None
+    coins = [resolve_coin_id(coin) for coin in settings.market_snapshot_coins] or default_coins()
+    reset_market_snapshot()
+    _snapshot = MarketSnapshot.create(name, len(coins))
+    publisher = SnapshotPublisher(
+        _snapshot, coins, settings.market_snapshot_interval_seconds, lock=lock
+    )
+    publisher.start()
+    LOGGER.info("[snapshot] publishing %d coins to %s", len(coins), name)
+    return publisher
+
+
+async def stop_market_snapshot(publisher: SnapshotPublisher) -> None:
+    """Останавливает публикатор и удаляет сегмент снимка."""
+    global _snapshot
+    if _snapshot is publisher.snapshot:
+        _snapshot = None
+    await publisher.stop()
+
+
+def get_market_snapshot() -> MarketSnapshot | None:
+    """Снимок этого процесса: свой (публикатор) или подключённый сегмент публикатора."""
+    global _snapshot, _attach_retry_at
+    if _snapshot is None and time.monotonic() >= _attach_retry_at:
+        try:
+            _snapshot = MarketSnapshot.attach(get_settings().market_snapshot_name)
+        except (FileNotFoundError, ValueError):
+            _attach_retry_at = time.monotonic() + ATTACH_RETRY_SECONDS
+    return _snapshot
+
+
+def reset_market_snapshot() -> None:
+    """Отключается от сегмента чтения (сегмент публикатора закрывает stop_market_snapshot)."""
+    global _snapshot, _attach_retry_at
+    if _snapshot is not None and not _snapshot.owner:
+        _snapshot.close()
+    _snapshot = None
+    _attach_retry_at = 0.0
+
+
+def lookup_price(coin: str) -> dict | None:
+    """Цена монеты из снимка; None — снимок выключен, устарел или монеты в нём нет."""
+    global _snapshot, _attach_retry_at
+    settings = get_settings()
+    if not settings.market_snapshot_enabled:
+        return None
+    max_age = settings.market_snapshot_max_age_seconds
+    snapshot = get_market_snapshot()
+    if snapshot is not None and not snapshot.owner and time.time() - snapshot.published_at > max_age:
+        # Публикатор мог перезапуститься с новым сегментом: переподключимся позже.
+        snapshot.close()
+        snapshot = _snapshot = None
+        _attach_retry_at = time.monotonic() + ATTACH_RETRY_SECONDS
+    found = snapshot.read(resolve_coin_id(coin)) if snapshot is not None else None
+    if found is not None and time.time() - found[1] <= max_age:
+        CACHE_REQUESTS.inc("market_snapshot", "hit")
+        return found[0]
+    CACHE_REQUESTS.inc("market_snapshot", "miss")
+    return None
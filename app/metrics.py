@@ -0,0 +1,227 @@
+"""Метрики приложения: гистограммы и счётчики в текстовом формате Prometheus.
+
+Без внешних зависимостей и блокировок: всё обновляется из event loop, наблюдение —
+поиск бакета и пара инкрементов. Отдаются эндпоинтом `/metrics`.
+"""
+
+from bisect import bisect_left
+from typing import Any
+
+LATENCY_BUCKETS_SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами бакетов."""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Учитывает одно наблюдение."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        """Возвращает кумулятивные счётчики по бакетам, сумму и количество."""
+        cumulative: dict[str, int] = {}
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = self.count
+        return {"buckets": cumulative, "sum": self.total, "count": self.count}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class LabeledHistogram:
+    """Семейство гистограмм с метками; значения меток передаются позиционно."""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: tuple[str, ...], buckets: tuple[float, ...]
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._children: dict[tuple[str, ...], Histogram] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Учитывает наблюдение для набора меток."""
+        child = self._children.get(labels)
+        if child is None:
+            child = self._children[labels] = Histogram(self.buckets)
+        # Тело Histogram.observe встроено: это горячий путь каждого шага графа.
+        child.counts[bisect_left(self.buckets, value)] += 1
+        child.total += value
+        child.count += 1
+
+    def get(self, *labels: str) -> Histogram | None:
+        return self._children.get(labels)
+
+    def clear(self) -> None:
+        self._children.clear()
+
+    def render(self) -> list[str]:
+        lines = []
+        for labels, hist in sorted(self._children.items()):
+            running = 0
+            for bound, count in zip(hist.buckets, hist.counts):
+                running += count
+                le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {running}")
+            le = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {hist.count}")
+            base = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{base} {hist.total}")
+            lines.append(f"{self.name}_count{base} {hist.count}")
+        return lines
+
+
+class Counter:
+    """Монотонный счётчик с метками."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """Увеличивает счётчик для набора меток."""
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def clear(self) -> None:
+        self._values.clear()
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in sorted(self._values.items())
+        ]
+
+
+class MetricsRegistry:
+    """Набор метрик приложения и их сериализация в text exposition format."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, LabeledHistogram | Counter] = {}
+
+    def _register(self, metric: Any) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика уже зарегистрирована: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS_SECONDS,
+    ) -> LabeledHistogram:
+        return self._register(LabeledHistogram(name, documentation, labelnames, buckets))
+
+    def counter(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = ()
+    ) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def clear(self) -> None:
+        """Обнуляет все метрики (для тестов)."""
+        for metric in self._metrics.values():
+            metric.clear()
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+NODE_SECONDS = REGISTRY.histogram(
+    "crypto_graph_node_seconds", "Время выполнения узлов и роутеров графа.", ("node",)
+)
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    "crypto_upstream_request_seconds",
+    "Время вызовов внешних API по цели из _api_calls.",
+    ("target", "outcome"),
+)
+LLM_SECONDS = REGISTRY.histogram(
+    "crypto_llm_request_seconds",
+    "Время успешных вызовов LLM по роли (classify, route, generate, analyze, summarize).",
+    ("role",),
+)
+LLM_TOKENS = REGISTRY.counter(
+    "crypto_llm_tokens_total",
+    "Токены LLM по роли: input, output и cached (префикс из кэша сессии).",
+    ("role", "kind"),
+)
+INTENTS = REGISTRY.counter("crypto_intent_total", "Распределение запросов по intent.", ("intent",))
+CACHE_REQUESTS = REGISTRY.counter(
+    "crypto_cache_requests_total", "Обращения к кэшам: hit или miss.", ("cache", "result")
+)
+RESPONSE_RENDERS = REGISTRY.counter(
+    "crypto_response_render_total",
+    "Финальные ответы generate_response по intent и способу: template или llm.",
+    ("intent", "renderer"),
+)
+CHAT_THREAD_TURNS = REGISTRY.counter(
+    "crypto_chat_thread_turns_total",
+    "Запросы /chat по очереди диалога: direct, queued (ждал прогон) или coalesced (склеен).",
+    ("outcome",),
+)
+TIMEOUTS = REGISTRY.counter("crypto_timeouts_total", "Таймауты по этапам обработки.", ("stage",))
+
+
+def record_llm_call(role: str, latency: float, result: Any) -> None:
+    """Учитывает задержку вызова LLM и токены из `usage_metadata` ответа.
+
+    Каждая роль LLM вызывается ровно одним узлом графа (classify — classify_intent,
+    route — route_needs_search и т.д.), поэтому метка роли совпадает с меткой узла
+    без передачи имени узла через contextvar на каждом шаге.
+    """
+    LLM_SECONDS.observe(latency, role)
+    usage = llm_usage(result)
+    if usage is None:
+        return
+    LLM_TOKENS.inc(role, "input", amount=usage["input_tokens"])
+    LLM_TOKENS.inc(role, "output", amount=usage["output_tokens"])
+    LLM_TOKENS.inc(role, "cached", amount=usage["cached_tokens"])
+    CACHE_REQUESTS.inc("llm_session", "hit" if usage["cached_tokens"] else "miss")
+
+
+def llm_usage(result: Any) -> dict[str, int] | None:
+    """Токены ответа LLM из `usage_metadata` или None, если их нет."""
+    usage = getattr(result, "usage_metadata", None)
+    if not isinstance(usage, dict):
+        return None
+    return {
+        "input_tokens": usage.get("input_tokens") or 0,
+        "output_tokens": usage.get("output_tokens") or 0,
+        "cached_tokens": (usage.get("input_token_details") or {}).get("cache_read") or 0,
+    }
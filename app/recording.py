@@ -0,0 +1,320 @@
+"""Запись запросов `/chat` и их детерминированное воспроизведение.
+
+С `RECORD_TRACE_PATH` каждый запрос `/chat` дописывается в JSONL-файл одной
+строкой: вопрос, thread_id, момент прихода, итог (статус, intent, ответ) и все
+ответы внешних API (`_call_upstream`) и LLM (`LLMPool.ainvoke`) с моментом
+начала и длительностью. `replay_request` подставляет записанные ответы в те же
+точки: граф проходит тот же путь без сети, мгновенно или с исходными
+задержками. Ответ ищется по цели вызова и её аргументу (монета, поисковый
+запрос), ответы LLM — по роли в порядке вызовов. Активная запись или
+воспроизведение хранится в contextvar и наследуется задачами графа.
+
+Снимок рынка в разделяемой памяти (`MARKET_SNAPSHOT_ENABLED`) внешним вызовом
+не считается и не записывается. Файл пишет фоновый поток (`RecordWriter`), чтобы
+запись на диск не блокировала event loop.
+"""
+
+import asyncio
+import copy
+import inspect
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, TypeVar
+
+from langchain_core.messages import AIMessage
+
+from app.config import get_settings
+
+LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Записей в очереди на запись; при переполнении новые записи в файл не попадают.
+WRITE_QUEUE_SIZE = 1024
+
+
+class ReplayMismatchError(RuntimeError):
+    """В записи нет ответа для вызова, который сделал воспроизводимый прогон."""
+
+
+class ReplayedError(RuntimeError):
+    """Ошибка внешнего вызова, записанная при исходном прогоне."""
+
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _key_id(kind: str, name: str, key: Any) -> str:
+    return json.dumps([kind, name, key], ensure_ascii=False, default=str)
+
+
+def _to_json(value: Any) -> Any:
+    """Копия значения в виде, в каком оно попадёт в файл (кортежи — списками)."""
+    return json.loads(json.dumps(value, ensure_ascii=False, default=str))
+
+
+def _dump_message(message: Any) -> dict:
+    data = {"content": message.content}
+    if getattr(message, "tool_calls", None):
+        data["tool_calls"] = message.tool_calls
+    if getattr(message, "usage_metadata", None):
+        data["usage_metadata"] = dict(message.usage_metadata)
+    return data
+
+
+class Recording:
+    """Запись одного запроса: вопрос, итог и внешние вызовы в порядке начала."""
+
+    def __init__(self, thread_id: str, message: str):
+        self.thread_id = thread_id
+        self.message = message
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.duration_ms: float | None = None
+        self.attrs: dict[str, Any] = {}
+        self.calls: list[dict] = []
+
+    def set(self, **attrs: Any) -> None:
+        """Добавляет итог запроса (status, intent, response)."""
+        self.attrs.update(attrs)
+
+    async def upstream(self, target: str, key: Any, call: Awaitable[T]) -> T:
+        return await self._capture("upstream", target, key, call)
+
+    async def llm(self, role: str, call: Awaitable[T]) -> T:
+        return await self._capture("llm", role, None, call)
+
+    async def _capture(self, kind: str, name: str, key: Any, call: Awaitable[T]) -> T:
+        start = time.perf_counter()
+        entry: dict[str, Any] = {"kind": kind, "name": name}
+        if key is not None:
+            entry["key"] = _to_json(key)
+        entry["offset_ms"] = round((start - self.origin) * 1000, 1)
+        self.calls.append(entry)
+        try:
+            result = await call
+        except asyncio.CancelledError:
+            entry["cancelled"] = True
+            raise
+        except Exception as exc:
+            entry["error"] = {"type": type(exc).__name__, "message": str(exc)}
+            status_code = getattr(exc, "status_code", None)
+            if isinstance(status_code, int):
+                entry["error"]["status_code"] = status_code
+            raise
+        finally:
+            entry["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        # Узлы дописывают служебные ключи в полученные данные — снимаем копию сразу.
+        entry["result"] = _dump_message(result) if kind == "llm" else _to_json(result)
+        return result
+
+    def to_dict(self) -> dict:
+        return {
+            "thread_id": self.thread_id,
+            "message": self.message,
+            "started_at": round(self.started_at, 3),
+            "duration_ms": self.duration_ms,
+            **self.attrs,
+            "calls": self.calls,
+        }
+
+
+class Replay:
+    """Отдаёт записанные ответы вместо внешних вызовов одного запроса."""
+
+    def __init__(self, record: dict, realtime: bool = False, speed: float = 1.0):
+        self.realtime = realtime
+        self.speed = speed
+        self.unmatched: list[str] = []
+        self._queues: dict[str, deque[dict]] = {}
+        for entry in record.get("calls", []):
+            key_id = _key_id(entry["kind"], entry["name"], entry.get("key"))
+            self._queues.setdefault(key_id, deque()).append(entry)
+
+    @property
+    def unused(self) -> int:
+        """Сколько записанных ответов прогон так и не запросил."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def upstream(self, target: str, key: Any, call: Awaitable[T]) -> T:
+        return await self._replay("upstream", target, key, call)
+
+    async def llm(self, role: str, call: Awaitable[T]) -> AIMessage:
+        return AIMessage(**await self._replay("llm", role, None, call))
+
+    async def _replay(self, kind: str, name: str, key: Any, call: Awaitable[Any]) -> Any:
+        if inspect.iscoroutine(call):
+            call.close()
+        queue = self._queues.get(_key_id(kind, name, key))
+        if not queue:
+            self.unmatched.append(f"{kind}:{name}")
+            raise ReplayMismatchError(f"Нет записанного ответа: {kind}:{name} key={key!r}")
+        entry = queue.popleft()
+        if self.realtime and entry.get("duration_ms"):
+            await asyncio.sleep(entry["duration_ms"] / 1000 / self.speed)
+        if entry.get("cancelled"):
+            raise TimeoutError(f"{kind}:{name} не завершился при записи")
+        if "error" in entry:
+            raise ReplayedError(entry["error"]["message"], entry["error"].get("status_code"))
+        return copy.deepcopy(entry["result"])
+
+
+class _NullRecording:
+    """Заглушка, когда запись выключена."""
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+
+NULL_RECORDING = _NullRecording()
+# Запись или воспроизведение текущего запроса; None — вызовы идут как обычно.
+_TAPE: ContextVar[Recording | Replay | None] = ContextVar("recording_tape", default=None)
+
+
+def current_tape() -> Recording | Replay | None:
+    """Активная запись или воспроизведение текущего запроса."""
+    return _TAPE.get()
+
+
+class RecordWriter:
+    """Дописывает записи в JSONL-файл из фонового потока через ограниченную очередь."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.dropped = 0
+        self._queue: queue.Queue[dict | None] = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def put(self, record: dict) -> None:
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOGGER.warning(
+                "[record] write queue full, request dropped | thread_id=%r",
+                record.get("thread_id"),
+            )
+
+    def flush(self) -> None:
+        """Ждёт, пока фоновый поток допишет записи из очереди."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Дописывает очередь и останавливает фоновый поток."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._write_loop, name="record-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _write_loop(self) -> None:
+        """Забирает из очереди всё накопившееся и дописывает одним открытием файла."""
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [record for record in batch if record is not None]
+            try:
+                if records:
+                    self._write(records)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(records) < len(batch):
+                return
+
+    def _write(self, records: list[dict]) -> None:
+        lines = "".join(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+            for record in records
+        )
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as fh:
+                fh.write(lines)
+        except OSError:
+            LOGGER.warning("[record] write to %s failed", self.path, exc_info=True)
+
+
+_writer: RecordWriter | None = None
+
+
+def get_record_writer(path: str | Path) -> RecordWriter:
+    """Писатель для файла записей; при смене пути прежний закрывается."""
+    global _writer
+    if _writer is None or _writer.path != Path(path):
+        if _writer is not None:
+            _writer.close()
+        _writer = RecordWriter(path)
+    return _writer
+
+
+def close_record_writer() -> None:
+    """Дописывает накопленные записи и останавливает поток (при остановке приложения)."""
+    global _writer
+    if _writer is not None:
+        _writer.close()
+    _writer = None
+
+
+@contextmanager
+def record_request(thread_id: str, message: str) -> Iterator[Recording | _NullRecording]:
+    """Записывает запрос в `RECORD_TRACE_PATH`; без настройки — заглушка."""
+    path = get_settings().record_trace_path
+    if not path or _TAPE.get() is not None:
+        yield NULL_RECORDING
+        return
+    recording = Recording(thread_id, message)
+    token = _TAPE.set(recording)
+    try:
+        yield recording
+    except BaseException as exc:
+        recording.attrs.setdefault("status", getattr(exc, "status_code", 500))
+        raise
+    finally:
+        _TAPE.reset(token)
+        recording.duration_ms = round((time.perf_counter() - recording.origin) * 1000, 1)
+        get_record_writer(path).put(recording.to_dict())
+
+
+@contextmanager
+def replay_request(record: dict, realtime: bool = False, speed: float = 1.0) -> Iterator[Replay]:
+    """Воспроизводит записанный запрос: внешние вызовы внутри блока берутся из записи."""
+    replay = Replay(record, realtime=realtime, speed=speed)
+    token = _TAPE.set(replay)
+    try:
+        yield replay
+    finally:
+        _TAPE.reset(token)
+
+
+def load_records(path: str | Path) -> list[dict]:
+    """Записи из JSONL-файла в порядке прихода запросов."""
+    with open(path, encoding="utf-8") as fh:
+        records = [json.loads(line) for line in fh if line.strip()]
+    return sorted(records, key=lambda record: record["started_at"])
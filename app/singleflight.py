@@ -0,0 +1,89 @@
+"""Дедупликация одинаковых внешних вызовов внутри пакетного запроса.
+
+`/chat/batch` прогоняет элементы пакета внутри `batch_flights()`. Пока область
+активна, `_call_upstream` с ключом (цель + аргумент: монета, поисковый запрос)
+выполняет одинаковые вызовы один раз: остальные элементы ждут результат ведущего
+и получают его копию или то же исключение. Успешный результат живёт до конца
+пакета, ошибка — только для тех, кто уже ждал. Область хранится в contextvar и
+наследуется задачами графа; запросы вне пакета её не видят.
+"""
+
+import asyncio
+import copy
+import inspect
+from collections.abc import Awaitable, Hashable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TypeVar
+
+from app.metrics import CACHE_REQUESTS
+
+T = TypeVar("T")
+
+
+class Singleflight:
+    """Общие результаты вызовов по ключу на время одного пакета."""
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, call: Awaitable[T]) -> T:
+        """Выполняет `call` или ждёт уже идущий вызов с тем же ключом."""
+        try:
+            while (future := self._calls.get(key)) is not None:
+                try:
+                    result = await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    # Отменён ведущий вызов, а не мы — выполняем свой.
+                    if future.cancelled() and not asyncio.current_task().cancelling():
+                        continue
+                    raise
+                CACHE_REQUESTS.inc("batch_upstream", "hit")
+                return copy.deepcopy(result)
+            return await self._lead(key, call)
+        finally:
+            # Вызов, который так и не понадобился, закрываем без предупреждения
+            # «coroutine was never awaited».
+            if inspect.iscoroutine(call) and inspect.getcoroutinestate(call) == inspect.CORO_CREATED:
+                call.close()
+
+    async def _lead(self, key: Hashable, call: Awaitable[T]) -> T:
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        CACHE_REQUESTS.inc("batch_upstream", "miss")
+        try:
+            result = await call
+        except asyncio.CancelledError:
+            del self._calls[key]
+            future.cancel()
+            raise
+        except Exception as exc:
+            del self._calls[key]
+            future.set_exception(exc)
+            future.exception()  # помечаем исключение полученным, даже если ждущих нет
+            raise
+        future.set_result(result)
+        # Узлы дописывают служебные ключи в полученные данные: каждому — своя копия.
+        return copy.deepcopy(result)
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+_FLIGHTS: ContextVar[Singleflight | None] = ContextVar("batch_flights", default=None)
+
+
+@contextmanager
+def batch_flights() -> Iterator[Singleflight]:
+    """Открывает область дедупликации; задачи, созданные внутри, наследуют её."""
+    flights = Singleflight()
+    token = _FLIGHTS.set(flights)
+    try:
+        yield flights
+    finally:
+        _FLIGHTS.reset(token)
+
+
+def current_flights() -> Singleflight | None:
+    """Активная область дедупликации или None вне пакетного запроса."""
+    return _FLIGHTS.get()
@@ -0,0 +1,184 @@
+"""Очередь ходов диалога: не больше одного прогона графа на thread_id.
+
+Если пользователь быстро отправляет несколько сообщений, параллельные прогоны
+одного диалога гоняются за чекпоинт и каждый заново платит за классификацию и
+инструменты. Режимы (`CHAT_THREAD_MODE`):
+
+- `serialize` — прогоны одного диалога идут по очереди, в порядке поступления;
+- `coalesce` — сообщения, пришедшие, пока прогон идёт, склеиваются в один
+  следующий ход, и все их запросы получают его результат;
+- `off` — без ограничений.
+
+Служебные операции над состоянием диалога (сжатие истории) идут через
+`exclusive()`: в режимах `serialize` и `coalesce` они ждут идущий ход и
+задерживают следующий, но ходом не считаются.
+
+Состояние диалога живёт, только пока у него есть запросы в работе или в ожидании:
+последний вышедший запрос удаляет его, так что простаивающие диалоги памяти не
+занимают.
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Literal, TypeVar
+
+from app.config import get_settings
+from app.metrics import CHAT_THREAD_TURNS
+from app.tracing import span
+
+LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+ThreadMode = Literal["off", "serialize", "coalesce"]
+
+
+class CoalescedTurnCancelledError(RuntimeError):
+    """Объединённый ход отменён до завершения (например, клиент ведущего запроса отключился)."""
+
+
+@dataclass
+class _FollowUp:
+    """Следующий ход диалога, к которому присоединяются новые сообщения."""
+
+    messages: list[str] = field(default_factory=list)
+    future: asyncio.Future | None = None
+
+
+@dataclass
+class _ThreadSlot:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    follow_up: _FollowUp | None = None
+    users: int = 0
+
+
+class ThreadQueue:
+    """Сериализует (и при необходимости склеивает) ходы по thread_id."""
+
+    def __init__(self, mode: ThreadMode = "serialize", separator: str = "\n"):
+        self.mode = mode
+        self.separator = separator
+        self._slots: dict[str, _ThreadSlot] = {}
+
+    async def run(
+        self, thread_id: str, message: str, execute: Callable[[str], Awaitable[T]]
+    ) -> T:
+        """Выполняет `execute(message)` как ход диалога с учётом режима очереди."""
+        if self.mode == "off":
+            CHAT_THREAD_TURNS.inc("direct")
+            return await execute(message)
+
+        slot = self._enter(thread_id)
+        try:
+            if slot.users == 1:
+                # Других запросов у диалога нет: ни идущего прогона, ни ожидающих.
+                CHAT_THREAD_TURNS.inc("direct")
+                async with slot.lock:
+                    return await execute(message)
+            if self.mode == "serialize":
+                CHAT_THREAD_TURNS.inc("queued")
+                with span("thread", "queue"):
+                    await slot.lock.acquire()
+                try:
+                    return await execute(message)
+                finally:
+                    slot.lock.release()
+            return await self._coalesce(thread_id, slot, message, execute)
+        finally:
+            self._leave(thread_id, slot)
+
+    async def exclusive(self, thread_id: str, execute: Callable[[], Awaitable[T]]) -> T:
+        """Выполняет `execute()` между ходами диалога, не пересекаясь ни с одним из них."""
+        if self.mode == "off":
+            return await execute()
+        slot = self._enter(thread_id)
+        try:
+            async with slot.lock:
+                return await execute()
+        finally:
+            self._leave(thread_id, slot)
+
+    def _enter(self, thread_id: str) -> _ThreadSlot:
+        slot = self._slots.get(thread_id)
+        if slot is None:
+            slot = self._slots[thread_id] = _ThreadSlot()
+        slot.users += 1
+        return slot
+
+    def _leave(self, thread_id: str, slot: _ThreadSlot) -> None:
+        slot.users -= 1
+        if slot.users == 0:
+            del self._slots[thread_id]
+
+    async def _coalesce(
+        self,
+        thread_id: str,
+        slot: _ThreadSlot,
+        message: str,
+        execute: Callable[[str], Awaitable[T]],
+    ) -> T:
+        follow_up = slot.follow_up
+        if follow_up is not None:
+            # Ход уже собирается: добавляем сообщение и ждём общий результат.
+            CHAT_THREAD_TURNS.inc("coalesced")
+            follow_up.messages.append(message)
+            with span("thread", "queue", coalesced=True):
+                return await asyncio.shield(follow_up.future)
+
+        CHAT_THREAD_TURNS.inc("queued")
+        follow_up = slot.follow_up = _FollowUp(
+            messages=[message], future=asyncio.get_running_loop().create_future()
+        )
+        try:
+            with span("thread", "queue"):
+                await slot.lock.acquire()
+        except asyncio.CancelledError:
+            slot.follow_up = None
+            _fail(follow_up.future, CoalescedTurnCancelledError("Объединённый ход отменён."))
+            raise
+        # С этого момента ход закрыт: новые сообщения соберутся в следующий.
+        slot.follow_up = None
+        try:
+            if len(follow_up.messages) > 1:
+                LOGGER.info(
+                    "[thread] coalesced %d messages | thread_id=%r",
+                    len(follow_up.messages),
+                    thread_id,
+                )
+            result = await execute(self.separator.join(follow_up.messages))
+        except asyncio.CancelledError:
+            _fail(follow_up.future, CoalescedTurnCancelledError("Объединённый ход отменён."))
+            raise
+        except Exception as exc:
+            _fail(follow_up.future, exc)
+            raise
+        finally:
+            slot.lock.release()
+        follow_up.future.set_result(result)
+        return result
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+
+def _fail(future: asyncio.Future, exc: BaseException) -> None:
+    future.set_exception(exc)
+    future.exception()  # помечаем полученным, даже если присоединившихся нет
+
+
+_queue: ThreadQueue | None = None
+
+
+def get_thread_queue() -> ThreadQueue:
+    """Возвращает singleton-очередь ходов, настроенную из Settings."""
+    global _queue
+    if _queue is None:
+        _queue = ThreadQueue(get_settings().chat_thread_mode)
+    return _queue
+
+
+def reset_thread_queue() -> None:
+    """Сбрасывает singleton-очередь (для тестов и перезагрузки настроек)."""
+    global _queue
+    _queue = None
@@ -2,7 +2,7 @@
 
 import httpx
 
-COINGECKO_BASE_URL = "https://api.coingecko.com/api/v3"
+from app.config import get_settings
 
 # Маппинг популярных тикеров на CoinGecko ID
 TICKER_MAP = {
@@ -37,7 +37,7 @@ def resolve_coin_id(name: str) -> str:
 async def get_price(coin: str) -> dict:
     """Получает текущую цену, изменение за 24ч и капитализацию."""
     coin_id = resolve_coin_id(coin)
-    url = f"{COINGECKO_BASE_URL}/coins/markets"
+    url = f"{get_settings().coingecko_base_url}/coins/markets"
     params = {
         "vs_currency": "usd",
         "ids": coin_id,
@@ -53,7 +53,29 @@ async def get_price(coin: str) -> dict:
     if not data:
         return {"error": f"Криптовалюта '{coin}' не найдена на CoinGecko."}
 
-    item = data[0]
+    return _market_entry(data[0])
+
+
+async def get_markets(coin_ids: list[str]) -> dict[str, dict]:
+    """Цены нескольких монет одним запросом: CoinGecko ID -> данные как у get_price."""
+    url = f"{get_settings().coingecko_base_url}/coins/markets"
+    params = {
+        "vs_currency": "usd",
+        "ids": ",".join(coin_ids),
+        "order": "market_cap_desc",
+        "per_page": max(len(coin_ids), 1),
+        "sparkline": "false",
+        "price_change_percentage": "24h",
+    }
+    async with httpx.AsyncClient(timeout=15) as client:
+        resp = await client.get(url, params=params)
+        resp.raise_for_status()
+        data = resp.json()
+
+    return {item["id"]: _market_entry(item) for item in data}
+
+
+def _market_entry(item: dict) -> dict:
     return {
         "name": item["name"],
         "symbol": item["symbol"].upper(),
@@ -67,7 +89,7 @@ async def get_price(coin: str) -> dict:
 async def get_market_data(coin: str) -> dict:
     """Расширенные рыночные данные для аналитики."""
     coin_id = resolve_coin_id(coin)
-    url = f"{COINGECKO_BASE_URL}/coins/{coin_id}"
+    url = f"{get_settings().coingecko_base_url}/coins/{coin_id}"
     params = {
         "localization": "false",
         "tickers": "false",
@@ -4,7 +4,6 @@ import httpx
 
 from app.config import get_settings
 
-NEWSAPI_BASE_URL = "https://newsapi.org/v2"
 NEWSAPI_MAX_PAGE_SIZE = 100
 
 
@@ -29,7 +28,7 @@ async def get_crypto_news(query: str, max_results: int = 5) -> list[dict]:
     if not api_key:
         return [{"error": "NEWS_API_KEY не задан в .env"}]
 
-    url = f"{NEWSAPI_BASE_URL}/everything"
+    url = f"{get_settings().newsapi_base_url}/everything"
     params = {
         "q": _build_news_query(query),
         "sortBy": "publishedAt",
@@ -2,18 +2,46 @@
 
 import asyncio
 
-from ddgs import DDGS
+import httpx
+
+from app.config import get_settings
+
+# Клиент ddgs импортируется при первом поиске: пакет тянет за собой тяжёлые
+# зависимости, которые не нужны для запуска приложения.
+DDGS: type | None = None
+
+
+def _ddgs_class() -> type:
+    """Лениво импортирует и возвращает класс клиента `ddgs.DDGS`."""
+    global DDGS
+    if DDGS is None:
+        from ddgs import DDGS
+    return DDGS
 
 
 def _search_sync(query: str, max_results: int) -> list[dict]:
     """Синхронный поиск, исполняется в отдельном потоке."""
-    with DDGS() as ddgs:
+    with _ddgs_class()() as ddgs:
         return list(ddgs.text(query, max_results=max_results))
 
 
+async def _search_http(base_url: str, query: str, max_results: int) -> list[dict]:
+    """Поиск через HTTP-сервис с выдачей в формате ddgs (DDGS_BASE_URL, например симулятор)."""
+    async with httpx.AsyncClient(timeout=15) as client:
+        resp = await client.get(
+            f"{base_url}/search", params={"q": query, "max_results": max_results}
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+
 async def search_web(query: str, max_results: int = 5) -> list[dict]:
     """Поиск в интернете через DuckDuckGo."""
-    results = await asyncio.to_thread(_search_sync, query, max_results)
+    base_url = get_settings().ddgs_base_url
+    if base_url:
+        results = await _search_http(base_url, query, max_results)
+    else:
+        results = await asyncio.to_thread(_search_sync, query, max_results)
 
     return [
         {
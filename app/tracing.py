@@ -0,0 +1,298 @@
+"""Трассировка запросов: дерево спанов на запрос и waterfall по thread_id.
+
+Корневой спан открывает `/chat` (`trace_request`). Шаги графа, вызовы внешних API,
+ожидание в очереди LLM и сами вызовы LLM добавляют дочерние спаны через `span()`.
+Текущий спан хранится в contextvar и наследуется задачами asyncio, поэтому
+параллельные ветки графа попадают в то же дерево. Вне запроса `span()` ничего не
+записывает. Готовые трейсы хранятся в кольцевом буфере и, опционально,
+дописываются в JSONL-файл фоновым потоком, чтобы запись на диск не блокировала
+event loop.
+"""
+
+import json
+import logging
+import queue
+import threading
+import uuid
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+from app.config import get_settings
+
+LOGGER = logging.getLogger(__name__)
+
+WATERFALL_WIDTH = 40
+# Трейсов в очереди на выгрузку; при переполнении новые трейсы в файл не попадают.
+EXPORT_QUEUE_SIZE = 1024
+
+
+class Span:
+    """Интервал работы внутри запроса; дети — вложенные интервалы."""
+
+    __slots__ = ("name", "kind", "attrs", "start", "end", "children", "_token")
+
+    def __init__(self, name: str, kind: str, attrs: dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.attrs = attrs
+        self.start = 0.0
+        self.end: float | None = None
+        self.children: list[Span] = []
+        self._token = None
+
+    def __enter__(self) -> "Span":
+        self.start = perf_counter()
+        self._token = CURRENT_SPAN.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end = perf_counter()
+        CURRENT_SPAN.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        return False
+
+    def set(self, **attrs: Any) -> None:
+        """Добавляет атрибуты спана (токены, модель, исход)."""
+        self.attrs.update(attrs)
+
+    def to_dict(self, origin: float) -> dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": None if self.end is None else round((self.end - self.start) * 1000, 3),
+            "attrs": self.attrs,
+            "children": [child.to_dict(origin) for child in self.children],
+        }
+
+
+class _NullSpan:
+    """Заглушка вне трассируемого запроса."""
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+# Текущий спан запроса; None — запрос не трассируется.
+CURRENT_SPAN: ContextVar[Span | None] = ContextVar("trace_span", default=None)
+
+
+def span(name: str, kind: str, **attrs: Any) -> Span | _NullSpan:
+    """Дочерний спан текущего спана или заглушка, если запрос не трассируется."""
+    parent = CURRENT_SPAN.get()
+    if parent is None:
+        return NULL_SPAN
+    child = Span(name, kind, attrs)
+    parent.children.append(child)
+    return child
+
+
+class TraceStore:
+    """Кольцевой буфер последних трейсов с опциональной выгрузкой в JSONL."""
+
+    def __init__(self, max_traces: int, export_path: str | None = None):
+        self._traces: deque[dict] = deque(maxlen=max(1, max_traces))
+        self.export_path = Path(export_path) if export_path else None
+        self.export_dropped = 0
+        self._export_queue: queue.Queue[dict | None] = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+        self._writer: threading.Thread | None = None
+        self._writer_lock = threading.Lock()
+        if self.export_path is not None:
+            self.export_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def add(self, trace: dict) -> None:
+        self._traces.append(trace)
+        if self.export_path is None:
+            return
+        self._ensure_writer()
+        try:
+            self._export_queue.put_nowait(trace)
+        except queue.Full:
+            self.export_dropped += 1
+            LOGGER.warning("[trace] export queue full, trace %s dropped", trace.get("trace_id"))
+
+    def flush(self) -> None:
+        """Ждёт, пока фоновый поток допишет трейсы из очереди."""
+        if self._writer is not None:
+            self._export_queue.join()
+
+    def close(self) -> None:
+        """Дописывает очередь и останавливает фоновый поток выгрузки."""
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._export_queue.put(None)
+            writer.join()
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._export_loop, name="trace-export", daemon=True
+                )
+                self._writer.start()
+
+    def _export_loop(self) -> None:
+        """Забирает из очереди всё накопившееся и дописывает одним открытием файла."""
+        while True:
+            batch = [self._export_queue.get()]
+            while True:
+                try:
+                    batch.append(self._export_queue.get_nowait())
+                except queue.Empty:
+                    break
+            traces = [trace for trace in batch if trace is not None]
+            try:
+                if traces:
+                    self._export(traces)
+            finally:
+                for _ in batch:
+                    self._export_queue.task_done()
+            if len(traces) < len(batch):
+                return
+
+    def _export(self, traces: list[dict]) -> None:
+        lines = "".join(
+            json.dumps(trace, ensure_ascii=False, default=str) + "\n" for trace in traces
+        )
+        try:
+            with self.export_path.open("a", encoding="utf-8") as fh:
+                fh.write(lines)
+        except OSError:
+            LOGGER.warning("[trace] export to %s failed", self.export_path, exc_info=True)
+
+    def latest(self, thread_id: str, limit: int = 5) -> list[dict]:
+        """Последние трейсы диалога, от новых к старым."""
+        found = []
+        for trace in reversed(self._traces):
+            if trace["thread_id"] == thread_id:
+                found.append(trace)
+                if len(found) >= limit:
+                    break
+        return found
+
+    def __len__(self) -> int:
+        return len(self._traces)
+
+
+_store: TraceStore | None = None
+
+
+def get_trace_store() -> TraceStore:
+    """Возвращает singleton-хранилище трейсов, настроенное из Settings."""
+    global _store
+    if _store is None:
+        settings = get_settings()
+        _store = TraceStore(settings.trace_buffer_size, settings.trace_export_path)
+    return _store
+
+
+def reset_trace_store() -> None:
+    """Сбрасывает singleton-хранилище (для тестов и перезагрузки настроек)."""
+    global _store
+    if _store is not None:
+        _store.close()
+    _store = None
+
+
+@contextmanager
+def trace_request(thread_id: str, **attrs: Any) -> Iterator[Span | _NullSpan]:
+    """Трассирует один запрос: корневой спан и сохранение трейса по завершении."""
+    if not get_settings().trace_enabled:
+        yield NULL_SPAN
+        return
+    root = Span("request", "request", attrs)
+    started_at = datetime.now(timezone.utc).isoformat()
+    try:
+        with root:
+            yield root
+    finally:
+        get_trace_store().add(
+            {
+                "trace_id": uuid.uuid4().hex,
+                "thread_id": thread_id,
+                "started_at": started_at,
+                "duration_ms": round((root.end - root.start) * 1000, 3),
+                "root": root.to_dict(root.start),
+            }
+        )
+
+
+def _end_ms(node: dict) -> float:
+    return node["start_ms"] + node["duration_ms"]
+
+
+def critical_path(node: dict) -> set[int]:
+    """id спанов на критическом пути.
+
+    Среди детей берётся завершившийся последним, затем — завершившийся последним
+    строго до его начала (параллельные соседи с ним пересекаются и не подходят),
+    и так далее; внутри каждого выбранного спана — рекурсивно.
+    """
+    path = {id(node)}
+    remaining = [c for c in node["children"] if c["duration_ms"] is not None]
+    cursor = float("inf")
+    while True:
+        before = [c for c in remaining if _end_ms(c) < cursor]
+        if not before:
+            return path
+        last = max(before, key=_end_ms)
+        path |= critical_path(last)
+        cursor = last["start_ms"]
+        remaining.remove(last)
+
+
+def _format_attrs(attrs: dict) -> str:
+    return " ".join(f"{key}={value}" for key, value in attrs.items())
+
+
+def render_waterfall(traces: list[dict], width: int = WATERFALL_WIDTH) -> str:
+    """Текстовый waterfall трейсов; `*` отмечает спаны на критическом пути."""
+    blocks = []
+    for trace in traces:
+        root = trace["root"]
+        total = max(trace["duration_ms"], 0.001)
+        critical = critical_path(root)
+        lines = [
+            f"trace {trace['trace_id']} thread={trace['thread_id']} "
+            f"started={trace['started_at']} total={trace['duration_ms']:.1f} ms"
+        ]
+
+        def walk(node: dict, depth: int) -> None:
+            start = node["start_ms"]
+            duration = node["duration_ms"]
+            offset = min(width - 1, int(start / total * width))
+            if duration is None:
+                bar, shown = "?", "   —   "
+            else:
+                bar = "█" * max(1, round(duration / total * width))
+                shown = f"{duration:7.1f}"
+            bar = (" " * offset + bar)[:width].ljust(width)
+            mark = "*" if id(node) in critical else " "
+            label = f"{'  ' * depth}{node['kind']}:{node['name']}"
+            attrs = _format_attrs(node["attrs"])
+            lines.append(
+                f"{mark} {start:8.1f} {shown} ms |{bar}| {label}{'  ' + attrs if attrs else ''}"
+            )
+            for child in sorted(node["children"], key=lambda c: c["start_ms"]):
+                walk(child, depth + 1)
+
+        walk(root, 0)
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks) + "\n"
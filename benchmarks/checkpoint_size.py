@@ -0,0 +1,159 @@
+"""Размер чекпоинтов с эфемерными каналами и без них на записанной нагрузке.
+
+Запуск:
+    python -m benchmarks.checkpoint_size [--turns 1000] [--threads 100]
+
+Прогоняет `--turns` ходов (поровну по `--threads` диалогам) через настоящий граф
+агента с подставными LLM и инструментами, которые отдают записанные ответы API из
+`benchmarks/data/api_data_samples.jsonl`. Сравнивает текущее состояние (api_data,
+response и решение о поиске не сохраняются) с прежним, где все ключи сохранялись:
+оценку памяти MemorySaver, размер SQLite-файла и средний размер чекпоинта.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+from typing import Annotated
+from unittest.mock import patch
+
+from langgraph.graph.message import add_messages
+from typing_extensions import TypedDict
+
+from app.agent import graph as graph_module
+from app.agent.checkpoint import BoundedMemorySaver, SQLiteCheckpointSaver
+from app.agent.state import merge_api_data
+from benchmarks.prompt_tokens import DEFAULT_RECORDS, load_records
+
+
+class LegacyAgentState(TypedDict):
+    """Состояние до разделения: все ключи сохраняются в чекпоинтах."""
+
+    messages: Annotated[list, add_messages]
+    user_query: str
+    thread_id: str
+    intent: str
+    coin: str
+    last_coin: str
+    summary: str
+    needs_search: bool | None
+    search_query: str
+    api_data: Annotated[dict, merge_api_data]
+    response: str
+
+
+QUERIES = (
+    ('{"intent": "analytics", "coin": "bitcoin"}', "Стоит ли покупать BTC сейчас?"),
+    ('{"intent": "price", "coin": "ethereum"}', "Сколько стоит эфир?"),
+    ('{"intent": "news", "coin": "solana"}', "Что нового у соланы?"),
+    ('{"intent": "chat", "coin": ""}', "Что такое стейкинг?"),
+)
+ANSWER = "Ответ консультанта с цифрами, выводами и дисклеймером. " * 8
+
+
+class ScriptedLLM:
+    """Отвечает классификатору по сценарию, остальным узлам — фиксированным текстом."""
+
+    def __init__(self) -> None:
+        self._intents = itertools.cycle(q[0] for q in QUERIES)
+
+    async def ainvoke(self, messages, *args, **kwargs):
+        system = messages[0].content
+        if system.startswith("Ты — классификатор"):
+            return SimpleNamespace(content=next(self._intents), tool_calls=[])
+        if "'yes' или 'no'" in system:
+            return SimpleNamespace(content="yes")
+        return SimpleNamespace(content=ANSWER)
+
+
+async def _run_workload(saver, state_schema, turns: int, threads: int) -> None:
+    records = [r["api_data"] for r in load_records(DEFAULT_RECORDS)]
+    samples = itertools.cycle(records)
+    llm = ScriptedLLM()
+
+    async def market(*_args, **_kwargs):
+        return next(samples)["market"]
+
+    async def news(*_args, **_kwargs):
+        return next(samples)["news"]
+
+    async def search(*_args, **_kwargs):
+        return next(r for r in records if "web_search" in r)["web_search"]
+
+    with (
+        patch.object(graph_module, "AgentState", state_schema),
+        patch.object(graph_module, "build_checkpointer", return_value=saver),
+        patch("app.agent.router.get_llm", return_value=llm),
+        patch("app.agent.nodes.get_llm", return_value=llm),
+        patch("app.agent.nodes.get_price", side_effect=market),
+        patch("app.agent.nodes.get_market_data", side_effect=market),
+        patch("app.agent.nodes.get_crypto_news", side_effect=news),
+        patch("app.agent.nodes.search_web", side_effect=search),
+    ):
+        graph = graph_module.build_graph()
+        for turn in range(turns):
+            query = QUERIES[turn % len(QUERIES)][1]
+            thread_id = f"bench-{turn % threads}"
+            await graph.ainvoke(
+                {"messages": [("user", query)], "user_query": query, "thread_id": thread_id},
+                config={"configurable": {"thread_id": thread_id}},
+            )
+
+
+def _checkpoint_bytes(saver: SQLiteCheckpointSaver) -> dict:
+    count, total = saver.pool.call(
+        lambda conn: conn.execute(
+            "SELECT COUNT(*), SUM(LENGTH(checkpoint)) FROM checkpoints"
+        ).fetchone()
+    )
+    writes = saver.pool.call(
+        lambda conn: conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes").fetchone()[0]
+    )
+    return {"avg_checkpoint_bytes": round(total / count), "pending_writes_bytes": writes}
+
+
+async def measure(state_schema, turns: int, threads: int, tmp: str, label: str) -> dict:
+    memory = BoundedMemorySaver(keep_last=3)
+    await _run_workload(memory, state_schema, turns, threads)
+
+    path = os.path.join(tmp, f"{label}.sqlite3")
+    sqlite = SQLiteCheckpointSaver(path, keep_last=3)
+    await _run_workload(sqlite, state_schema, turns, threads)
+    sqlite_stats = sqlite.stats()
+    report = {
+        "memory_estimated_bytes": memory.stats()["estimated_bytes"],
+        "sqlite_file_bytes": sqlite_stats["estimated_bytes"],
+        **_checkpoint_bytes(sqlite),
+    }
+    sqlite.close()
+    return report
+
+
+async def run_benchmark(turns: int, threads: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = await measure(LegacyAgentState, turns, threads, tmp, "legacy")
+        current = await measure(graph_module.AgentState, turns, threads, tmp, "current")
+    return {
+        "turns": turns,
+        "threads": threads,
+        "all_keys_persisted": legacy,
+        "transient_keys_untracked": current,
+        "memory_saved_pct": round(
+            100 * (1 - current["memory_estimated_bytes"] / legacy["memory_estimated_bytes"]), 1
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=100)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run_benchmark(args.turns, args.threads)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Задержка put/get SQLite-checkpointer на большом числе диалогов.
+
+Запуск:
+    python -m benchmarks.checkpointer [--threads 100000] [--concurrency 16] [--path /tmp/bench.sqlite3]
+
+Записывает по одному типичному чекпоинту агента в каждый из `--threads` диалогов,
+затем читает случайные диалоги и печатает перцентили задержки, размер файла БД и,
+для сравнения, прирост памяти процесса у MemorySaver на выборке диалогов.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.memory import MemorySaver
+
+from app.agent.checkpoint import SQLiteCheckpointSaver
+
+
+def _checkpoint(thread_index: int) -> dict:
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {
+        "messages": [
+            HumanMessage(content="Сколько стоит биткоин?"),
+            AIMessage(content=f"Bitcoin сейчас стоит около ${60000 + thread_index % 5000}."),
+            HumanMessage(content="А что с ним было за неделю?"),
+            AIMessage(content="За неделю курс вырос на 3.2%, объём торгов стабилен. " * 4),
+        ],
+        "user_query": "А что с ним было за неделю?",
+        "thread_id": f"bench-{thread_index}",
+        "intent": "analytics",
+        "coin": "bitcoin",
+        "api_data": {
+            "market_data": {"price_usd": 61234.5, "price_change_7d_pct": 3.21},
+            "news": [{"title": f"BTC headline {i}", "source": "bench"} for i in range(5)],
+        },
+        "response": "За неделю курс вырос на 3.2%.",
+    }
+    checkpoint["channel_versions"] = {key: 1 for key in checkpoint["channel_values"]}
+    return checkpoint
+
+
+def _config(thread_index: int) -> dict:
+    return {"configurable": {"thread_id": f"bench-{thread_index}", "checkpoint_ns": ""}}
+
+
+def _percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "mean_ms": round(statistics.mean(ordered) * 1000, 3),
+    }
+
+
+async def _timed_batches(indices: list[int], concurrency: int, op) -> list[float]:
+    samples: list[float] = []
+
+    async def one(index: int) -> None:
+        start = time.perf_counter()
+        await op(index)
+        samples.append(time.perf_counter() - start)
+
+    for offset in range(0, len(indices), concurrency):
+        await asyncio.gather(*(one(i) for i in indices[offset : offset + concurrency]))
+    return samples
+
+
+async def run_benchmark(threads: int, concurrency: int, path: str, reads: int) -> dict:
+    saver = SQLiteCheckpointSaver(path, pool_size=concurrency)
+    checkpoints = [_checkpoint(i) for i in range(min(threads, 1000))]
+
+    async def put(index: int) -> None:
+        await saver.aput(_config(index), checkpoints[index % len(checkpoints)], {"step": 1}, {})
+
+    async def get(index: int) -> None:
+        assert await saver.aget_tuple(_config(index)) is not None
+
+    start = time.perf_counter()
+    put_samples = await _timed_batches(list(range(threads)), concurrency, put)
+    put_elapsed = time.perf_counter() - start
+    read_indices = [random.randrange(threads) for _ in range(reads)]
+    get_samples = await _timed_batches(read_indices, concurrency, get)
+    saver.close()
+
+    size = sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p))
+    return {
+        "threads": threads,
+        "concurrency": concurrency,
+        "put": {**_percentiles(put_samples), "throughput_per_s": round(threads / put_elapsed)},
+        "get": _percentiles(get_samples),
+        "db_bytes_per_thread": round(size / threads),
+    }
+
+
+def memory_saver_bytes_per_thread(sample: int) -> int:
+    """Прирост памяти процесса на один диалог у MemorySaver."""
+    saver = MemorySaver()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for index in range(sample):
+        saver.put(_config(index), _checkpoint(index), {"step": 1}, {})
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return round((after - before) / sample)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=100_000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--reads", type=int, default=10_000)
+    parser.add_argument("--memory-sample", type=int, default=5_000)
+    parser.add_argument("--path", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.path or os.path.join(tmp, "checkpoints.sqlite3")
+        report = asyncio.run(run_benchmark(args.threads, args.concurrency, path, args.reads))
+    report["memory_saver_bytes_per_thread"] = memory_saver_bytes_per_thread(args.memory_sample)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
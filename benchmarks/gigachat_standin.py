@@ -0,0 +1,70 @@
+"""Локальная замена GigaChat chat/completions с имитацией кэширования префикса.
+
+Сервер хранит последний промпт каждой сессии (заголовок `X-Session-ID`) и считает
+закэшированной общую часть нового промпта с предыдущим. Время до ответа растёт
+линейно с числом незакэшированных токенов, что позволяет измерить выигрыш от
+стабильных идентификаторов сессий и неизменного префикса промпта.
+"""
+
+import asyncio
+import time
+
+from fastapi import FastAPI, Request
+
+from app.agent.prompt_data import estimate_tokens
+
+
+def _render_prompt(messages: list[dict]) -> str:
+    return "\n".join(f"{m.get('role', '')}: {m.get('content', '')}" for m in messages)
+
+
+def _common_prefix_length(left: str, right: str) -> int:
+    limit = min(len(left), len(right))
+    index = 0
+    while index < limit and left[index] == right[index]:
+        index += 1
+    return index
+
+
+def create_app(base_latency: float = 0.02, per_token_latency: float = 0.0005) -> FastAPI:
+    """Создаёт приложение stand-in сервера с заданной моделью задержки."""
+    app = FastAPI(title="GigaChat stand-in")
+    sessions: dict[str, str] = {}
+    app.state.sessions = sessions
+
+    @app.post("/api/v1/chat/completions")
+    async def chat_completions(request: Request) -> dict:
+        payload = await request.json()
+        prompt = _render_prompt(payload.get("messages", []))
+        prompt_tokens = estimate_tokens(prompt)
+
+        session_id = request.headers.get("x-session-id")
+        cached_tokens = 0
+        if session_id:
+            previous = sessions.get(session_id, "")
+            cached_tokens = estimate_tokens(prompt[: _common_prefix_length(previous, prompt)])
+            sessions[session_id] = prompt
+
+        await asyncio.sleep(base_latency + per_token_latency * (prompt_tokens - cached_tokens))
+        content = "stand-in response"
+        completion_tokens = estimate_tokens(content)
+        return {
+            "choices": [
+                {
+                    "message": {"role": "assistant", "content": content},
+                    "index": 0,
+                    "finish_reason": "stop",
+                }
+            ],
+            "created": int(time.time()),
+            "model": payload.get("model") or "GigaChat",
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "precached_prompt_tokens": cached_tokens,
+            },
+            "object": "chat.completion",
+        }
+
+    return app
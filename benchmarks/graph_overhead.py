@@ -0,0 +1,193 @@
+"""Накладные расходы LangGraph на линейных ходах при высокой конкурентности.
+
+Запуск:
+    python -m benchmarks.graph_overhead [--turns 2000] [--concurrency 1,50,200]
+        [--mix price=0.5,news=0.25,chat=0.25] [--turns-per-thread 5]
+
+Прогоняет одинаковые ходы `price`/`news`/`chat` через `agent_graph.ainvoke` и
+через быстрый исполнитель (`app.agent.fast_path`). LLM и внешние API
+подменены мгновенными заглушками, чекпоинтер — в памяти, поэтому время хода —
+это собственная работа приложения: узлы, обёртки шагов, каналы и чекпоинты.
+
+Для каждого уровня конкурентности (число одновременных диалогов) в отчёте:
+пропускная способность, задержка хода (p50/p99), число записей чекпоинта на
+ход и процессорное время хода (время прогона / число ходов). Накладные расходы
+графа на шаг — разница процессорного времени хода между графом и исполнителем,
+делённая на три шага линейного маршрута. Заглушки не уступают цикл событий,
+поэтому ход исполнителя выполняется без переключений и его задержка почти не
+зависит от конкурентности — сравнивать режимы стоит по пропускной способности.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from contextlib import ExitStack
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+LINEAR_STEPS = 3
+QUESTIONS = {
+    "price": "Сколько стоит биткоин?",
+    "news": "Что нового по эфиру?",
+    "chat": "Что такое блокчейн?",
+}
+DECISIONS = {
+    "price": '{"intent": "price", "coin": "bitcoin"}',
+    "news": '{"intent": "news", "coin": "ethereum"}',
+    "chat": '{"intent": "chat", "coin": ""}',
+}
+PRICE = {"name": "Bitcoin", "symbol": "BTC", "price_usd": 61234.5, "price_change_24h_pct": 1.2}
+NEWS = [{"title": f"Заголовок {i}", "source": "bench", "url": ""} for i in range(5)]
+SEARCH = [{"title": "Блокчейн", "body": "Распределённый реестр.", "href": ""}]
+
+
+class InstantLLM:
+    """Заглушка GigaChat: классификация по ключевым словам, ответ — фиксированный."""
+
+    def __init__(self, role: str):
+        self.role = role
+
+    async def ainvoke(self, messages, *_args, **_kwargs) -> AIMessage:
+        if self.role != "classify":
+            return AIMessage(content="Короткий ответ по данным.")
+        text = messages[-1].content
+        for intent, question in QUESTIONS.items():
+            if question in text:
+                return AIMessage(content=DECISIONS[intent])
+        return AIMessage(content=DECISIONS["chat"])
+
+
+async def _price(*_args, **_kwargs) -> dict:
+    return dict(PRICE)
+
+
+async def _news(*_args, **_kwargs) -> list:
+    return [dict(article) for article in NEWS]
+
+
+async def _search(*_args, **_kwargs) -> list:
+    return [dict(result) for result in SEARCH]
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in QUESTIONS:
+            raise ValueError(f"неизвестный intent в --mix: {name!r}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def _percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {"p50_ms": pick(0.50), "p99_ms": pick(0.99)}
+
+
+async def _run_level(
+    mode: str, concurrency: int, intents: list[str], turns_per_thread: int
+) -> dict:
+    from app.agent.fast_path import run_turn
+    from app.agent.graph import build_graph
+
+    graph = build_graph()
+    checkpointer = graph.checkpointer
+    puts = 0
+    original_aput = checkpointer.aput
+
+    async def counting_aput(*args, **kwargs):
+        nonlocal puts
+        puts += 1
+        return await original_aput(*args, **kwargs)
+
+    checkpointer.aput = counting_aput
+    pending = iter(intents)
+    latencies: list[float] = []
+
+    async def worker(index: int) -> None:
+        done = 0
+        for intent in pending:
+            thread_id = f"{mode}-{concurrency}-{index}-{done // turns_per_thread}"
+            message = QUESTIONS[intent]
+            input_state = {
+                "messages": [HumanMessage(content=message)],
+                "user_query": message,
+                "thread_id": thread_id,
+            }
+            config = {"configurable": {"thread_id": thread_id}}
+            start = time.perf_counter()
+            if mode == "graph":
+                await graph.ainvoke(input_state, config=config)
+            else:
+                await run_turn(graph, input_state, config)
+            latencies.append(time.perf_counter() - start)
+            done += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "turns_per_s": round(len(intents) / elapsed, 1),
+        "cpu_us_per_turn": round(elapsed / len(intents) * 1e6, 1),
+        "latency": _percentiles(latencies),
+        "checkpoint_puts_per_turn": round(puts / len(intents), 2),
+    }
+
+
+async def run_benchmark(
+    turns: int, levels: list[int], mix: dict[str, float], turns_per_thread: int, seed: int
+) -> dict:
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    intents = rng.choices(names, weights=weights, k=turns)
+    report: dict = {"turns": turns, "mix": mix, "levels": {}}
+    with ExitStack() as stack:
+        stack.enter_context(patch("app.agent.router.get_llm", InstantLLM))
+        stack.enter_context(patch("app.agent.nodes.get_llm", InstantLLM))
+        stack.enter_context(patch("app.agent.nodes.get_price", _price))
+        stack.enter_context(patch("app.agent.nodes.get_crypto_news", _news))
+        stack.enter_context(patch("app.agent.nodes.search_web", _search))
+        for concurrency in levels:
+            results = {}
+            for mode in ("graph", "fast_path"):
+                # Прогрев: импорты, компиляция графа, кэши промптов.
+                await _run_level(mode, 1, intents[:20], turns_per_thread)
+                results[mode] = await _run_level(mode, concurrency, intents, turns_per_thread)
+            graph_us = results["graph"]["cpu_us_per_turn"]
+            fast_us = results["fast_path"]["cpu_us_per_turn"]
+            results["graph_overhead_us_per_step"] = round((graph_us - fast_us) / LINEAR_STEPS, 1)
+            results["speedup"] = round(graph_us / fast_us, 2) if fast_us else None
+            report["levels"][str(concurrency)] = results
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--concurrency", default="1,50,200")
+    parser.add_argument("--mix", default="price=0.5,news=0.25,chat=0.25")
+    parser.add_argument("--turns-per-thread", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.setdefault("GIGACHAT_CREDENTIALS", "bench")
+    os.environ["CHECKPOINTER"] = "memory"
+    os.environ["FAST_PATH_INTENTS"] = json.dumps(list(QUESTIONS))
+    os.environ.pop("RECORD_TRACE_PATH", None)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    report = asyncio.run(
+        run_benchmark(args.turns, levels, parse_mix(args.mix), args.turns_per_thread, args.seed)
+    )
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,517 @@
+"""Нагрузочный прогон `/chat` против симулятора внешних API.
+
+Запуск:
+    python -m benchmarks.load [--rps 20] [--duration 30] [--warmup 5]
+        [--mix price=0.4,news=0.2,analytics=0.15,chat=0.25] [--followup 0.3]
+        [--sim-config sim.json] [--simulator-url http://127.0.0.1:8900]
+        [--output report.json] [--baseline baseline.json] [--tolerance 0.15]
+
+Приложение поднимается в этом процессе настоящим uvicorn, симулятор — отдельным
+процессом (`python -m simulator`), чтобы его работа не попадала в замеры loop
+и RSS; `--simulator-url` подключает уже запущенный симулятор. Нагрузка
+открытая: запросы приходят пуассоновским потоком с частотой `--rps` независимо
+от того, успели ли ответить предыдущие, а задержка считается от планового
+момента прихода, поэтому отставание генератора не прячет очередь. Доля
+`--followup` запросов продолжает уже отвеченный диалог.
+
+Отчёт (JSON): пропускная способность, p50/p90/p99 по intent, доля ошибок,
+лаг event loop, рост RSS за окно замера и число вызовов внешних API на запрос
+по `/_sim/stats`. С `--baseline` отчёт сравнивается с сохранённым; при
+ухудшении больше `--tolerance` код возврата 1.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections import deque
+from collections.abc import Iterator
+from pathlib import Path
+
+import httpx
+import uvicorn
+
+from app.config import get_settings
+from simulator.app import simulator_env
+
+DEFAULT_MIX = {"price": 0.4, "news": 0.2, "analytics": 0.15, "chat": 0.25}
+COINS = ("биткоин", "эфир", "солана", "XRP", "кардано", "догикоин", "тонкоин", "BNB")
+QUESTIONS = {
+    "price": (
+        "Сколько стоит {coin}?",
+        "Какой сейчас курс {coin}?",
+        "Цена {coin} в долларах",
+    ),
+    "news": (
+        "Новости по {coin}",
+        "Какие последние новости про {coin}?",
+        "Что нового у {coin}, какие события?",
+    ),
+    "analytics": (
+        "Стоит ли покупать {coin} сейчас?",
+        "Дай прогноз по {coin} на месяц",
+        "Сделай анализ {coin}: продавать или держать?",
+    ),
+    "chat": (
+        "Что такое стейкинг?",
+        "Объясни, чем блокчейн отличается от обычной базы данных",
+        "Как устроен холодный кошелёк?",
+        "Что такое DeFi простыми словами?",
+    ),
+}
+LAG_INTERVAL_SECONDS = 0.01
+SIMULATOR_START_TIMEOUT_SECONDS = 15.0
+# Минимальные абсолютные ухудшения, ниже которых разница считается шумом.
+MIN_LATENCY_DELTA_MS = 5.0
+MIN_RSS_DELTA_MB = 5.0
+MAX_ERROR_RATE_DELTA = 0.01
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    """`price=0.4,news=0.2` -> нормированные веса intent."""
+    mix: dict[str, float] = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in QUESTIONS:
+            raise ValueError(f"Неизвестный intent в смеси: {name!r}")
+        mix[name] = float(weight)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("Сумма весов смеси должна быть положительной.")
+    return {name: weight / total for name, weight in mix.items()}
+
+
+def _question(rng: random.Random, intent: str) -> str:
+    return rng.choice(QUESTIONS[intent]).format(coin=rng.choice(COINS))
+
+
+def _percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+
+    return {
+        "count": len(ordered),
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1] * 1000, 1),
+        "mean_ms": round(statistics.mean(ordered) * 1000, 1),
+    }
+
+
+def _rss_mb() -> float:
+    """Текущий RSS процесса; без /proc — пиковый из getrusage."""
+    with contextlib.suppress(OSError):
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class LoopLagMonitor:
+    """Меряет опоздание пробуждений event loop относительно запланированного сна."""
+
+    def __init__(self, interval: float = LAG_INTERVAL_SECONDS):
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+
+@contextlib.contextmanager
+def _patched_env(env: dict[str, str]) -> Iterator[None]:
+    previous = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    get_settings.cache_clear()
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        get_settings.cache_clear()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.asynccontextmanager
+async def _simulator_process(sim_config: Path | None, seed: int):
+    """Запускает `python -m simulator` на свободном порту и ждёт готовности."""
+    port = _free_port()
+    command = [sys.executable, "-m", "simulator", "--port", str(port), "--seed", str(seed)]
+    if sim_config is not None:
+        command += ["--config", str(sim_config)]
+    proc = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + SIMULATOR_START_TIMEOUT_SECONDS
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            while True:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"Симулятор завершился с кодом {proc.returncode}.")
+                with contextlib.suppress(httpx.TransportError):
+                    if (await client.get("/_sim/stats")).status_code == 200:
+                        break
+                if time.monotonic() > deadline:
+                    raise RuntimeError("Симулятор не запустился.")
+                await asyncio.sleep(0.1)
+        yield base_url
+    finally:
+        proc.terminate()
+        with contextlib.suppress(subprocess.TimeoutExpired):
+            proc.wait(timeout=5)
+        if proc.poll() is None:
+            proc.kill()
+
+
+class LoadGenerator:
+    """Открытая нагрузка на `/chat` с заданной смесью intent."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        mix: dict[str, float],
+        followup: float,
+        max_outstanding: int,
+        seed: int,
+    ):
+        self.client = client
+        self.mix = mix
+        self.followup = followup
+        self.max_outstanding = max_outstanding
+        self.rng = random.Random(seed)
+        self.threads: deque[str] = deque(maxlen=1000)
+        self.results: list[dict] = []
+        self.dropped = 0
+        self._outstanding: set[asyncio.Task] = set()
+
+    async def _request(self, intent: str, body: dict, scheduled: float) -> None:
+        status, answered_intent = 0, None
+        try:
+            response = await self.client.post("/chat", json=body)
+            status = response.status_code
+            if status == 200:
+                answered_intent = response.json().get("intent")
+                self.threads.append(body["thread_id"])
+        except httpx.TimeoutException:
+            status = -1
+        except httpx.TransportError:
+            status = -2
+        self.results.append(
+            {
+                "intent": intent,
+                "status": status,
+                "answered_intent": answered_intent,
+                "latency": time.perf_counter() - scheduled,
+            }
+        )
+
+    async def run(self, rps: float, duration: float) -> None:
+        """Пуассоновский поток запросов в течение `duration` секунд; ждёт все ответы."""
+        intents = list(self.mix)
+        weights = [self.mix[name] for name in intents]
+        start = time.perf_counter()
+        scheduled = start
+        while True:
+            scheduled += self.rng.expovariate(rps)
+            if scheduled - start >= duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if len(self._outstanding) >= self.max_outstanding:
+                self.dropped += 1
+                continue
+            intent = self.rng.choices(intents, weights)[0]
+            body = {"message": _question(self.rng, intent)}
+            if self.threads and self.rng.random() < self.followup:
+                body["thread_id"] = self.rng.choice(self.threads)
+            else:
+                body["thread_id"] = f"load-{uuid.uuid4().hex}"
+            task = asyncio.create_task(self._request(intent, body, scheduled))
+            self._outstanding.add(task)
+            task.add_done_callback(self._outstanding.discard)
+        if self._outstanding:
+            await asyncio.gather(*self._outstanding)
+
+    def reset(self) -> None:
+        self.results.clear()
+        self.dropped = 0
+
+
+def _upstream_calls(stats: dict, requests: int) -> dict:
+    """Вызовы внешних API за окно замера: всего, на запрос и по статусам."""
+    report = {}
+    for upstream, endpoints in stats.items():
+        total = sum(sum(statuses.values()) for statuses in endpoints.values())
+        report[upstream] = {
+            "total": total,
+            "per_request": round(total / requests, 3) if requests else 0.0,
+            "endpoints": endpoints,
+        }
+    return report
+
+
+def build_report(
+    results: list[dict],
+    dropped: int,
+    duration: float,
+    elapsed: float,
+    lag_samples: list[float],
+    rss: dict,
+    sim_stats: dict,
+) -> dict:
+    """Сводит сырые результаты прогона в отчёт."""
+    ok = [r for r in results if r["status"] == 200]
+    errors: dict[str, int] = {}
+    for r in results:
+        if r["status"] != 200:
+            key = {-1: "timeout", -2: "transport"}.get(r["status"], str(r["status"]))
+            errors[key] = errors.get(key, 0) + 1
+    latency = {"all": _percentiles([r["latency"] for r in ok])}
+    for intent in sorted({r["intent"] for r in results}):
+        latency[intent] = _percentiles([r["latency"] for r in ok if r["intent"] == intent])
+    offered = len(results) + dropped
+    return {
+        "requests": offered,
+        "completed": len(ok),
+        "dropped": dropped,
+        "errors": errors,
+        "error_rate": round((offered - len(ok)) / offered, 4) if offered else 0.0,
+        "misclassified": sum(1 for r in ok if r["answered_intent"] != r["intent"]),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "offered_rps": round(offered / duration, 2) if duration else 0.0,
+        "latency": latency,
+        "event_loop_lag": _percentiles(lag_samples),
+        "rss_mb": {**rss, "growth": round(rss["end"] - rss["start"], 1)},
+        "upstream_calls": _upstream_calls(sim_stats, len(ok)),
+    }
+
+
+def _worse(current: float, baseline: float, tolerance: float, slack: float) -> bool:
+    return current > baseline * (1 + tolerance) and current - baseline > slack
+
+
+def compare_reports(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Ухудшения текущего отчёта относительно базового сверх `tolerance`."""
+    regressions = []
+    if current["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        regressions.append(
+            f"throughput_rps: {current['throughput_rps']} < {baseline['throughput_rps']}"
+        )
+    if current["error_rate"] - baseline["error_rate"] > MAX_ERROR_RATE_DELTA:
+        regressions.append(f"error_rate: {current['error_rate']} > {baseline['error_rate']}")
+    for intent, stats in current["latency"].items():
+        base = baseline["latency"].get(intent, {})
+        for key in ("p50_ms", "p99_ms"):
+            if key in stats and key in base:
+                if _worse(stats[key], base[key], tolerance, MIN_LATENCY_DELTA_MS):
+                    regressions.append(f"latency.{intent}.{key}: {stats[key]} > {base[key]}")
+    lag, base_lag = current["event_loop_lag"], baseline["event_loop_lag"]
+    if "p99_ms" in lag and "p99_ms" in base_lag:
+        if _worse(lag["p99_ms"], base_lag["p99_ms"], tolerance, MIN_LATENCY_DELTA_MS):
+            regressions.append(f"event_loop_lag.p99_ms: {lag['p99_ms']} > {base_lag['p99_ms']}")
+    growth, base_growth = current["rss_mb"]["growth"], baseline["rss_mb"]["growth"]
+    if _worse(growth, base_growth, tolerance, MIN_RSS_DELTA_MB):
+        regressions.append(f"rss_mb.growth: {growth} > {base_growth}")
+    for upstream, calls in current["upstream_calls"].items():
+        base_calls = baseline["upstream_calls"].get(upstream, {}).get("per_request", 0.0)
+        if _worse(calls["per_request"], base_calls, tolerance, 0.0):
+            regressions.append(
+                f"upstream_calls.{upstream}.per_request: {calls['per_request']} > {base_calls}"
+            )
+    return regressions
+
+
+async def _run_against(
+    simulator_url: str,
+    rps: float,
+    duration: float,
+    warmup: float,
+    mix: dict[str, float],
+    followup: float,
+    max_outstanding: int,
+    timeout: float,
+    seed: int,
+) -> dict:
+    import app.main as main_module
+
+    server = uvicorn.Server(
+        uvicorn.Config(main_module.app, host="127.0.0.1", port=0, log_level="warning")
+    )
+    serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        if serve_task.done():
+            await serve_task
+            raise RuntimeError("Приложение не запустилось.")
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    limits = httpx.Limits(max_connections=max_outstanding, max_keepalive_connections=64)
+    try:
+        async with (
+            httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{port}", timeout=timeout, limits=limits
+            ) as client,
+            httpx.AsyncClient(base_url=simulator_url) as sim_client,
+        ):
+            generator = LoadGenerator(client, mix, followup, max_outstanding, seed)
+            if warmup > 0:
+                await generator.run(rps, warmup)
+            generator.reset()
+            await sim_client.post("/_sim/reset")
+            monitor = LoopLagMonitor()
+            rss_start = rss_peak = _rss_mb()
+            monitor.start()
+
+            async def sample_rss() -> None:
+                nonlocal rss_peak
+                while True:
+                    await asyncio.sleep(1.0)
+                    rss_peak = max(rss_peak, _rss_mb())
+
+            rss_task = asyncio.create_task(sample_rss())
+            start = time.perf_counter()
+            await generator.run(rps, duration)
+            elapsed = time.perf_counter() - start
+            rss_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await rss_task
+            await monitor.stop()
+            rss_end = _rss_mb()
+            sim_stats = (await sim_client.get("/_sim/stats")).json()
+    finally:
+        server.should_exit = True
+        await serve_task
+    report = build_report(
+        generator.results,
+        generator.dropped,
+        duration,
+        elapsed,
+        monitor.samples,
+        {"start": rss_start, "end": rss_end, "peak": max(rss_peak, rss_end)},
+        sim_stats,
+    )
+    report["config"] = {
+        "rps": rps,
+        "duration_seconds": duration,
+        "warmup_seconds": warmup,
+        "mix": mix,
+        "followup": followup,
+        "seed": seed,
+    }
+    return report
+
+
+async def run_benchmark(
+    rps: float = 20.0,
+    duration: float = 30.0,
+    warmup: float = 5.0,
+    mix: dict[str, float] | None = None,
+    followup: float = 0.3,
+    max_outstanding: int = 1000,
+    timeout: float = 60.0,
+    seed: int = 1,
+    sim_config: Path | None = None,
+    simulator_url: str | None = None,
+) -> dict:
+    """Прогон нагрузки; без `simulator_url` запускает симулятор отдельным процессом."""
+    async with contextlib.AsyncExitStack() as stack:
+        if simulator_url is None:
+            simulator_url = await stack.enter_async_context(_simulator_process(sim_config, seed))
+        stack.enter_context(_patched_env(simulator_env(simulator_url)))
+        return await _run_against(
+            simulator_url,
+            rps,
+            duration,
+            warmup,
+            mix or DEFAULT_MIX,
+            followup,
+            max_outstanding,
+            timeout,
+            seed,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rps", type=float, default=20.0)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument("--followup", type=float, default=0.3)
+    parser.add_argument("--max-outstanding", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--sim-config", type=Path, default=None)
+    parser.add_argument("--simulator-url", default=None)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    report = asyncio.run(
+        run_benchmark(
+            rps=args.rps,
+            duration=args.duration,
+            warmup=args.warmup,
+            mix=args.mix,
+            followup=args.followup,
+            max_outstanding=args.max_outstanding,
+            timeout=args.timeout,
+            seed=args.seed,
+            sim_config=args.sim_config,
+            simulator_url=args.simulator_url,
+        )
+    )
+    regressions = []
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare_reports(report, baseline, args.tolerance)
+        report["baseline"] = str(args.baseline)
+        report["tolerance"] = args.tolerance
+        report["regressions"] = regressions
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output is not None:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    print(text)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Накладные расходы метрик на запрос.
+
+Запуск:
+    python -m benchmarks.metrics_overhead [--iterations 200000] [--budget-us 1.0]
+
+Измеряет стоимость отдельных обновлений (наблюдение гистограммы с метками,
+инкремент счётчика), добавку обёртки шага графа к пустому узлу, учёт одного
+вызова LLM с usage_metadata (пять обновлений) и суммарную стоимость метрик
+типичного запроса аналитики: 8 шагов графа, 3 внешних вызова, 3 вызова LLM и
+intent. Из замеров вычитается стоимость пустого вызова функции в цикле.
+Завершается с кодом 1, если обновление или обёртка шага дороже `--budget-us`.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections.abc import Callable
+
+from langchain_core.messages import AIMessage
+
+from app.agent.graph import _wrap_step
+from app.metrics import (
+    INTENTS,
+    NODE_SECONDS,
+    REGISTRY,
+    UPSTREAM_SECONDS,
+    record_llm_call,
+)
+
+STEPS = (
+    "classify_intent",
+    "route_by_intent",
+    "analytics_market",
+    "analytics_news",
+    "analytics_search",
+    "analytics_join",
+    "route_needs_search",
+    "analyze",
+)
+UPSTREAMS = ("coingecko:/coins/{id}", "newsapi:/v2/everything", "ddgs:text")
+LLM_ROLES = ("classify", "route", "analyze")
+REPEATS = 5
+LLM_RESULT = AIMessage(
+    content="",
+    usage_metadata={
+        "input_tokens": 900,
+        "output_tokens": 300,
+        "total_tokens": 1200,
+        "input_token_details": {"cache_read": 700},
+    },
+)
+
+
+def _noop() -> None:
+    pass
+
+
+def _loop_ns(fn: Callable[[], None], iterations: int) -> float:
+    """Лучшее из REPEATS время цикла вызовов `fn`, как в timeit."""
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            fn()
+        best = min(best, time.perf_counter_ns() - start)
+    return best
+
+
+def _ns_per_call(fn: Callable[[], None], iterations: int) -> float:
+    """Время одного вызова `fn` за вычетом стоимости цикла и пустого вызова."""
+    return max(0.0, (_loop_ns(fn, iterations) - _loop_ns(_noop, iterations)) / iterations)
+
+
+def _request_metrics() -> None:
+    for step in STEPS:
+        NODE_SECONDS.observe(0.012, step)
+    for target in UPSTREAMS:
+        UPSTREAM_SECONDS.observe(0.18, target, "ok")
+    for role in LLM_ROLES:
+        record_llm_call(role, 1.4, LLM_RESULT)
+    INTENTS.inc("analytics")
+
+
+async def _wrapper_overhead_ns(iterations: int) -> float:
+    async def node(_state):
+        return {}
+
+    async def loop_ns(step) -> float:
+        best = float("inf")
+        for _ in range(REPEATS):
+            start = time.perf_counter_ns()
+            for _ in range(iterations):
+                await step(state)
+            best = min(best, time.perf_counter_ns() - start)
+        return best
+
+    wrapped = _wrap_step("bench_node", node, debug=False)
+    state: dict = {}
+    return max(0.0, (await loop_ns(wrapped) - await loop_ns(node)) / iterations)
+
+
+def run_benchmark(iterations: int) -> dict:
+    ops = {
+        "histogram_observe": _ns_per_call(
+            lambda: NODE_SECONDS.observe(0.012, "analyze"), iterations
+        ),
+        "counter_inc": _ns_per_call(lambda: INTENTS.inc("analytics"), iterations),
+        "step_wrapper": asyncio.run(_wrapper_overhead_ns(iterations)),
+    }
+    llm_call_ns = _ns_per_call(lambda: record_llm_call("analyze", 1.4, LLM_RESULT), iterations)
+    request_ns = _ns_per_call(_request_metrics, max(1, iterations // 10)) + 8 * ops["step_wrapper"]
+    REGISTRY.clear()
+    return {
+        "iterations": iterations,
+        "ns_per_op": {name: round(value, 1) for name, value in ops.items()},
+        "record_llm_call_ns": round(llm_call_ns, 1),
+        "per_request_us": round(request_ns / 1000, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--budget-us", type=float, default=1.0)
+    args = parser.parse_args()
+    report = run_benchmark(args.iterations)
+    over_budget = [
+        name for name, ns in report["ns_per_op"].items() if ns > args.budget_us * 1000
+    ]
+    report["budget_us_per_op"] = args.budget_us
+    report["over_budget"] = over_budget
+    print(json.dumps(report, indent=2))
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Отчёт об экономии токенов компактной сериализации api_data.
+
+Запуск:
+    python -m benchmarks.prompt_tokens [path/to/records.jsonl]
+
+Каждая строка файла — записанный запрос: {"node": ..., "user_query": ..., "api_data": {...}}.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+from app.agent.prompt_data import compact_api_data, estimate_tokens
+from app.config import get_settings
+
+DEFAULT_RECORDS = Path(__file__).parent / "data" / "api_data_samples.jsonl"
+
+
+def _legacy_render(node: str, api_data: dict) -> str:
+    """Сериализация, которую узлы использовали до компактного формата."""
+    if node == "analyze":
+        return json.dumps(api_data, ensure_ascii=False, indent=2, default=str)
+    return json.dumps(api_data, ensure_ascii=False, default=str)
+
+
+def _budget_for(node: str) -> int:
+    settings = get_settings()
+    if node == "analyze":
+        return settings.prompt_budget_analyze_tokens
+    return settings.prompt_budget_route_tokens
+
+
+def build_report(records: list[dict]) -> dict:
+    """Считает токены до/после для каждой записи и суммарную экономию."""
+    rows = []
+    for record in records:
+        node = record.get("node", "analyze")
+        api_data = record.get("api_data", {})
+        before = estimate_tokens(_legacy_render(node, api_data))
+        after = estimate_tokens(compact_api_data(api_data, _budget_for(node)))
+        rows.append(
+            {
+                "node": node,
+                "user_query": record.get("user_query", ""),
+                "tokens_before": before,
+                "tokens_after": after,
+                "saved_pct": round(100 * (before - after) / before, 1) if before else 0.0,
+            }
+        )
+    total_before = sum(row["tokens_before"] for row in rows)
+    total_after = sum(row["tokens_after"] for row in rows)
+    return {
+        "rows": rows,
+        "tokens_before": total_before,
+        "tokens_after": total_after,
+        "saved_pct": (
+            round(100 * (total_before - total_after) / total_before, 1) if total_before else 0.0
+        ),
+    }
+
+
+def load_records(path: Path) -> list[dict]:
+    with path.open(encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def main(argv: list[str]) -> None:
+    path = Path(argv[0]) if argv else DEFAULT_RECORDS
+    report = build_report(load_records(path))
+    print(f"{'node':<20} {'before':>8} {'after':>8} {'saved':>7}  query")
+    for row in report["rows"]:
+        print(
+            f"{row['node']:<20} {row['tokens_before']:>8} {row['tokens_after']:>8} "
+            f"{row['saved_pct']:>6.1f}%  {row['user_query']}"
+        )
+    print(
+        f"{'TOTAL':<20} {report['tokens_before']:>8} {report['tokens_after']:>8} "
+        f"{report['saved_pct']:>6.1f}%"
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,194 @@
+"""Воспроизведение записанных запросов `/chat` через граф агента.
+
+Запуск:
+    python -m benchmarks.replay data/records.jsonl [--timing fast|original] [--speed 1.0]
+        [--output report.json] [--baseline report.json] [--tolerance 0.15] [--strict]
+
+Записи делает само приложение с `RECORD_TRACE_PATH`. Запросы проходят через тот
+же путь, что и `/chat` (очередь диалога, планировщик LLM, граф), с
+чекпоинтером в памяти, а ответы внешних API и LLM берутся из записи — сеть не
+нужна, и прогон детерминирован.
+
+- `fast` — запросы по одному в порядке записи, записанные ответы отдаются
+  сразу: остаётся только собственное время приложения;
+- `original` — запросы приходят с исходными интервалами, ответы — с исходными
+  задержками; `--speed 2` ускоряет и то и другое вдвое.
+
+Отчёт (JSON): записанная и воспроизведённая задержка (p50/p90/p99), число
+запросов с изменившимся статусом, intent или текстом ответа (с примерами),
+вызовы, для которых в записи нет ответа, и неиспользованные ответы. С
+`--baseline` (отчёт прошлого воспроизведения) p50/p99 сравниваются, и при
+ухудшении больше `--tolerance` код возврата 1; с `--strict` — также при
+изменившихся ответах.
+
+Фоновое сжатие истории идёт после ответа и в запись не попадает: при
+воспроизведении его вызов LLM виден в `calls.unmatched` как `llm:summarize`.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from app.recording import Replay, load_records, replay_request
+
+MAX_EXAMPLES = 10
+EXAMPLE_CHARS = 200
+MIN_LATENCY_DELTA_MS = 1.0
+
+
+def _percentiles(samples_ms: list[float]) -> dict:
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {"count": 0}
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+    return {
+        "count": len(ordered),
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "mean_ms": round(statistics.mean(ordered), 1),
+    }
+
+
+async def _replay_one(record: dict, realtime: bool, speed: float) -> tuple[dict, Replay]:
+    from fastapi import HTTPException
+
+    from app.main import ChatRequest, _run_chat
+
+    outcome = {"status": 200, "intent": None, "response": None}
+    start = time.perf_counter()
+    with replay_request(record, realtime=realtime, speed=speed) as replay:
+        try:
+            result = await _run_chat(
+                ChatRequest(message=record["message"], thread_id=record["thread_id"])
+            )
+            outcome.update(intent=result.intent, response=result.response)
+        except HTTPException as exc:
+            outcome["status"] = exc.status_code
+    outcome["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return outcome, replay
+
+
+async def run_replay(records: list[dict], timing: str = "fast", speed: float = 1.0) -> dict:
+    """Прогоняет записи через `/chat`-путь и сравнивает с записанными итогами."""
+    from app.agent.history import wait_for_background_compaction
+    from app.llm.gigachat import close_llm
+
+    realtime = timing == "original"
+    if realtime:
+        origin = records[0]["started_at"] if records else 0.0
+        loop_start = time.perf_counter()
+
+        async def scheduled(record: dict) -> tuple[dict, Replay]:
+            delay = (record["started_at"] - origin) / speed - (time.perf_counter() - loop_start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return await _replay_one(record, realtime, speed)
+
+        results = await asyncio.gather(*(scheduled(record) for record in records))
+    else:
+        results = [await _replay_one(record, realtime, speed) for record in records]
+    # Фоновое сжатие истории тоже вызывает LLM: ждём его, чтобы посчитать все вызовы.
+    await wait_for_background_compaction()
+    await close_llm()
+
+    examples, changed = [], 0
+    for index, (record, (outcome, _)) in enumerate(zip(records, results)):
+        recorded = {key: record.get(key) for key in ("status", "intent", "response")}
+        replayed = {key: outcome[key] for key in recorded}
+        if recorded == replayed:
+            continue
+        changed += 1
+        if len(examples) < MAX_EXAMPLES:
+            examples.append(
+                {
+                    "index": index,
+                    "thread_id": record["thread_id"],
+                    "message": record["message"],
+                    "recorded": {
+                        **recorded,
+                        "response": (recorded["response"] or "")[:EXAMPLE_CHARS],
+                    },
+                    "replayed": {
+                        **replayed,
+                        "response": (replayed["response"] or "")[:EXAMPLE_CHARS],
+                    },
+                }
+            )
+    unmatched = Counter(name for _, replay in results for name in replay.unmatched)
+    return {
+        "records": len(records),
+        "timing": timing,
+        "speed": speed,
+        "latency": {
+            "recorded": _percentiles(
+                [r["duration_ms"] for r in records if r.get("duration_ms") is not None]
+            ),
+            "replayed": _percentiles([outcome["duration_ms"] for outcome, _ in results]),
+        },
+        "outputs": {
+            "identical": len(records) - changed,
+            "changed": changed,
+            "examples": examples,
+        },
+        "calls": {
+            "recorded": sum(len(r.get("calls", [])) for r in records),
+            "unmatched": dict(unmatched),
+            "unused": sum(replay.unused for _, replay in results),
+        },
+    }
+
+
+def compare_reports(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Ухудшения воспроизведённой задержки относительно прошлого отчёта."""
+    regressions = []
+    now, base = current["latency"]["replayed"], baseline["latency"]["replayed"]
+    for key in ("p50_ms", "p99_ms"):
+        if key not in now or key not in base:
+            continue
+        if now[key] > base[key] * (1 + tolerance) and now[key] - base[key] > MIN_LATENCY_DELTA_MS:
+            regressions.append(f"latency.replayed.{key}: {now[key]} > {base[key]}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("records", type=Path)
+    parser.add_argument("--timing", choices=("fast", "original"), default="fast")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--strict", action="store_true")
+    args = parser.parse_args()
+
+    # Клиенты GigaChat создаются, но в сеть не ходят; состояние диалогов — в памяти.
+    os.environ.setdefault("GIGACHAT_CREDENTIALS", "replay")
+    os.environ["CHECKPOINTER"] = "memory"
+    os.environ.pop("RECORD_TRACE_PATH", None)
+    report = asyncio.run(run_replay(load_records(args.records), args.timing, args.speed))
+    regressions = []
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare_reports(report, baseline, args.tolerance)
+        report["baseline"] = str(args.baseline)
+        report["regressions"] = regressions
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output is not None:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    print(text)
+    if regressions or (args.strict and report["outputs"]["changed"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
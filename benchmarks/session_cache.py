@@ -0,0 +1,132 @@
+"""Замер времени ответа с сессиями GigaChat и без них на локальном stand-in сервере.
+
+Запуск:
+    python -m benchmarks.session_cache [--turns 8] [--threads 4]
+
+Прогоняет многоходовые диалоги с промптом классификатора через настоящий клиент
+langchain-gigachat и печатает среднюю задержку вызова и долю закэшированных токенов.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import uvicorn
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_gigachat import GigaChat
+
+from app.agent.router import CLASSIFY_PROMPT, COREFERENCE_HINT
+from app.llm.gigachat import llm_session
+from benchmarks.gigachat_standin import create_app
+
+QUESTIONS = (
+    "Сколько стоит биткоин?",
+    "А что с ним было за неделю?",
+    "Какие новости по нему?",
+    "Стоит ли его сейчас покупать?",
+    "А эфир?",
+    "Что такое стейкинг?",
+)
+
+
+async def _run_dialog(llm: GigaChat, thread_id: str, turns: int, use_session: bool) -> list[dict]:
+    history: list[str] = []
+    samples = []
+    for turn in range(turns):
+        question = QUESTIONS[turn % len(QUESTIONS)]
+        history_text = "\n".join(history[-6:]) or "(история пуста)"
+        messages = [
+            SystemMessage(content=f"{CLASSIFY_PROMPT}\n{COREFERENCE_HINT}"),
+            HumanMessage(
+                content=(
+                    f"История диалога (последние сообщения):\n{history_text}\n\n"
+                    f"Текущий вопрос пользователя: {question}"
+                )
+            ),
+        ]
+        start = time.perf_counter()
+        if use_session:
+            with llm_session(thread_id, "classify"):
+                result = await llm.ainvoke(messages)
+        else:
+            result = await llm.ainvoke(messages)
+        usage = result.response_metadata.get("token_usage", {}) or {}
+        samples.append(
+            {
+                "latency": time.perf_counter() - start,
+                "prompt_tokens": usage.get("prompt_tokens", 0),
+                "cached_tokens": usage.get("precached_prompt_tokens") or 0,
+            }
+        )
+        history += [f"user: {question}", f"assistant: {result.content}"]
+    return samples
+
+
+def _summarize(samples: list[dict]) -> dict:
+    prompt_tokens = sum(s["prompt_tokens"] for s in samples)
+    return {
+        "calls": len(samples),
+        "mean_latency_ms": round(statistics.mean(s["latency"] for s in samples) * 1000, 1),
+        "cached_token_share": (
+            round(sum(s["cached_tokens"] for s in samples) / prompt_tokens, 3)
+            if prompt_tokens
+            else 0.0
+        ),
+    }
+
+
+async def run_benchmark(
+    turns: int = 8,
+    threads: int = 4,
+    base_latency: float = 0.02,
+    per_token_latency: float = 0.0005,
+) -> dict:
+    """Поднимает stand-in сервер и сравнивает диалоги с сессиями и без."""
+    config = uvicorn.Config(
+        create_app(base_latency, per_token_latency),
+        host="127.0.0.1",
+        port=0,
+        log_level="warning",
+    )
+    server = uvicorn.Server(config)
+    serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    llm = GigaChat(
+        base_url=f"http://127.0.0.1:{port}/api/v1",
+        access_token="stand-in",
+        verify_ssl_certs=False,
+        model="GigaChat-2",
+    )
+    try:
+        report = {}
+        for use_session in (False, True):
+            dialogs = await asyncio.gather(
+                *(
+                    _run_dialog(llm, f"bench-{use_session}-{i}", turns, use_session)
+                    for i in range(threads)
+                )
+            )
+            key = "with_session" if use_session else "without_session"
+            report[key] = _summarize([s for dialog in dialogs for s in dialog])
+    finally:
+        await llm._client.aclose()
+        server.should_exit = True
+        await serve_task
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run_benchmark(args.turns, args.threads)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
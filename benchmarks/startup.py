@@ -0,0 +1,139 @@
+"""Холодный старт: профиль импорта `app.main` и время до готовности приложения.
+
+Запуск:
+    python -m benchmarks.startup [--runs 5] [--top 10]
+
+Каждый замер выполняется в отдельном процессе Python. Печатает:
+- отчёт `python -X importtime -c "import app.main"`: общее время, самые дорогие
+  прямые импорты и какие тяжёлые пакеты (LangGraph, GigaChat SDK, ddgs) загружены;
+- медиану времени импорта `app.main` и времени до готовности (импорт + lifespan с
+  компиляцией графа, без прогрева LLM);
+- для сравнения — время, которое занимал импорт, когда все тяжёлые зависимости
+  и граф загружались при импорте модуля.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("langgraph.graph", "langchain_gigachat", "gigachat", "ddgs")
+
+_STARTUP_SNIPPET = """
+import asyncio, json, time
+start = time.perf_counter()
+import app.main as main
+imported = time.perf_counter()
+
+async def serve():
+    async with main.lifespan(main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(serve())
+print(json.dumps({"import_ms": (imported - start) * 1000, "ready_ms": (ready - start) * 1000}))
+"""
+
+_EAGER_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import app.main
+import ddgs, gigachat.context, langchain_gigachat
+from app.agent.graph import get_agent_graph
+get_agent_graph()
+print(json.dumps({"eager_import_ms": (time.perf_counter() - start) * 1000}))
+"""
+
+
+def _env() -> dict:
+    return {**os.environ, "LLM_WARMUP_ENABLED": "false", "CHECKPOINTER": "memory"}
+
+
+def parse_importtime(stderr: str) -> list[dict]:
+    """Разбирает вывод `-X importtime` в список модулей с глубиной вложенности."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, raw_name = line[len("import time:") :].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # строка заголовка
+        name = raw_name.strip()
+        rows.append(
+            {
+                "module": name,
+                "depth": (len(raw_name) - len(raw_name.lstrip()) - 1) // 2,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+            }
+        )
+    return rows
+
+
+def importtime_report(module: str = "app.main", top: int = 10) -> dict:
+    """Профиль импорта модуля в чистом процессе."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=_env(),
+    )
+    rows = parse_importtime(proc.stderr)
+    loaded = {row["module"] for row in rows}
+    root_index = max(i for i, row in enumerate(rows) if row["module"] == module)
+    root = rows[root_index]
+    # Дети печатаются перед родителем: поддерево корня — строки после предыдущего
+    # модуля того же или меньшего уровня.
+    subtree_start = root_index
+    while subtree_start > 0 and rows[subtree_start - 1]["depth"] > root["depth"]:
+        subtree_start -= 1
+    children = sorted(
+        (row for row in rows[subtree_start:root_index] if row["depth"] == root["depth"] + 1),
+        key=lambda row: row["cumulative_us"],
+        reverse=True,
+    )
+    return {
+        "module": module,
+        "total_ms": round(root["cumulative_us"] / 1000, 1),
+        "heavy_loaded": [name for name in HEAVY_MODULES if name in loaded],
+        "top_imports_ms": {
+            row["module"]: round(row["cumulative_us"] / 1000, 1) for row in children[:top]
+        },
+    }
+
+
+def _run_snippet(snippet: str) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-c", snippet], capture_output=True, text=True, check=True, env=_env()
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(runs: int, top: int) -> dict:
+    startup = [_run_snippet(_STARTUP_SNIPPET) for _ in range(runs)]
+    eager = [_run_snippet(_EAGER_SNIPPET) for _ in range(runs)]
+
+    def median(samples: list[dict], key: str) -> float:
+        return round(statistics.median(sample[key] for sample in samples), 1)
+
+    return {
+        "runs": runs,
+        "importtime": importtime_report(top=top),
+        "import_ms": median(startup, "import_ms"),
+        "ready_ms": median(startup, "ready_ms"),
+        "eager_import_ms": median(eager, "eager_import_ms"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args.runs, args.top), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Симулятор внешних API: CoinGecko, NewsAPI, поиск DDGS и GigaChat на одном порту."""
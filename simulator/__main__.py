@@ -0,0 +1,40 @@
+"""Запуск симулятора внешних API.
+
+Запуск:
+    python -m simulator [--host 127.0.0.1] [--port 8900] [--config sim.json] [--seed 1]
+
+`--config` — JSON с полями SimulatorConfig (профили coingecko, newsapi, ddgs,
+gigachat). При старте печатает переменные окружения для приложения.
+"""
+
+import argparse
+from pathlib import Path
+
+import uvicorn
+
+from simulator.app import create_app, simulator_env
+from simulator.profile import SimulatorConfig
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--config", type=Path, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = (
+        SimulatorConfig.model_validate_json(args.config.read_text(encoding="utf-8"))
+        if args.config
+        else SimulatorConfig()
+    )
+    if args.seed is not None:
+        config.seed = args.seed
+    for key, value in simulator_env(f"http://{args.host}:{args.port}").items():
+        print(f"{key}={value}")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
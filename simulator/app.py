@@ -0,0 +1,92 @@
+"""Приложение симулятора и запуск его в текущем event loop.
+
+Все подделки живут на одном порту под своими префиксами; `simulator_env`
+возвращает переменные окружения, направляющие приложение на симулятор.
+Служебные эндпоинты: `GET/PUT /_sim/config` — профили (PUT принимает частичное
+обновление), `GET /_sim/stats` — число ответов по API, эндпоинтам и статусам,
+`POST /_sim/reset` — обнуление счётчиков.
+"""
+
+import asyncio
+import base64
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import uvicorn
+from fastapi import Body, FastAPI, HTTPException
+from pydantic import ValidationError
+
+from simulator import coingecko, ddgs, gigachat, newsapi
+from simulator.core import Simulator
+from simulator.profile import SimulatorConfig, merge_config
+
+SIMULATOR_CREDENTIALS = base64.b64encode(b"simulator:simulator").decode()
+
+
+def create_app(config: SimulatorConfig | None = None) -> FastAPI:
+    """Создаёт приложение симулятора; состояние доступно как `app.state.simulator`."""
+    sim = Simulator(config)
+    app = FastAPI(title="Симулятор внешних API")
+    app.state.simulator = sim
+    for module in (coingecko, newsapi, ddgs, gigachat):
+        app.include_router(module.create_router(sim))
+
+    @app.get("/_sim/config")
+    async def get_config() -> dict:
+        return sim.config.model_dump()
+
+    @app.put("/_sim/config")
+    async def update_config(update: dict = Body(...)) -> dict:
+        try:
+            sim.configure(merge_config(sim.config, update))
+        except ValidationError as exc:
+            raise HTTPException(status_code=422, detail=exc.errors(include_url=False)) from exc
+        return sim.config.model_dump()
+
+    @app.get("/_sim/stats")
+    async def stats() -> dict:
+        return sim.snapshot()
+
+    @app.post("/_sim/reset")
+    async def reset() -> dict:
+        sim.stats.clear()
+        return {"status": "ok"}
+
+    return app
+
+
+def simulator_env(base_url: str) -> dict[str, str]:
+    """Переменные окружения, направляющие все внешние вызовы приложения на симулятор."""
+    base_url = base_url.rstrip("/")
+    return {
+        "COINGECKO_BASE_URL": f"{base_url}/coingecko/api/v3",
+        "NEWSAPI_BASE_URL": f"{base_url}/newsapi/v2",
+        "NEWS_API_KEY": "simulator",
+        "DDGS_BASE_URL": f"{base_url}/ddgs",
+        "GIGACHAT_BASE_URL": f"{base_url}/gigachat/api/v1",
+        "GIGACHAT_AUTH_URL": f"{base_url}/gigachat/api/v2/oauth",
+        "GIGACHAT_CREDENTIALS": SIMULATOR_CREDENTIALS,
+        "GIGACHAT_VERIFY_SSL_CERTS": "false",
+    }
+
+
+@asynccontextmanager
+async def serve(
+    config: SimulatorConfig | None = None, host: str = "127.0.0.1", port: int = 0
+) -> AsyncIterator[FastAPI]:
+    """Запускает симулятор в текущем event loop; адрес — в `app.state.base_url`."""
+    app = create_app(config)
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            await task
+            raise RuntimeError("Симулятор не запустился.")
+        await asyncio.sleep(0.01)
+    bound_port = server.servers[0].sockets[0].getsockname()[1]
+    app.state.base_url = f"http://{host}:{bound_port}"
+    try:
+        yield app
+    finally:
+        server.should_exit = True
+        await task
@@ -0,0 +1,178 @@
+"""Подделка CoinGecko: `/coins/markets` и `/coins/{id}`.
+
+Цены плавно колеблются вокруг базовых значений (период — час), поэтому
+повторные запросы видят движение цены, а не одно и то же число.
+"""
+
+import math
+import time
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Query
+from fastapi.responses import JSONResponse
+
+from simulator.core import Simulator
+
+# CoinGecko ID, тикер, название, базовая цена в USD, предложение в обращении, амплитуда колебаний.
+COINS = (
+    ("bitcoin", "btc", "Bitcoin", 65000.0, 19.7e6, 0.03),
+    ("ethereum", "eth", "Ethereum", 3200.0, 120.2e6, 0.04),
+    ("ripple", "xrp", "XRP", 0.55, 55.5e9, 0.05),
+    ("solana", "sol", "Solana", 150.0, 465e6, 0.06),
+    ("cardano", "ada", "Cardano", 0.45, 35.3e9, 0.05),
+    ("dogecoin", "doge", "Dogecoin", 0.12, 145e9, 0.07),
+    ("polkadot", "dot", "Polkadot", 6.5, 1.45e9, 0.05),
+    ("polygon-ecosystem-token", "pol", "POL (ex-MATIC)", 0.5, 10e9, 0.05),
+    ("avalanche-2", "avax", "Avalanche", 28.0, 400e6, 0.06),
+    ("chainlink", "link", "Chainlink", 14.0, 600e6, 0.05),
+    ("binancecoin", "bnb", "BNB", 580.0, 150e6, 0.03),
+    ("litecoin", "ltc", "Litecoin", 75.0, 75e6, 0.04),
+    ("the-open-network", "ton", "Toncoin", 5.5, 2.5e9, 0.05),
+    ("tron", "trx", "TRON", 0.12, 87e9, 0.03),
+    ("shiba-inu", "shib", "Shiba Inu", 0.000018, 589e12, 0.08),
+    ("tether", "usdt", "Tether", 1.0, 110e9, 0.0005),
+    ("usd-coin", "usdc", "USDC", 1.0, 33e9, 0.0005),
+)
+COINS_BY_ID = {coin[0]: coin for coin in COINS}
+# Валюты карт market_data в `/coins/{id}` (в реальном API их около 60).
+CURRENCIES = tuple(
+    (
+        "usd aed ars aud bdt bhd bmd brl cad chf clp cny czk dkk eur gbp gel hkd huf idr ils "
+        "inr jpy krw kwd lkr mmk mxn myr ngn nok nzd php pkr pln rub sar sek sgd thb try twd "
+        "uah vef vnd zar xdr xag xau bits sats btc eth ltc bch bnb eos xrp xlm link dot yfi"
+    ).split()
+)
+PERIOD_SECONDS = 3600.0
+
+
+def _price(coin: tuple, now: float, offset: float = 0.0) -> float:
+    coin_id, _, _, base, _, amplitude = coin
+    phase = (sum(coin_id.encode()) % 360) * math.pi / 180
+    return base * (1 + amplitude * math.sin(2 * math.pi * (now - offset) / PERIOD_SECONDS + phase))
+
+
+def _change_pct(coin: tuple, now: float, seconds: float) -> float:
+    before = _price(coin, now, seconds)
+    return (_price(coin, now) - before) / before * 100
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def market_entry(coin: tuple, rank: int, now: float) -> dict:
+    """Элемент ответа `/coins/markets`."""
+    coin_id, symbol, name, base, supply, amplitude = coin
+    price = _price(coin, now)
+    change = _change_pct(coin, now, 86400)
+    ath = base * (1 + amplitude) * 1.25
+    return {
+        "id": coin_id,
+        "symbol": symbol,
+        "name": name,
+        "image": f"https://coin-images.coingecko.com/coins/images/{rank}/large/{coin_id}.png",
+        "current_price": round(price, 8),
+        "market_cap": round(price * supply),
+        "market_cap_rank": rank,
+        "fully_diluted_valuation": round(price * supply * 1.05),
+        "total_volume": round(price * supply * 0.04),
+        "high_24h": round(price * (1 + amplitude / 3), 8),
+        "low_24h": round(price * (1 - amplitude / 3), 8),
+        "price_change_24h": round(price - _price(coin, now, 86400), 8),
+        "price_change_percentage_24h": round(change, 5),
+        "market_cap_change_24h": round((price - _price(coin, now, 86400)) * supply),
+        "market_cap_change_percentage_24h": round(change, 5),
+        "circulating_supply": supply,
+        "total_supply": supply * 1.05,
+        "max_supply": None,
+        "ath": round(ath, 8),
+        "ath_change_percentage": round((price - ath) / ath * 100, 5),
+        "ath_date": "2024-03-14T07:10:36.635Z",
+        "atl": round(base * 0.01, 10),
+        "atl_change_percentage": round((price / (base * 0.01) - 1) * 100, 5),
+        "atl_date": "2015-01-14T00:00:00.000Z",
+        "roi": None,
+        "last_updated": _iso(now),
+        "price_change_percentage_24h_in_currency": round(change, 5),
+    }
+
+
+def coin_detail(sim: Simulator, coin: tuple, now: float, scale: float) -> dict:
+    """Ответ `/coins/{id}`: тяжёлый JSON с картами по валютам, как у настоящего API."""
+    entry = market_entry(coin, COINS.index(coin) + 1, now)
+    currencies = CURRENCIES[: max(1, round(len(CURRENCIES) * min(scale, 1.0)))]
+    currencies += tuple(f"x{i:03d}" for i in range(max(0, round(len(CURRENCIES) * (scale - 1)))))
+    rates = {code: 1.0 + (sum(code.encode()) % 97) / 10 for code in currencies}
+    rates["usd"] = 1.0
+
+    def per_currency(value: float) -> dict:
+        return {code: round(value * rates[code], 8) for code in currencies}
+
+    return {
+        "id": entry["id"],
+        "symbol": entry["symbol"],
+        "name": entry["name"],
+        "categories": ["Cryptocurrency", "Layer 1 (L1)"],
+        "description": {"en": sim.filler(round(300 * scale), english=True)},
+        "links": {"homepage": [f"https://{entry['id']}.org"]},
+        "market_cap_rank": entry["market_cap_rank"],
+        "market_data": {
+            "current_price": per_currency(entry["current_price"]),
+            "ath": per_currency(entry["ath"]),
+            "ath_change_percentage": per_currency(entry["ath_change_percentage"]),
+            "market_cap": per_currency(entry["market_cap"]),
+            "total_volume": per_currency(entry["total_volume"]),
+            "high_24h": per_currency(entry["high_24h"]),
+            "low_24h": per_currency(entry["low_24h"]),
+            "price_change_percentage_24h": entry["price_change_percentage_24h"],
+            "price_change_percentage_7d": round(_change_pct(coin, now, 7 * 86400 + 900), 5),
+            "price_change_percentage_30d": round(_change_pct(coin, now, 30 * 86400 + 1800), 5),
+            "circulating_supply": entry["circulating_supply"],
+            "last_updated": entry["last_updated"],
+        },
+        "last_updated": entry["last_updated"],
+    }
+
+
+def _error(sim: Simulator, status: int) -> JSONResponse:
+    message = (
+        "You've exceeded the Rate Limit. Please visit https://www.coingecko.com/en/api/pricing "
+        "to subscribe to our API plans for higher rate limits."
+        if status == 429
+        else "Internal Server Error"
+    )
+    return sim.error("coingecko", status, {"status": {"error_code": status, "error_message": message}})
+
+
+def create_router(sim: Simulator) -> APIRouter:
+    router = APIRouter(prefix="/coingecko/api/v3")
+
+    @router.get("/coins/markets")
+    async def coins_markets(
+        vs_currency: str,
+        ids: str | None = None,
+        per_page: int = Query(default=100, ge=1, le=250),
+        page: int = Query(default=1, ge=1),
+    ):
+        status = await sim.gate("coingecko", "/coins/markets")
+        if status != 200:
+            return _error(sim, status)
+        now = time.time()
+        ranked = [(rank, coin) for rank, coin in enumerate(COINS, start=1)]
+        if ids is not None:
+            wanted = {coin_id.strip() for coin_id in ids.split(",")}
+            ranked = [(rank, coin) for rank, coin in ranked if coin[0] in wanted]
+        start = (page - 1) * per_page
+        return [market_entry(coin, rank, now) for rank, coin in ranked[start : start + per_page]]
+
+    @router.get("/coins/{coin_id}")
+    async def coin(coin_id: str):
+        status = await sim.gate("coingecko", "/coins/{id}")
+        if status != 200:
+            return _error(sim, status)
+        found = COINS_BY_ID.get(coin_id)
+        if found is None:
+            return JSONResponse({"error": "coin not found"}, status_code=404)
+        return coin_detail(sim, found, time.time(), sim.profile("coingecko").payload_scale)
+
+    return router
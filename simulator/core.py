@@ -0,0 +1,103 @@
+"""Общее состояние симулятора: профили, генератор случайных чисел и счётчики вызовов."""
+
+import asyncio
+import random
+from collections import Counter
+
+from fastapi.responses import JSONResponse
+
+from simulator.profile import SimulatorConfig, UpstreamProfile
+
+WORDS = (
+    "рынок",
+    "биткоин",
+    "ликвидность",
+    "волатильность",
+    "инвесторы",
+    "объём",
+    "торгов",
+    "капитализация",
+    "сеть",
+    "комиссии",
+    "регулятор",
+    "биржа",
+    "спрос",
+    "предложение",
+    "тренд",
+    "поддержка",
+    "сопротивление",
+    "стейкинг",
+    "протокол",
+    "обновление",
+)
+EN_WORDS = (
+    "market",
+    "bitcoin",
+    "liquidity",
+    "volatility",
+    "investors",
+    "volume",
+    "exchange",
+    "regulators",
+    "network",
+    "fees",
+    "demand",
+    "supply",
+    "rally",
+    "support",
+    "resistance",
+    "staking",
+    "protocol",
+    "upgrade",
+    "analysts",
+    "outflows",
+)
+
+
+class Simulator:
+    """Состояние одного экземпляра симулятора."""
+
+    def __init__(self, config: SimulatorConfig | None = None):
+        self.config = config or SimulatorConfig()
+        self.rng = random.Random(self.config.seed)
+        self.stats: Counter[tuple[str, str, int]] = Counter()
+        # Выданные токены GigaChat: токен -> срок действия (time.time()).
+        self.tokens: dict[str, float] = {}
+
+    def configure(self, config: SimulatorConfig) -> None:
+        if config.seed != self.config.seed:
+            self.rng = random.Random(config.seed)
+        self.config = config
+
+    def profile(self, upstream: str) -> UpstreamProfile:
+        return getattr(self.config, upstream)
+
+    async def gate(self, upstream: str, endpoint: str) -> int:
+        """Выдерживает задержку профиля и решает статус ответа (200, 429 или 500)."""
+        profile = self.profile(upstream)
+        status = profile.outcome(self.rng)
+        await asyncio.sleep(profile.latency.sample(self.rng))
+        self.record(upstream, endpoint, status)
+        return status
+
+    def record(self, upstream: str, endpoint: str, status: int) -> None:
+        self.stats[(upstream, endpoint, status)] += 1
+
+    def snapshot(self) -> dict:
+        """Число ответов: upstream -> endpoint -> статус -> количество."""
+        result: dict[str, dict[str, dict[str, int]]] = {}
+        for (upstream, endpoint, status), count in sorted(self.stats.items()):
+            result.setdefault(upstream, {}).setdefault(endpoint, {})[str(status)] = count
+        return result
+
+    def error(self, upstream: str, status: int, body: object) -> JSONResponse:
+        headers = {}
+        if status == 429:
+            headers["Retry-After"] = str(self.profile(upstream).retry_after_seconds)
+        return JSONResponse(body, status_code=status, headers=headers)
+
+    def filler(self, words: int, english: bool = False) -> str:
+        """Связный на вид текст заданной длины в словах."""
+        vocabulary = EN_WORDS if english else WORDS
+        text = " ".join(self.rng.choice(vocabulary) for _ in range(max(words, 1)))
+        return text[:1].upper() + text[1:] + "."
@@ -0,0 +1,32 @@
+"""Поиск в формате ddgs: `GET /ddgs/search?q=&max_results=` отдаёт записи title/href/body.
+
+Библиотеку ddgs нельзя направить на другой адрес, поэтому приложение с
+`DDGS_BASE_URL` ходит в этот эндпоинт по HTTP вместо библиотеки.
+"""
+
+from fastapi import APIRouter, Query
+
+from simulator.core import Simulator
+
+SITES = ("investing.com", "forbes.com", "reuters.com", "coindesk.com", "bloomberg.com")
+
+
+def create_router(sim: Simulator) -> APIRouter:
+    router = APIRouter(prefix="/ddgs")
+
+    @router.get("/search")
+    async def search(q: str, max_results: int = Query(default=5, ge=1, le=50)):
+        status = await sim.gate("ddgs", "/search")
+        if status != 200:
+            return sim.error("ddgs", status, {"error": "ratelimit" if status == 429 else "error"})
+        scale = sim.profile("ddgs").payload_scale
+        return [
+            {
+                "title": f"{q} — {sim.filler(6, english=True)}",
+                "href": f"https://www.{SITES[i % len(SITES)]}/{q.lower().replace(' ', '-')}-{i}",
+                "body": sim.filler(round(40 * scale), english=True),
+            }
+            for i in range(max_results)
+        ]
+
+    return router
@@ -0,0 +1,191 @@
+"""Подделка GigaChat: OAuth, `/models` и `/chat/completions` (в том числе потоковый).
+
+Ответ зависит от системного промпта: классификатору — JSON или вызов функции
+`classify_request` с intent по ключевым словам вопроса, роутеру поиска — «no»,
+остальным ролям — текст длины, заданной payload_scale. Задержка и ошибки
+профиля применяются только к `/chat/completions`.
+"""
+
+import asyncio
+import json
+import re
+import time
+import uuid
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.agent.prompt_data import estimate_tokens
+from simulator.core import Simulator
+
+ANSWER_WORDS = 120
+CHUNK_WORDS = 4
+INTENT_KEYWORDS = (
+    ("analytics", ("стоит ли", "покупать", "продавать", "прогноз", "анализ", "инвест", "buy", "sell")),
+    ("news", ("новост", "news", "событи")),
+    ("price", ("сколько стоит", "цена", "цену", "курс", "стоимость", "почём", "price")),
+)
+COIN_ALIASES = {
+    "bitcoin": ("bitcoin", "биткоин", "биткойн", "btc"),
+    "ethereum": ("ethereum", "эфириум", "эфир", "eth"),
+    "solana": ("solana", "солана", "sol"),
+    "ripple": ("ripple", "рипл", "xrp"),
+    "cardano": ("cardano", "кардано", "ada"),
+    "dogecoin": ("dogecoin", "догикоин", "doge"),
+    "the-open-network": ("toncoin", "тонкоин", "ton"),
+    "tron": ("tron", "трон", "trx"),
+    "binancecoin": ("binance", "bnb"),
+    "litecoin": ("litecoin", "лайткоин", "ltc"),
+}
+QUESTION_MARKER = "Текущий вопрос пользователя:"
+
+
+def classify(text: str) -> tuple[str, str]:
+    """Intent и CoinGecko ID монеты по ключевым словам вопроса."""
+    lowered = text.lower()
+    intent = next(
+        (intent for intent, words in INTENT_KEYWORDS if any(w in lowered for w in words)),
+        "chat",
+    )
+    tokens = re.findall(r"[a-zа-яё0-9]+", lowered)
+    coin = next(
+        (
+            coin_id
+            for coin_id, aliases in COIN_ALIASES.items()
+            for token in tokens
+            if any(token == a or (len(a) >= 4 and token.startswith(a)) for a in aliases)
+        ),
+        "",
+    )
+    return intent, coin
+
+
+def _reply(sim: Simulator, payload: dict) -> tuple[str, dict | None]:
+    """Текст ответа и вызов функции (для structured-классификации)."""
+    messages = payload.get("messages") or []
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    user = next(
+        (m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), ""
+    )
+    if "классификатор" in system:
+        question = user.rsplit(QUESTION_MARKER, 1)[-1]
+        intent, coin = classify(question)
+        if payload.get("functions"):
+            arguments = {
+                "intent": intent,
+                "coins": [coin] if coin else [],
+                "needs_search": False,
+                "search_query": "",
+            }
+            return "", {"name": "classify_request", "arguments": arguments}
+        return json.dumps({"intent": intent, "coin": coin}, ensure_ascii=False), None
+    if "'yes' или 'no'" in system:
+        return "no", None
+    return sim.filler(round(ANSWER_WORDS * sim.profile("gigachat").payload_scale)), None
+
+
+def _usage(prompt: str, content: str) -> dict:
+    prompt_tokens = estimate_tokens(prompt)
+    completion_tokens = estimate_tokens(content)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "precached_prompt_tokens": 0,
+    }
+
+
+def _error(sim: Simulator, status: int, message: str | None = None) -> JSONResponse:
+    default = "Too Many Requests" if status == 429 else "Internal Server Error"
+    return sim.error("gigachat", status, {"status": status, "message": message or default})
+
+
+def create_router(sim: Simulator) -> APIRouter:
+    router = APIRouter(prefix="/gigachat")
+
+    def authorized(request: Request) -> bool:
+        token = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        return sim.tokens.get(token, 0.0) > time.time()
+
+    @router.post("/api/v2/oauth")
+    async def oauth(request: Request):
+        if not request.headers.get("authorization", "").startswith("Basic "):
+            return JSONResponse({"code": 4, "message": "Can't decode 'Authorization' header"}, 401)
+        sim.record("gigachat", "/oauth", 200)
+        expires_at = time.time() + sim.config.gigachat_token_ttl_seconds
+        token = f"sim-{uuid.uuid4().hex}"
+        sim.tokens[token] = expires_at
+        return {"access_token": token, "expires_at": int(expires_at * 1000)}
+
+    @router.get("/api/v1/models")
+    async def models(request: Request):
+        if not authorized(request):
+            return _error(sim, 401, "Token has expired")
+        sim.record("gigachat", "/models", 200)
+        return {
+            "object": "list",
+            "data": [
+                {"id": name, "object": "model", "owned_by": "salutedevices"}
+                for name in ("GigaChat-2", "GigaChat-2-Pro", "GigaChat-2-Max")
+            ],
+        }
+
+    @router.post("/api/v1/chat/completions")
+    async def chat_completions(request: Request):
+        if not authorized(request):
+            return _error(sim, 401, "Token has expired")
+        payload = await request.json()
+        status = await sim.gate("gigachat", "/chat/completions")
+        if status != 200:
+            return _error(sim, status)
+
+        content, function_call = _reply(sim, payload)
+        prompt = "\n".join(str(m.get("content", "")) for m in payload.get("messages") or [])
+        usage = _usage(prompt, content)
+        model = payload.get("model") or "GigaChat"
+        finish_reason = "function_call" if function_call else "stop"
+        message = {"role": "assistant", "content": content}
+        if function_call:
+            message["function_call"] = function_call
+        if not payload.get("stream"):
+            return {
+                "choices": [{"message": message, "index": 0, "finish_reason": finish_reason}],
+                "created": int(time.time()),
+                "model": model,
+                "usage": usage,
+                "object": "chat.completion",
+            }
+
+        delay = sim.profile("gigachat").chunk_delay_ms / 1000
+        words = content.split(" ")
+        pieces = [
+            " ".join(words[i : i + CHUNK_WORDS]) + (" " if i + CHUNK_WORDS < len(words) else "")
+            for i in range(0, len(words), CHUNK_WORDS)
+        ]
+
+        async def events():
+            for index, piece in enumerate(pieces):
+                last = index == len(pieces) - 1
+                delta = {"content": piece}
+                if index == 0:
+                    delta["role"] = "assistant"
+                if last and function_call:
+                    delta["function_call"] = function_call
+                chunk = {
+                    "choices": [
+                        {"delta": delta, "index": 0, "finish_reason": finish_reason if last else None}
+                    ],
+                    "created": int(time.time()),
+                    "model": model,
+                    "object": "chat.completion",
+                }
+                if last:
+                    chunk["usage"] = usage
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                if delay and not last:
+                    await asyncio.sleep(delay)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return router
@@ -0,0 +1,92 @@
+"""Подделка NewsAPI: `/v2/everything`."""
+
+import re
+import time
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import JSONResponse
+
+from simulator.core import Simulator
+
+SOURCES = ("CoinDesk", "Cointelegraph", "Decrypt", "The Block", "Bitcoin.com", "CryptoSlate")
+HEADLINES = (
+    "{topic} climbs as institutional inflows accelerate",
+    "{topic} slips after regulators signal tighter oversight",
+    "Analysts weigh {topic} outlook ahead of macro data",
+    "{topic} network activity hits monthly high",
+    "Exchange outflows of {topic} point to accumulation",
+    "What the latest upgrade means for {topic} holders",
+)
+# Реальный NewsAPI обрезает content до 200 символов.
+CONTENT_CHARS = 200
+
+
+def _topic(query: str) -> str:
+    """Тема запроса приложения `(<тема>) AND (crypto OR cryptocurrency)`."""
+    match = re.match(r"\s*\(([^)]*)\)\s+AND\s+\(", query)
+    topic = (match.group(1) if match else query).strip() or "crypto"
+    return topic[:1].upper() + topic[1:]
+
+
+def _error(sim: Simulator, status: int) -> JSONResponse:
+    if status == 429:
+        code, message = (
+            "rateLimited",
+            "You have been rate limited. Back off for a while before trying the request again.",
+        )
+    else:
+        code, message = "unexpectedError", "This shouldn't happen, and if it does then it's our fault."
+    return sim.error("newsapi", status, {"status": "error", "code": code, "message": message})
+
+
+def create_router(sim: Simulator) -> APIRouter:
+    router = APIRouter(prefix="/newsapi/v2")
+
+    @router.get("/everything")
+    async def everything(
+        request: Request,
+        q: str = "",
+        page_size: int = Query(default=100, ge=1, le=100, alias="pageSize"),
+        page: int = Query(default=1, ge=1),
+    ):
+        if not (request.headers.get("x-api-key") or request.query_params.get("apiKey")):
+            return JSONResponse(
+                {
+                    "status": "error",
+                    "code": "apiKeyMissing",
+                    "message": "Your API key is missing. Append this to the URL with the "
+                    "apiKey param, or use the x-api-key HTTP header.",
+                },
+                status_code=401,
+            )
+        status = await sim.gate("newsapi", "/v2/everything")
+        if status != 200:
+            return _error(sim, status)
+
+        scale = sim.profile("newsapi").payload_scale
+        topic = _topic(q)
+        now = time.time()
+        total = 400
+        count = max(0, min(round(page_size * min(scale, 1.0)), total - (page - 1) * page_size))
+        articles = []
+        for i in range(count):
+            number = (page - 1) * page_size + i
+            source = SOURCES[number % len(SOURCES)]
+            published = datetime.fromtimestamp(now - 1800 * (number + 1), timezone.utc)
+            content = sim.filler(round(60 * scale), english=True)
+            articles.append(
+                {
+                    "source": {"id": None, "name": source},
+                    "author": f"{source} Staff",
+                    "title": HEADLINES[number % len(HEADLINES)].format(topic=topic),
+                    "description": sim.filler(round(30 * scale), english=True),
+                    "url": f"https://news.example.com/{topic.lower()}/{number}",
+                    "urlToImage": f"https://news.example.com/img/{number}.jpg",
+                    "publishedAt": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "content": f"{content[:CONTENT_CHARS]}… [+{len(content)} chars]",
+                }
+            )
+        return {"status": "ok", "totalResults": total, "articles": articles}
+
+    return router
@@ -0,0 +1,90 @@
+"""Профили поведения подделок: задержка, доля ошибок и 429, размер ответов."""
+
+import math
+import random
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+UPSTREAMS = ("coingecko", "newsapi", "ddgs", "gigachat")
+# Квантиль 0.99 стандартного нормального распределения.
+Z_99 = 2.3263
+
+
+class Latency(BaseModel):
+    """Распределение задержки ответа.
+
+    fixed — всегда median_ms; uniform — от min_ms до max_ms; lognormal — медиана
+    median_ms и 99-й перцентиль p99_ms; exponential — медиана median_ms.
+    """
+
+    distribution: Literal["fixed", "uniform", "lognormal", "exponential"] = "lognormal"
+    median_ms: float = Field(default=50.0, ge=0)
+    p99_ms: float = Field(default=250.0, ge=0)
+    min_ms: float = Field(default=0.0, ge=0)
+    max_ms: float = Field(default=100.0, ge=0)
+
+    def sample(self, rng: random.Random) -> float:
+        """Задержка в секундах."""
+        if self.distribution == "uniform":
+            ms = rng.uniform(self.min_ms, self.max_ms)
+        elif self.distribution == "fixed" or self.median_ms <= 0:
+            ms = self.median_ms
+        elif self.distribution == "exponential":
+            ms = rng.expovariate(math.log(2) / self.median_ms)
+        else:
+            sigma = math.log(max(self.p99_ms, self.median_ms) / self.median_ms) / Z_99
+            ms = rng.lognormvariate(math.log(self.median_ms), sigma)
+        return ms / 1000
+
+
+class UpstreamProfile(BaseModel):
+    """Поведение одного внешнего API."""
+
+    latency: Latency = Field(default_factory=Latency)
+    error_rate: float = Field(default=0.0, ge=0, le=1)
+    rate_limit_rate: float = Field(default=0.0, ge=0, le=1)
+    retry_after_seconds: int = Field(default=1, ge=0)
+    # Множитель размера ответов: число статей и валют, длина текстов и ответа LLM.
+    payload_scale: float = Field(default=1.0, gt=0)
+    # Пауза между чанками потокового ответа GigaChat.
+    chunk_delay_ms: float = Field(default=0.0, ge=0)
+
+    def outcome(self, rng: random.Random) -> int:
+        """HTTP-статус очередного ответа: 429, 500 или 200."""
+        roll = rng.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500
+        return 200
+
+
+def _profile(median_ms: float, p99_ms: float) -> UpstreamProfile:
+    return UpstreamProfile(latency=Latency(median_ms=median_ms, p99_ms=p99_ms))
+
+
+class SimulatorConfig(BaseModel):
+    """Настройки симулятора; задержки по умолчанию близки к реальным API."""
+
+    seed: int | None = None
+    coingecko: UpstreamProfile = Field(default_factory=lambda: _profile(80, 400))
+    newsapi: UpstreamProfile = Field(default_factory=lambda: _profile(150, 700))
+    ddgs: UpstreamProfile = Field(default_factory=lambda: _profile(300, 1500))
+    gigachat: UpstreamProfile = Field(default_factory=lambda: _profile(700, 3000))
+    gigachat_token_ttl_seconds: float = Field(default=1800.0, gt=0)
+
+
+def merge_config(config: SimulatorConfig, update: dict) -> SimulatorConfig:
+    """Применяет частичное обновление: вложенные словари сливаются, остальное заменяется."""
+
+    def merge(base: dict, patch: dict) -> dict:
+        merged = dict(base)
+        for key, value in patch.items():
+            if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                merged[key] = merge(merged[key], value)
+            else:
+                merged[key] = value
+        return merged
+
+    return SimulatorConfig.model_validate(merge(config.model_dump(), update))
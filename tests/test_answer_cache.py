@@ -0,0 +1,164 @@
+"""Тесты кэша готовых ответов."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.agent.answer_cache import AnswerCache, detect_language, is_cacheable, reset_answer_cache
+from app.metrics import CACHE_REQUESTS
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    reset_answer_cache()
+    CACHE_REQUESTS.clear()
+    yield
+    reset_answer_cache()
+
+
+def _cache(clock=None, **kwargs) -> AnswerCache:
+    options = {"ttl_seconds": {"price": 60, "news": 300}, "max_entries": 10, "price_move_pct": 0.5}
+    options.update(kwargs)
+    return AnswerCache(clock=clock or FakeClock(), **options)
+
+
+def test_key_uses_resolved_coin_and_language():
+    cache = _cache()
+    cache.put("price", "btc", "Сколько стоит BTC?", "ответ", price_usd=50_000)
+
+    assert cache.get("price", "bitcoin", "Цена биткоина?") == "ответ"
+    assert cache.get("price", "bitcoin", "BTC price?") is None
+    assert cache.get("analytics", "bitcoin", "Анализ BTC") is None
+    assert detect_language("Сколько стоит ETH") == "ru"
+    assert CACHE_REQUESTS.value("answer", "hit") == 1
+    assert CACHE_REQUESTS.value("answer", "miss") == 1
+
+
+def test_open_ended_questions_bypass_cache():
+    cache = _cache()
+    cache.put("price", "bitcoin", "Почему BTC упал?", "Из-за ликвидаций...")
+
+    assert cache.get("price", "bitcoin", "цена BTC") is None
+    cache.put("price", "bitcoin", "цена BTC", "btc")
+    assert cache.get("price", "bitcoin", "Почему BTC упал?") is None
+
+
+def test_entries_expire_with_time_bucket():
+    clock = FakeClock(now=120.0)
+    cache = _cache(clock)
+    cache.put("price", "bitcoin", "Цена BTC", "btc")
+    cache.put("news", "bitcoin", "Новости BTC", "news")
+
+    clock.now = 179.0
+    assert cache.get("price", "bitcoin", "Цена BTC") == "btc"
+    clock.now = 180.0
+    assert cache.get("price", "bitcoin", "Цена BTC") is None
+    assert cache.get("news", "bitcoin", "Новости BTC") == "news"
+
+
+def test_price_move_beyond_threshold_invalidates_price_answer():
+    cache = _cache()
+    cache.put("price", "bitcoin", "Цена BTC", "btc", price_usd=50_000)
+
+    cache.observe_price("btc", 50_200)
+    assert cache.get("price", "bitcoin", "Цена BTC") == "btc"
+
+    cache.observe_price("bitcoin", 50_400)
+    assert cache.get("price", "bitcoin", "Цена BTC") is None
+    assert len(cache) == 0
+
+
+def test_lru_eviction_and_cacheable_data():
+    cache = _cache(max_entries=2)
+    for coin in ("bitcoin", "ethereum", "solana"):
+        cache.put("price", coin, "Цена", coin)
+
+    assert cache.get("price", "bitcoin", "Цена") is None
+    assert cache.get("price", "solana", "Цена") == "solana"
+    assert is_cacheable("price", {"price_usd": 1.0})
+    assert not is_cacheable("price", {"error": "timeout"})
+    assert not is_cacheable("news", {"articles": [{"error": "NEWS_API_KEY не задан"}]})
+
+
+@pytest.mark.asyncio
+async def test_graph_serves_cached_answer_and_appends_history(monkeypatch):
+    monkeypatch.setenv("ANSWER_CACHE_ENABLED", "true")
+    # Длинный TTL: оба прогона гарантированно попадают в один временной бакет.
+    monkeypatch.setenv("ANSWER_CACHE_TTL_SECONDS", '{"price": 1e9}')
+    from app.agent.graph import build_graph
+
+    llm = MagicMock()
+    llm.ainvoke = AsyncMock(
+        side_effect=[
+            MagicMock(content='{"intent": "price", "coin": "bitcoin"}'),
+            MagicMock(content="Bitcoin стоит $50,000"),
+            MagicMock(content='{"intent": "price", "coin": "btc"}'),
+        ]
+    )
+    price = AsyncMock(return_value={"name": "Bitcoin", "symbol": "BTC", "price_usd": 50000.0})
+
+    with (
+        patch("app.agent.router.get_llm", return_value=llm),
+        patch("app.agent.nodes.get_llm", return_value=llm),
+        patch("app.agent.nodes.get_price", price),
+    ):
+        graph = build_graph()
+        first = await graph.ainvoke(
+            {"messages": [], "user_query": "Сколько стоит биткоин?"},
+            config={"configurable": {"thread_id": "cache-a"}},
+        )
+        second = await graph.ainvoke(
+            {"messages": [], "user_query": "Почём сейчас BTC?"},
+            config={"configurable": {"thread_id": "cache-b"}},
+        )
+
+    assert first["response"] == second["response"] == "Bitcoin стоит $50,000"
+    assert price.await_count == 1
+    assert llm.ainvoke.await_count == 3
+    assert second["messages"][-1].content == "Bitcoin стоит $50,000"
+    assert CACHE_REQUESTS.value("answer", "hit") == 1
+
+
+@pytest.mark.asyncio
+async def test_graph_does_not_reuse_open_ended_answer(monkeypatch):
+    monkeypatch.setenv("ANSWER_CACHE_ENABLED", "true")
+    monkeypatch.setenv("ANSWER_CACHE_TTL_SECONDS", '{"price": 1e9}')
+    from app.agent.graph import build_graph
+
+    llm = MagicMock()
+    llm.ainvoke = AsyncMock(
+        side_effect=[
+            MagicMock(content='{"intent": "price", "coin": "bitcoin"}'),
+            MagicMock(content="BTC упал из-за ликвидаций"),
+            MagicMock(content='{"intent": "price", "coin": "bitcoin"}'),
+            MagicMock(content="Bitcoin стоит $50,000"),
+        ]
+    )
+    price = AsyncMock(return_value={"name": "Bitcoin", "symbol": "BTC", "price_usd": 50000.0})
+
+    with (
+        patch("app.agent.router.get_llm", return_value=llm),
+        patch("app.agent.nodes.get_llm", return_value=llm),
+        patch("app.agent.nodes.get_price", price),
+    ):
+        graph = build_graph()
+        await graph.ainvoke(
+            {"messages": [], "user_query": "Почему BTC упал?"},
+            config={"configurable": {"thread_id": "cache-why"}},
+        )
+        second = await graph.ainvoke(
+            {"messages": [], "user_query": "цена BTC"},
+            config={"configurable": {"thread_id": "cache-price"}},
+        )
+
+    assert second["response"] == "Bitcoin стоит $50,000"
+    assert price.await_count == 2
+    assert CACHE_REQUESTS.value("answer", "hit") == 0
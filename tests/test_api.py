@@ -93,3 +93,132 @@ async def test_chat_timeout(mock_graph, monkeypatch):
 
     assert resp.status_code == 504
     assert resp.json()["detail"] == "Таймаут обработки запроса. Попробуйте повторить запрос."
+
+
+@pytest.mark.asyncio
+async def test_chat_rejects_when_llm_queue_saturated(mock_graph, monkeypatch):
+    monkeypatch.setenv("GIGACHAT_CREDENTIALS", "test-credentials")
+    saturated = SimpleNamespace(is_saturated=lambda: True)
+    with (
+        patch("app.main.agent_graph", mock_graph),
+        patch("app.main.get_scheduler", return_value=saturated),
+    ):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            resp = await client.post("/chat", json={"message": "Сколько стоит BTC?"})
+
+    assert resp.status_code == 503
+    assert resp.headers["retry-after"] == "1"
+    mock_graph.ainvoke.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_chat_maps_llm_queue_timeout_to_503(mock_graph, monkeypatch):
+    from app.llm.scheduler import LLMQueueTimeoutError
+
+    monkeypatch.setenv("GIGACHAT_CREDENTIALS", "test-credentials")
+    mock_graph.ainvoke = AsyncMock(side_effect=LLMQueueTimeoutError("queue timeout"))
+    with patch("app.main.agent_graph", mock_graph):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            resp = await client.post("/chat", json={"message": "Сколько стоит BTC?"})
+
+    assert resp.status_code == 503
+
+
+# ─── POST /chat/batch ───
+
+
+def _batch_graph(delays: dict[str, float]):
+    """Граф-заглушка: отвечает эхом с задержкой и считает одновременные прогоны."""
+    stats = {"active": 0, "peak": 0}
+
+    async def ainvoke(state, config):
+        stats["active"] += 1
+        stats["peak"] = max(stats["peak"], stats["active"])
+        try:
+            await asyncio.sleep(delays.get(state["user_query"], 0.01))
+        finally:
+            stats["active"] -= 1
+        if state["user_query"] == "boom":
+            raise RuntimeError("graph failed")
+        return {"response": f"echo: {state['user_query']}", "intent": "chat"}
+
+    graph = AsyncMock()
+    graph.ainvoke = ainvoke
+    return graph, stats
+
+
+@pytest.mark.asyncio
+async def test_chat_batch_returns_ordered_results_with_bounded_concurrency(monkeypatch):
+    monkeypatch.setenv("GIGACHAT_CREDENTIALS", "test-credentials")
+    monkeypatch.setenv("CHAT_BATCH_CONCURRENCY", "2")
+    graph, stats = _batch_graph({"slow": 0.05})
+    items = [{"message": m} for m in ("slow", "a", "boom", "b", "c")]
+    with patch("app.main.agent_graph", graph):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            resp = await client.post("/chat/batch", json={"items": items, "concurrency": 10})
+
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert results[0]["result"]["response"] == "echo: slow"
+    assert results[2]["status"] == 500 and results[2]["error"] == "graph failed"
+    assert all(r["status"] == 200 for i, r in enumerate(results) if i != 2)
+    assert all(r["elapsed_ms"] > 0 for r in results)
+    assert stats["peak"] == 2
+
+
+@pytest.mark.asyncio
+async def test_chat_batch_streams_ndjson_in_completion_order(monkeypatch):
+    import json
+
+    monkeypatch.setenv("GIGACHAT_CREDENTIALS", "test-credentials")
+    graph, _ = _batch_graph({"slow": 0.05})
+    items = [{"message": "slow", "thread_id": "t-1"}, {"message": "fast"}]
+    with patch("app.main.agent_graph", graph):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            resp = await client.post("/chat/batch?stream=true", json={"items": items})
+
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [line["index"] for line in lines] == [1, 0]
+    assert lines[1]["result"]["thread_id"] == "t-1"
+
+
+@pytest.mark.asyncio
+async def test_chat_batch_rejects_oversized_batch(mock_graph, monkeypatch):
+    monkeypatch.setenv("GIGACHAT_CREDENTIALS", "test-credentials")
+    monkeypatch.setenv("CHAT_BATCH_MAX_ITEMS", "2")
+    with patch("app.main.agent_graph", mock_graph):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            resp = await client.post("/chat/batch", json={"items": [{"message": "x"}] * 3})
+
+    assert resp.status_code == 413
+    mock_graph.ainvoke.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_llm_scheduler_stats():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get("/llm/scheduler")
+
+    assert resp.status_code == 200
+    data = resp.json()
+    assert {"in_flight", "queued", "wait_seconds", "queue_depth"} <= set(data)
+
+
+@pytest.mark.asyncio
+async def test_checkpointer_stats():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get("/checkpointer")
+
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["type"] == "memory"
+    assert {"threads", "estimated_bytes"} <= set(data)
@@ -0,0 +1,236 @@
+"""Тесты checkpointer: SQLite-хранилище и ограниченный MemorySaver."""
+
+import operator
+from typing import Annotated, TypedDict
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, StateGraph
+
+from app.agent import checkpoint as checkpoint_module
+from app.agent.checkpoint import BoundedMemorySaver, SQLiteCheckpointSaver, build_checkpointer
+from app.config import Settings
+
+
+class CounterState(TypedDict):
+    items: Annotated[list[str], operator.add]
+
+
+def _counter_graph(saver):
+    graph = StateGraph(CounterState)
+    graph.add_node("step", lambda state: {"items": ["x"]})
+    graph.set_entry_point("step")
+    graph.add_edge("step", END)
+    return graph.compile(checkpointer=saver)
+
+
+def _config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "checkpoints.sqlite3")
+
+
+@pytest.mark.asyncio
+async def test_sqlite_saver_persists_state_across_instances(db_path):
+    first = SQLiteCheckpointSaver(db_path)
+    await _counter_graph(first).ainvoke({"items": ["a"]}, _config("t1"))
+    first.close()
+
+    second = SQLiteCheckpointSaver(db_path)
+    result = await _counter_graph(second).ainvoke({"items": ["b"]}, _config("t1"))
+    second.close()
+
+    assert result["items"] == ["a", "x", "b", "x"]
+
+
+def test_sqlite_saver_uses_wal_journal(db_path):
+    saver = SQLiteCheckpointSaver(db_path)
+    mode = saver.pool.call(lambda conn: conn.execute("PRAGMA journal_mode").fetchone()[0])
+    saver.close()
+
+    assert mode == "wal"
+
+
+@pytest.mark.asyncio
+async def test_sqlite_saver_compresses_large_values(db_path):
+    saver = SQLiteCheckpointSaver(db_path)
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"items": ["длинный текст " * 500]}
+
+    await saver.aput(_config("big"), checkpoint, {}, {})
+    stored_type = saver.pool.call(
+        lambda conn: conn.execute("SELECT type FROM checkpoints").fetchone()[0]
+    )
+    loaded = await saver.aget_tuple(_config("big"))
+    saver.close()
+
+    assert stored_type.endswith(checkpoint_module.COMPRESSED_SUFFIX)
+    assert loaded.checkpoint["channel_values"] == checkpoint["channel_values"]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_saver_keeps_only_last_checkpoints(db_path):
+    saver = SQLiteCheckpointSaver(db_path, keep_last=2)
+    graph = _counter_graph(saver)
+    for _ in range(3):
+        await graph.ainvoke({"items": ["a"]}, _config("t1"))
+
+    history = [item async for item in saver.alist(_config("t1"))]
+    state = await graph.aget_state(_config("t1"))
+    saver.close()
+
+    assert len(history) == 2
+    assert state.values["items"] == ["a", "x"] * 3
+
+
+@pytest.mark.asyncio
+async def test_sqlite_saver_returns_pending_writes(db_path):
+    saver = SQLiteCheckpointSaver(db_path)
+    config = await saver.aput(_config("t1"), empty_checkpoint(), {}, {})
+
+    await saver.aput_writes(config, [("items", ["pending"])], task_id="task-1")
+    loaded = await saver.aget_tuple(config)
+    saver.close()
+
+    assert loaded.pending_writes == [("task-1", "items", ["pending"])]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_saver_expires_idle_threads(db_path):
+    saver = SQLiteCheckpointSaver(db_path, ttl_seconds=60)
+    await saver.aput(_config("old"), empty_checkpoint(), {}, {})
+    await saver.aput(_config("fresh"), empty_checkpoint(), {}, {})
+    saver.pool.call(
+        lambda conn: conn.execute("UPDATE threads SET updated_at = 0 WHERE thread_id = 'old'")
+    )
+
+    removed = await saver.aexpire()
+    old = await saver.aget_tuple(_config("old"))
+    fresh = await saver.aget_tuple(_config("fresh"))
+    saver.close()
+
+    assert removed == 1
+    assert old is None
+    assert fresh is not None
+
+
+@pytest.mark.asyncio
+async def test_sqlite_saver_sweeps_idle_threads_on_put(db_path):
+    saver = SQLiteCheckpointSaver(db_path, ttl_seconds=60)
+    await saver.aput(_config("old"), empty_checkpoint(), {}, {})
+    saver.pool.call(lambda conn: conn.execute("UPDATE threads SET updated_at = 0"))
+    saver._next_sweep_at = 0.0
+
+    await saver.aput(_config("fresh"), empty_checkpoint(), {}, {})
+    old = await saver.aget_tuple(_config("old"))
+    saver.close()
+
+    assert old is None
+
+
+@pytest.mark.asyncio
+async def test_sqlite_saver_deletes_thread(db_path):
+    saver = SQLiteCheckpointSaver(db_path)
+    await saver.aput(_config("t1"), empty_checkpoint(), {}, {})
+
+    await saver.adelete_thread("t1")
+    loaded = await saver.aget_tuple(_config("t1"))
+    saver.close()
+
+    assert loaded is None
+
+
+def test_build_checkpointer_selects_implementation(db_path):
+    memory = build_checkpointer(Settings(CHECKPOINTER="memory", CHECKPOINT_MEMORY_MAX_THREADS=10))
+    sqlite = build_checkpointer(
+        Settings(CHECKPOINTER="sqlite", CHECKPOINT_SQLITE_PATH=db_path, CHECKPOINT_KEEP_LAST=5)
+    )
+
+    assert isinstance(memory, BoundedMemorySaver)
+    assert memory.max_threads == 10
+    assert isinstance(sqlite, SQLiteCheckpointSaver)
+    assert sqlite.keep_last == 5
+    sqlite.close()
+
+
+@pytest.mark.asyncio
+async def test_bounded_memory_saver_keeps_last_checkpoints_and_blobs():
+    saver = BoundedMemorySaver(keep_last=2)
+    unbounded = InMemorySaver()
+    graph = _counter_graph(saver)
+    for _ in range(5):
+        await graph.ainvoke({"items": ["a"]}, _config("t1"))
+        await _counter_graph(unbounded).ainvoke({"items": ["a"]}, _config("t1"))
+
+    state = await graph.aget_state(_config("t1"))
+    history = [item async for item in saver.alist(_config("t1"))]
+
+    assert state.values["items"] == ["a", "x"] * 5
+    assert len(history) == 2
+    assert len(saver._versions["t1"]) == 2
+    assert len(saver.blobs) < len(unbounded.blobs) / 2
+
+
+@pytest.mark.asyncio
+async def test_bounded_memory_saver_evicts_least_recently_used_thread():
+    saver = BoundedMemorySaver(max_threads=2)
+    graph = _counter_graph(saver)
+    await graph.ainvoke({"items": ["a"]}, _config("t1"))
+    await graph.ainvoke({"items": ["b"]}, _config("t2"))
+    await graph.aget_state(_config("t1"))
+
+    await graph.ainvoke({"items": ["c"]}, _config("t3"))
+
+    assert await saver.aget_tuple(_config("t2")) is None
+    assert await saver.aget_tuple(_config("t1")) is not None
+    assert saver.stats()["threads"] == 2
+    assert saver.stats()["evicted_total"] == 1
+    assert "t2" not in saver.storage
+
+
+@pytest.mark.asyncio
+async def test_bounded_memory_saver_enforces_byte_budget():
+    saver = BoundedMemorySaver()
+    graph = _counter_graph(saver)
+    await graph.ainvoke({"items": ["a" * 1000]}, _config("t1"))
+    per_thread = saver.stats()["estimated_bytes"]
+    saver.max_bytes = int(per_thread * 2.5)
+
+    for thread_id in ("t2", "t3", "t4"):
+        await graph.ainvoke({"items": ["a" * 1000]}, _config(thread_id))
+
+    stats = saver.stats()
+    assert stats["estimated_bytes"] <= saver.max_bytes
+    assert stats["threads"] == 2
+    assert await saver.aget_tuple(_config("t4")) is not None
+
+
+@pytest.mark.asyncio
+async def test_bounded_memory_saver_expires_idle_threads(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(checkpoint_module.time, "monotonic", lambda: clock[0])
+    saver = BoundedMemorySaver(ttl_seconds=60)
+    graph = _counter_graph(saver)
+    await graph.ainvoke({"items": ["a"]}, _config("old"))
+
+    clock[0] += 120
+    await graph.ainvoke({"items": ["b"]}, _config("fresh"))
+
+    assert saver.stats()["expired_total"] == 1
+    assert saver.stats()["threads"] == 1
+    assert saver.total_bytes == saver._threads["fresh"][1]
+
+
+def test_bounded_memory_saver_delete_thread_releases_accounting():
+    saver = BoundedMemorySaver()
+    saver.put(_config("t1"), empty_checkpoint(), {}, {})
+
+    saver.delete_thread("t1")
+
+    assert saver.stats()["threads"] == 0
+    assert "t1" not in saver._versions
+    assert saver.total_bytes == 0
@@ -0,0 +1,195 @@
+"""Тесты кластерного режима: кольцо, супервизор воркеров и входной прокси."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from httpx import ASGITransport, AsyncClient
+
+from app.cluster.proxy import create_proxy_app
+from app.cluster.ring import HashRing
+from app.cluster.supervisor import Supervisor
+
+
+class FakeProcess:
+    def __init__(self):
+        self.pid = 1000
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+    def terminate(self):
+        self.returncode = 0
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+    def kill(self):
+        self.returncode = -9
+
+
+def _worker_app(name: str, delay: float = 0.0) -> FastAPI:
+    """Воркер-заглушка: отвечает своим именем."""
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.post("/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        await asyncio.sleep(delay)
+        return {"response": name, "thread_id": body["thread_id"], "intent": "chat"}
+
+    @app.post("/chat/batch")
+    async def chat_batch(request: Request):
+        body = await request.json()
+        return {
+            "results": [
+                {
+                    "index": i,
+                    "status": 200,
+                    "elapsed_ms": 1.0,
+                    "result": {"response": name, "thread_id": item["thread_id"], "intent": "chat"},
+                    "error": None,
+                }
+                for i, item in enumerate(body["items"])
+            ]
+        }
+
+    @app.get("/metrics")
+    async def metrics():
+        return {"worker": name}
+
+    return app
+
+
+@pytest.fixture(autouse=True)
+def socket_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def _supervisor(count: int = 3, delay: float = 0.0) -> Supervisor:
+    apps = {f"worker-{i}": _worker_app(f"worker-{i}", delay) for i in range(count)}
+    return Supervisor(
+        count,
+        "workers",
+        health_interval=3600,
+        spawn=lambda worker: FakeProcess(),
+        transport=lambda worker: ASGITransport(app=apps[worker.name]),
+    )
+
+
+def _thread_on(supervisor: Supervisor, worker_name: str) -> str:
+    return next(f"t-{i}" for i in range(1000) if supervisor.ring.owner(f"t-{i}") == worker_name)
+
+
+def test_ring_moves_only_keys_of_removed_node():
+    ring = HashRing(("a", "b", "c"))
+    keys = [f"thread-{i}" for i in range(2000)]
+    before = {key: ring.owner(key) for key in keys}
+
+    ring.remove("b")
+    after = {key: ring.owner(key) for key in keys}
+
+    shares = {node: list(before.values()).count(node) / len(keys) for node in "abc"}
+    assert all(0.2 < share < 0.45 for share in shares.values())
+    assert all(after[key] == before[key] for key in keys if before[key] != "b")
+    assert "b" not in after.values()
+
+
+@pytest.mark.asyncio
+async def test_chat_routes_same_thread_to_same_worker_and_assigns_thread_id():
+    supervisor = _supervisor()
+    app = create_proxy_app(supervisor)
+    await supervisor.start()
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            owners = set()
+            for _ in range(5):
+                resp = await client.post("/chat", json={"message": "q", "thread_id": "tg-42"})
+                owners.add(resp.json()["response"])
+            fresh = (await client.post("/chat", json={"message": "q"})).json()
+            health = await client.get("/health")
+            metrics = await client.get("/metrics", params={"worker": "worker-2"})
+        expected_owner = supervisor.ring.owner("tg-42")
+    finally:
+        await supervisor.stop()
+
+    assert owners == {expected_owner}
+    assert fresh["thread_id"]
+    assert health.json() == {"status": "ok", "workers": 3, "total": 3}
+    assert metrics.json() == {"worker": "worker-2"}
+
+
+@pytest.mark.asyncio
+async def test_batch_is_split_by_owner_and_reassembled_in_order():
+    supervisor = _supervisor()
+    app = create_proxy_app(supervisor)
+    await supervisor.start()
+    threads = [_thread_on(supervisor, f"worker-{i % 3}") for i in range(6)]
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            body = {"items": [{"message": "q", "thread_id": t} for t in threads]}
+            plain = await client.post("/chat/batch", json=body)
+            streamed = await client.post("/chat/batch?stream=true", json=body)
+    finally:
+        await supervisor.stop()
+
+    results = plain.json()["results"]
+    assert [r["index"] for r in results] == list(range(6))
+    assert [r["result"]["response"] for r in results] == [f"worker-{i % 3}" for i in range(6)]
+    lines = [json.loads(line) for line in streamed.text.splitlines()]
+    assert sorted(line["index"] for line in lines) == list(range(6))
+
+
+@pytest.mark.asyncio
+async def test_failed_worker_leaves_ring_and_in_flight_thread_stays_pinned():
+    supervisor = _supervisor(delay=0.05)
+    app = create_proxy_app(supervisor)
+    await supervisor.start()
+    thread = _thread_on(supervisor, "worker-0")
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            in_flight = asyncio.create_task(
+                client.post("/chat", json={"message": "q", "thread_id": thread})
+            )
+            await asyncio.sleep(0.01)
+            supervisor.mark_down(supervisor.workers[0], "test")
+            # Пока первый запрос диалога не завершён, диалог остаётся на старом воркере.
+            pinned = await client.post("/chat", json={"message": "q2", "thread_id": thread})
+            await in_flight
+            moved = await client.post("/chat", json={"message": "q3", "thread_id": thread})
+    finally:
+        await supervisor.stop()
+
+    assert in_flight.result().json()["response"] == "worker-0"
+    assert pinned.json()["response"] == "worker-0"
+    assert moved.json()["response"] in {"worker-1", "worker-2"}
+
+
+@pytest.mark.asyncio
+async def test_health_check_failures_and_restart_of_exited_worker():
+    supervisor = _supervisor(count=2)
+    await supervisor.start()
+    worker = supervisor.workers[1]
+    try:
+        worker.process.returncode = 1
+        await supervisor._supervise(worker)
+        assert worker.restarts == 1
+        assert "worker-1" not in supervisor.ring
+
+        await supervisor.check(worker)
+        assert "worker-1" in supervisor.ring
+
+        supervisor._transport = lambda _w: httpx.MockTransport(lambda _r: httpx.Response(500))
+        supervisor._clients.clear()
+        for _ in range(supervisor.failure_threshold):
+            await supervisor.check(worker)
+        assert "worker-1" not in supervisor.ring
+    finally:
+        await supervisor.stop()
@@ -140,3 +140,70 @@ async def test_e2e_restart_with_memorysaver_loses_coin_context(monkeypatch):
     assert "Уточните" in second.json()["response"]
     assert mock_market.await_count == 0
     assert mock_news.await_count == 0
+
+
+@pytest.mark.asyncio
+async def test_e2e_restart_with_sqlite_checkpointer_keeps_coin_context(monkeypatch, tmp_path):
+    """С SQLite-checkpointer контекст диалога переживает пересоздание графа."""
+    monkeypatch.setenv("GIGACHAT_CREDENTIALS", "test-credentials")
+    monkeypatch.setenv("CHECKPOINTER", "sqlite")
+    monkeypatch.setenv("CHECKPOINT_SQLITE_PATH", str(tmp_path / "checkpoints.sqlite3"))
+
+    first_graph = build_graph()
+    mock_llm = MagicMock()
+    mock_llm.ainvoke = AsyncMock(
+        side_effect=[
+            MagicMock(content='{"intent": "price", "coin": "bitcoin"}'),
+            MagicMock(content="Bitcoin стоит $50,000"),
+            MagicMock(content='{"intent": "analytics", "coin": ""}'),
+            MagicMock(content="no"),
+            MagicMock(content="Аналитика по BTC"),
+        ]
+    )
+
+    original_graph = main_module.agent_graph
+    try:
+        with (
+            patch("app.agent.router.get_llm", return_value=mock_llm),
+            patch("app.agent.nodes.get_llm", return_value=mock_llm),
+            patch(
+                "app.agent.nodes.get_price",
+                new_callable=AsyncMock,
+                return_value={"name": "Bitcoin", "symbol": "BTC", "price_usd": 50000.0},
+            ),
+            patch(
+                "app.agent.nodes.get_market_data",
+                new_callable=AsyncMock,
+                return_value={"price_usd": 49000.0},
+            ) as mock_market,
+            patch(
+                "app.agent.nodes.get_crypto_news",
+                new_callable=AsyncMock,
+                return_value=[{"title": "BTC news"}],
+            ),
+        ):
+            transport = ASGITransport(app=app)
+            async with AsyncClient(transport=transport, base_url="http://test") as client:
+                main_module.agent_graph = first_graph
+                first = await client.post(
+                    "/chat",
+                    json={"message": "какой щас курс битка?", "thread_id": "e2e-memory-3"},
+                )
+                first_graph.checkpointer.close()
+
+                main_module.agent_graph = second_graph = build_graph()
+                second = await client.post(
+                    "/chat",
+                    json={
+                        "message": "ему щас совсем плохо, думаю закупиться на низах, что думаешь?",
+                        "thread_id": "e2e-memory-3",
+                    },
+                )
+                second_graph.checkpointer.close()
+    finally:
+        main_module.agent_graph = original_graph
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert second.json()["intent"] == "analytics"
+    assert mock_market.await_args.args[0] == "bitcoin"
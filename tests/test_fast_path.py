@@ -0,0 +1,171 @@
+"""Тесты быстрого исполнителя линейных ходов: совместимость состояния с графом."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+PRICE_DATA = {"name": "Bitcoin", "symbol": "BTC", "price_usd": 50000.0}
+
+
+def _input(message: str, thread_id: str) -> dict:
+    return {
+        "messages": [HumanMessage(content=message)],
+        "user_query": message,
+        "thread_id": thread_id,
+    }
+
+
+def _llm(*contents: str) -> MagicMock:
+    llm = MagicMock()
+    llm.ainvoke = AsyncMock(side_effect=[MagicMock(content=content) for content in contents])
+    return llm
+
+
+def _count_puts(graph):
+    return patch.object(graph.checkpointer, "aput", wraps=graph.checkpointer.aput)
+
+
+@pytest.mark.asyncio
+async def test_price_turn_matches_graph_with_one_checkpoint(monkeypatch):
+    from app.agent.fast_path import run_turn
+    from app.agent.graph import build_graph
+
+    monkeypatch.setenv("FAST_PATH_INTENTS", '["price", "news", "chat"]')
+    replies = ('{"intent": "price", "coin": "bitcoin"}', "Bitcoin стоит $50,000")
+    graph_llm, fast_llm = _llm(*replies), _llm(*replies)
+    graph = build_graph()
+    graph_config = {"configurable": {"thread_id": "graph"}}
+    fast_config = {"configurable": {"thread_id": "fast"}}
+
+    with patch("app.agent.nodes.get_price", new_callable=AsyncMock, return_value=PRICE_DATA):
+        with (
+            patch("app.agent.router.get_llm", return_value=graph_llm),
+            patch("app.agent.nodes.get_llm", return_value=graph_llm),
+            _count_puts(graph) as graph_puts,
+        ):
+            expected = await graph.ainvoke(_input("Сколько стоит BTC?", "graph"), graph_config)
+        with (
+            patch("app.agent.router.get_llm", return_value=fast_llm),
+            patch("app.agent.nodes.get_llm", return_value=fast_llm),
+            _count_puts(graph) as fast_puts,
+        ):
+            result = await run_turn(graph, _input("Сколько стоит BTC?", "fast"), fast_config)
+
+    graph_state = await graph.aget_state(graph_config)
+    fast_state = await graph.aget_state(fast_config)
+
+    assert result["response"] == expected["response"] == "Bitcoin стоит $50,000"
+    assert result["api_data"]["_api_calls"] == ["coingecko:/coins/markets"]
+    assert fast_state.next == ()
+    assert {k: v for k, v in fast_state.values.items() if k != "messages"} == {
+        k: v for k, v in graph_state.values.items() if k not in ("messages", "thread_id")
+    } | {"thread_id": "fast"}
+    assert [m.content for m in fast_state.values["messages"]] == [
+        m.content for m in graph_state.values["messages"]
+    ]
+    assert fast_puts.call_count == 1
+    assert graph_puts.call_count == 5
+
+
+@pytest.mark.asyncio
+async def test_turns_alternate_between_fast_path_and_graph(monkeypatch):
+    from app.agent.fast_path import run_turn
+    from app.agent.graph import build_graph
+
+    monkeypatch.setenv("FAST_PATH_INTENTS", '["price"]')
+    llm = _llm(
+        '{"intent": "price", "coin": "bitcoin"}',
+        "Bitcoin стоит $50,000",
+        '{"intent": "price", "coin": ""}',
+        "Всё ещё $50,000",
+    )
+    graph = build_graph()
+    config = {"configurable": {"thread_id": "mixed"}}
+
+    with (
+        patch("app.agent.router.get_llm", return_value=llm),
+        patch("app.agent.nodes.get_llm", return_value=llm),
+        patch("app.agent.nodes.get_price", new_callable=AsyncMock, return_value=PRICE_DATA),
+    ):
+        await run_turn(graph, _input("Сколько стоит BTC?", "mixed"), config)
+        second = await graph.ainvoke(_input("А сейчас?", "mixed"), config)
+
+    state = await graph.aget_state(config)
+    assert second["coin"] == "bitcoin"
+    assert [m.content for m in state.values["messages"]] == [
+        "Сколько стоит BTC?",
+        "Bitcoin стоит $50,000",
+        "А сейчас?",
+        "Всё ещё $50,000",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_other_intents_go_to_graph_without_second_classification(monkeypatch):
+    from app.agent.fast_path import run_turn
+    from app.agent.graph import build_graph
+
+    monkeypatch.setenv("FAST_PATH_INTENTS", '["price"]')
+    llm = _llm('{"intent": "analytics", "coin": "bitcoin"}', "no", "Аналитика по BTC")
+    graph = build_graph()
+    config = {"configurable": {"thread_id": "analytics"}}
+
+    with (
+        patch("app.agent.router.get_llm", return_value=llm),
+        patch("app.agent.nodes.get_llm", return_value=llm),
+        patch("app.agent.nodes.get_market_data", new_callable=AsyncMock, return_value=PRICE_DATA),
+        patch("app.agent.nodes.get_crypto_news", new_callable=AsyncMock, return_value=[]),
+    ):
+        result = await run_turn(graph, _input("Стоит ли покупать BTC?", "analytics"), config)
+
+    assert result["response"] == "Аналитика по BTC"
+    assert result["intent"] == "analytics"
+    assert llm.ainvoke.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_answer_cache_hit_leaves_no_pending_step(monkeypatch):
+    from app.agent.answer_cache import reset_answer_cache
+    from app.agent.fast_path import run_turn
+    from app.agent.graph import build_graph
+
+    monkeypatch.setenv("FAST_PATH_INTENTS", '["price"]')
+    monkeypatch.setenv("ANSWER_CACHE_ENABLED", "true")
+    monkeypatch.setenv("ANSWER_CACHE_TTL_SECONDS", '{"price": 1e9}')
+    reset_answer_cache()
+    llm = _llm(
+        '{"intent": "price", "coin": "bitcoin"}',
+        "Bitcoin стоит $50,000",
+        '{"intent": "price", "coin": "bitcoin"}',
+        '{"intent": "price", "coin": ""}',
+    )
+    price = AsyncMock(return_value=PRICE_DATA)
+    graph = build_graph()
+    warm_config = {"configurable": {"thread_id": "warm"}}
+    config = {"configurable": {"thread_id": "cached"}}
+
+    try:
+        with (
+            patch("app.agent.router.get_llm", return_value=llm),
+            patch("app.agent.nodes.get_llm", return_value=llm),
+            patch("app.agent.nodes.get_price", price),
+        ):
+            await run_turn(graph, _input("Сколько стоит BTC?", "warm"), warm_config)
+            cached = await run_turn(graph, _input("Почём BTC?", "cached"), config)
+            assert (await graph.aget_state(config)).next == ()
+            await graph.ainvoke(_input("А сейчас?", "cached"), config)
+    finally:
+        reset_answer_cache()
+
+    state = await graph.aget_state(config)
+    assert cached["response"] == "Bitcoin стоит $50,000"
+    assert price.await_count == 1
+    assert state.next == ()
+    assert state.values["coin"] == "bitcoin"
+    assert [m.content for m in state.values["messages"]] == [
+        "Почём BTC?",
+        "Bitcoin стоит $50,000",
+        "А сейчас?",
+        "Bitcoin стоит $50,000",
+    ]
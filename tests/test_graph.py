@@ -154,3 +154,202 @@ async def test_multiturn_coreference_reuses_previous_coin():
     assert result["coin"] == "bitcoin"
     assert "Аналитика" in result["response"]
     assert mock_market.await_args.args[0] == "bitcoin"
+
+
+@pytest.mark.asyncio
+async def test_structured_analytics_flow_skips_route_llm_call(monkeypatch):
+    """В structured-режиме аналитика обходится двумя вызовами LLM: classify + analyze."""
+    from langchain_core.messages import AIMessage
+
+    monkeypatch.setenv("CLASSIFY_MODE", "structured")
+    mock_llm = MagicMock()
+    mock_llm.ainvoke = AsyncMock(
+        side_effect=[
+            AIMessage(
+                content="",
+                tool_calls=[
+                    {
+                        "name": "classify_request",
+                        "args": {
+                            "intent": "analytics",
+                            "coins": ["bitcoin"],
+                            "needs_search": True,
+                            "search_query": "bitcoin outlook",
+                        },
+                        "id": "call-1",
+                    }
+                ],
+            ),
+            MagicMock(content="Аналитика по BTC"),
+        ]
+    )
+
+    with (
+        patch("app.agent.router.get_llm", return_value=mock_llm),
+        patch("app.agent.nodes.get_llm", return_value=mock_llm),
+        patch(
+            "app.agent.nodes.get_market_data",
+            new_callable=AsyncMock,
+            return_value={"price_usd": 49000.0},
+        ),
+        patch("app.agent.nodes.get_crypto_news", new_callable=AsyncMock, return_value=[]),
+        patch("app.agent.nodes.search_web", new_callable=AsyncMock, return_value=[]) as mock_search,
+    ):
+        from app.agent.graph import build_graph
+
+        graph = build_graph()
+        result = await graph.ainvoke(
+            {"messages": [], "user_query": "Стоит ли покупать BTC?"},
+            config={"configurable": {"thread_id": "test-thread-structured"}},
+        )
+
+    assert result["response"] == "Аналитика по BTC"
+    assert mock_llm.ainvoke.await_count == 2
+    assert mock_search.await_args.args[0] == "bitcoin outlook"
+
+
+@pytest.mark.asyncio
+async def test_transient_state_is_not_checkpointed():
+    """api_data и response доступны в результате прогона, но не сохраняются в чекпоинте."""
+    from app.agent.graph import build_graph
+    from app.agent.state import TRANSIENT_KEYS
+
+    mock_llm = MagicMock()
+    mock_llm.ainvoke = AsyncMock(
+        side_effect=[
+            MagicMock(content='{"intent": "price", "coin": "bitcoin"}'),
+            MagicMock(content="Bitcoin стоит $50,000"),
+        ]
+    )
+    config = {"configurable": {"thread_id": "transient-thread"}}
+    with (
+        patch("app.agent.router.get_llm", return_value=mock_llm),
+        patch("app.agent.nodes.get_llm", return_value=mock_llm),
+        patch(
+            "app.agent.nodes.get_price",
+            new_callable=AsyncMock,
+            return_value={"name": "Bitcoin", "price_usd": 50000.0},
+        ),
+    ):
+        graph = build_graph()
+        result = await graph.ainvoke(
+            {"messages": [], "user_query": "Сколько стоит биткоин?"}, config=config
+        )
+
+    saved = await graph.checkpointer.aget_tuple(config)
+    persisted = set(saved.checkpoint["channel_values"])
+    persisted_writes = {channel for _, channel, _ in saved.pending_writes}
+    snapshot = await graph.aget_state(config)
+
+    assert result["api_data"]["price_usd"] == 50000.0
+    assert result["response"]
+    assert not TRANSIENT_KEYS & persisted
+    assert not TRANSIENT_KEYS & persisted_writes
+    assert snapshot.values["coin"] == "bitcoin"
+    assert "api_data" not in snapshot.values
+
+
+@pytest.mark.asyncio
+async def test_analytics_branches_run_in_parallel_with_timeout(monkeypatch):
+    """Медленные новости не задерживают рыночную ветку и обрываются по таймауту."""
+    from app.agent.graph import build_graph
+
+    monkeypatch.setenv("ANALYTICS_BRANCH_TIMEOUT_SECONDS", "0.2")
+    market_done = asyncio.Event()
+    news_saw_market = []
+
+    async def fake_market(_coin):
+        market_done.set()
+        return {"price_usd": 49000.0}
+
+    async def slow_news(_coin, max_results=3):
+        await market_done.wait()
+        news_saw_market.append(True)
+        await asyncio.sleep(5)
+
+    mock_llm = MagicMock()
+    mock_llm.ainvoke = AsyncMock(
+        side_effect=[
+            MagicMock(content='{"intent": "analytics", "coin": "bitcoin"}'),
+            MagicMock(content="no"),
+            MagicMock(content="Аналитика по BTC"),
+        ]
+    )
+    with (
+        patch("app.agent.router.get_llm", return_value=mock_llm),
+        patch("app.agent.nodes.get_llm", return_value=mock_llm),
+        patch("app.agent.nodes.get_market_data", side_effect=fake_market),
+        patch("app.agent.nodes.get_crypto_news", side_effect=slow_news),
+    ):
+        graph = build_graph()
+        result = await asyncio.wait_for(
+            graph.ainvoke(
+                {"messages": [], "user_query": "Стоит ли покупать BTC?"},
+                config={"configurable": {"thread_id": "parallel-branches"}},
+            ),
+            timeout=2,
+        )
+
+    api_data = result["api_data"]
+    assert news_saw_market == [True]
+    assert api_data["market"] == {"price_usd": 49000.0}
+    assert api_data["news"] == [{"error": "TimeoutError"}]
+    assert sorted(api_data["_api_calls"]) == ["coingecko:/coins/{id}", "newsapi:/v2/everything"]
+    assert set(api_data["_timings_ms"]) == {"market", "news"}
+    assert result["response"] == "Аналитика по BTC"
+
+
+@pytest.mark.asyncio
+async def test_text_mode_analytics_search_runs_after_join_once():
+    """Поиск, запрошенный роутером после сбора данных, выполняется один раз."""
+    from app.agent.graph import build_graph
+
+    mock_llm = MagicMock()
+    mock_llm.ainvoke = AsyncMock(
+        side_effect=[
+            MagicMock(content='{"intent": "analytics", "coin": "bitcoin"}'),
+            MagicMock(content="yes"),
+            MagicMock(content="Аналитика по BTC"),
+        ]
+    )
+    with (
+        patch("app.agent.router.get_llm", return_value=mock_llm),
+        patch("app.agent.nodes.get_llm", return_value=mock_llm),
+        patch(
+            "app.agent.nodes.get_market_data",
+            new_callable=AsyncMock,
+            return_value={"price_usd": 49000.0},
+        ),
+        patch("app.agent.nodes.get_crypto_news", new_callable=AsyncMock, return_value=[]),
+        patch(
+            "app.agent.nodes.search_web", new_callable=AsyncMock, return_value=[{"title": "t"}]
+        ) as mock_search,
+    ):
+        graph = build_graph()
+        result = await graph.ainvoke(
+            {"messages": [], "user_query": "Стоит ли покупать BTC?"},
+            config={"configurable": {"thread_id": "text-search"}},
+        )
+
+    assert mock_search.await_count == 1
+    assert mock_llm.ainvoke.await_count == 3
+    assert result["api_data"]["web_search"] == [{"title": "t"}]
+    assert result["api_data"]["market"] == {"price_usd": 49000.0}
+    assert result["api_data"]["_api_calls"][-1] == "ddgs:text"
+
+
+def test_merge_api_data_accumulates_service_keys():
+    from app.agent.state import merge_api_data
+
+    merged = merge_api_data(
+        {"market": {"price_usd": 1}, "_api_calls": ["a"], "_timings_ms": {"market": 1.0}},
+        {"news": [], "_api_calls": ["b"], "_timings_ms": {"news": 2.0}},
+    )
+
+    assert merged == {
+        "market": {"price_usd": 1},
+        "news": [],
+        "_api_calls": ["a", "b"],
+        "_timings_ms": {"market": 1.0, "news": 2.0},
+    }
+    assert merge_api_data(merged, None) == {}
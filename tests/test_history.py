@@ -0,0 +1,205 @@
+"""Тесты сжатия истории диалога."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.agent.graph import build_graph
+from app.agent.history import compact_history, needs_compaction, schedule_history_compaction
+from app.thread_queue import get_thread_queue, reset_thread_queue
+
+
+@pytest.fixture
+def small_window(monkeypatch):
+    monkeypatch.setenv("GIGACHAT_CREDENTIALS", "test-credentials")
+    monkeypatch.setenv("HISTORY_WINDOW_MESSAGES", "2")
+    monkeypatch.setenv("HISTORY_COMPACT_THRESHOLD", "4")
+
+
+def _turn_llm(*answers: tuple[str, str]) -> MagicMock:
+    llm = MagicMock()
+    llm.ainvoke = AsyncMock(
+        side_effect=[MagicMock(content=c) for pair in answers for c in pair]
+    )
+    return llm
+
+
+async def _run_turns(graph, thread_id: str, llm: MagicMock, queries: list[str]) -> dict:
+    config = {"configurable": {"thread_id": thread_id}}
+    with (
+        patch("app.agent.router.get_llm", return_value=llm),
+        patch("app.agent.nodes.get_llm", return_value=llm),
+        patch("app.agent.nodes.get_price", new_callable=AsyncMock, return_value={"price_usd": 1.0}),
+        patch("app.agent.nodes.search_web", new_callable=AsyncMock, return_value=[]),
+    ):
+        result = {}
+        for query in queries:
+            result = await graph.ainvoke(
+                {"messages": [("user", query)], "user_query": query, "thread_id": thread_id},
+                config=config,
+            )
+    return result
+
+
+def test_needs_compaction_respects_threshold(small_window):
+    assert needs_compaction([object()] * 4) is False
+    assert needs_compaction([object()] * 5) is True
+
+
+def test_needs_compaction_disabled_with_zero_window(monkeypatch):
+    monkeypatch.setenv("HISTORY_WINDOW_MESSAGES", "0")
+
+    assert needs_compaction([object()] * 100) is False
+
+
+@pytest.mark.asyncio
+async def test_compact_history_trims_messages_and_keeps_summary_and_coin(small_window):
+    graph = build_graph()
+    llm = _turn_llm(
+        ('{"intent": "price", "coin": "bitcoin"}', "BTC стоит $1"),
+        ('{"intent": "chat", "coin": ""}', "Блокчейн — это..."),
+        ('{"intent": "chat", "coin": ""}', "DeFi — это..."),
+    )
+    result = await _run_turns(graph, "h1", llm, ["курс btc", "что такое блокчейн", "а defi?"])
+    assert len(result["messages"]) == 6
+
+    summarizer = MagicMock()
+    summarizer.ainvoke = AsyncMock(return_value=MagicMock(content="Обсуждали цену BTC и блокчейн."))
+    with patch("app.agent.history.get_llm", return_value=summarizer):
+        compacted = await compact_history(graph, "h1")
+
+    state = (await graph.aget_state({"configurable": {"thread_id": "h1"}})).values
+    assert compacted is True
+    assert [m.content for m in state["messages"]] == ["а defi?", "DeFi — это..."]
+    assert state["summary"] == "Обсуждали цену BTC и блокчейн."
+    assert state["last_coin"] == "bitcoin"
+    assert "курс btc" in summarizer.ainvoke.await_args.args[0][1].content
+
+
+@pytest.mark.asyncio
+async def test_compacted_thread_resolves_coin_and_sees_summary(small_window):
+    graph = build_graph()
+    llm = _turn_llm(
+        ('{"intent": "price", "coin": "bitcoin"}', "BTC стоит $1"),
+        ('{"intent": "chat", "coin": ""}', "Блокчейн — это..."),
+        ('{"intent": "chat", "coin": ""}', "DeFi — это..."),
+    )
+    await _run_turns(graph, "h2", llm, ["курс btc", "что такое блокчейн", "а defi?"])
+    summarizer = MagicMock()
+    summarizer.ainvoke = AsyncMock(return_value=MagicMock(content="Обсуждали BTC."))
+    with patch("app.agent.history.get_llm", return_value=summarizer):
+        await compact_history(graph, "h2")
+
+    follow_up = _turn_llm(('{"intent": "price", "coin": ""}', "BTC стоит $1"))
+    result = await _run_turns(graph, "h2", follow_up, ["а сейчас он сколько?"])
+
+    classify_prompt = follow_up.ainvoke.await_args_list[0].args[0][1].content
+    assert "Обсуждали BTC." in classify_prompt
+    assert result["coin"] == "bitcoin"
+
+
+@pytest.mark.asyncio
+async def test_compaction_after_cached_answer_leaves_no_pending_step(small_window, monkeypatch):
+    from app.agent.answer_cache import reset_answer_cache
+
+    monkeypatch.setenv("ANSWER_CACHE_ENABLED", "true")
+    monkeypatch.setenv("ANSWER_CACHE_TTL_SECONDS", '{"price": 1e9}')
+    reset_answer_cache()
+    graph = build_graph()
+    # Третий ход — попадание в кэш ответов: только классификация, без генерации.
+    llm = _turn_llm(
+        ('{"intent": "price", "coin": "bitcoin"}', "BTC стоит $1"),
+        ('{"intent": "chat", "coin": ""}', "Блокчейн — это..."),
+        ('{"intent": "price", "coin": "bitcoin"}', "не используется"),
+    )
+    summarizer = MagicMock()
+    summarizer.ainvoke = AsyncMock(return_value=MagicMock(content="Обсуждали BTC."))
+    config = {"configurable": {"thread_id": "h-cache"}}
+
+    try:
+        result = await _run_turns(
+            graph, "h-cache", llm, ["курс btc", "что такое блокчейн", "цена btc"]
+        )
+        with patch("app.agent.history.get_llm", return_value=summarizer):
+            compacted = await compact_history(graph, "h-cache")
+    finally:
+        reset_answer_cache()
+
+    state = await graph.aget_state(config)
+    assert result["response"] == "BTC стоит $1"
+    assert compacted is True
+    assert state.next == ()
+    assert [m.content for m in state.values["messages"]] == ["цена btc", "BTC стоит $1"]
+
+
+@pytest.mark.asyncio
+async def test_compact_history_trims_even_if_summary_fails(small_window):
+    graph = build_graph()
+    llm = _turn_llm(
+        ('{"intent": "chat", "coin": ""}', "a"),
+        ('{"intent": "chat", "coin": ""}', "b"),
+        ('{"intent": "chat", "coin": ""}', "c"),
+    )
+    await _run_turns(graph, "h3", llm, ["1", "2", "3"])
+    summarizer = MagicMock()
+    summarizer.ainvoke = AsyncMock(side_effect=RuntimeError("llm down"))
+
+    with patch("app.agent.history.get_llm", return_value=summarizer):
+        await compact_history(graph, "h3")
+
+    state = (await graph.aget_state({"configurable": {"thread_id": "h3"}})).values
+    assert len(state["messages"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_scheduled_compaction_waits_for_running_turn(small_window):
+    reset_thread_queue()
+    order = []
+    release = asyncio.Event()
+
+    async def turn(_message: str) -> None:
+        order.append("turn start")
+        await release.wait()
+        order.append("turn end")
+
+    async def compact(_graph, _thread_id) -> bool:
+        order.append("compact")
+        return True
+
+    try:
+        with patch("app.agent.history.compact_history", side_effect=compact):
+            running = asyncio.create_task(get_thread_queue().run("h5", "msg", turn))
+            await asyncio.sleep(0)
+            job = schedule_history_compaction(MagicMock(), "h5")
+            await asyncio.sleep(0.01)
+            assert order == ["turn start"]
+            release.set()
+            await asyncio.gather(running, job)
+    finally:
+        reset_thread_queue()
+
+    assert order == ["turn start", "turn end", "compact"]
+
+
+@pytest.mark.asyncio
+async def test_chat_schedules_compaction_for_long_history(small_window):
+    from app.main import app
+
+    mock_graph = AsyncMock()
+    mock_graph.ainvoke.return_value = {
+        "response": "ok",
+        "intent": "chat",
+        "messages": [MagicMock()] * 6,
+    }
+    with (
+        patch("app.main.agent_graph", mock_graph),
+        patch("app.main.schedule_history_compaction") as mock_schedule,
+    ):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            resp = await client.post("/chat", json={"message": "hi", "thread_id": "h4"})
+
+    assert resp.status_code == 200
+    mock_schedule.assert_called_once_with(mock_graph, "h4")
@@ -1,33 +1,84 @@
 """Тесты для lifecycle LLM-клиента."""
 
+import asyncio
+import time
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
 from app.llm import gigachat
+from app.llm.pool import LLMPool, PoolMember
 
 
 @pytest.fixture(autouse=True)
 def reset_llm_singleton():
     """Изолирует singleton LLM между тестами."""
-    gigachat._llm_instance = None
+    gigachat._llm_instances.clear()
     yield
-    gigachat._llm_instance = None
+    gigachat._llm_instances.clear()
+
+
+def _pool_of(*clients: object) -> LLMPool:
+    return LLMPool([PoolMember(name=f"m{i}", llm=c) for i, c in enumerate(clients)])
 
 
 def test_get_llm_returns_singleton(monkeypatch):
     monkeypatch.setenv("GIGACHAT_CREDENTIALS", "test-credentials")
+    monkeypatch.delenv("GIGACHAT_POOL", raising=False)
 
     llm_instance = MagicMock()
     with patch("app.llm.gigachat.GigaChat", return_value=llm_instance) as mock_ctor:
         first = gigachat.get_llm()
         second = gigachat.get_llm()
 
-    assert first is llm_instance
-    assert second is llm_instance
+    assert first is second
+    assert [m.llm for m in first.members] == [llm_instance]
     mock_ctor.assert_called_once()
 
 
+def test_get_llm_builds_pool_from_settings(monkeypatch):
+    monkeypatch.setenv("GIGACHAT_CREDENTIALS", "primary")
+    monkeypatch.setenv("GIGACHAT_MODEL", "GigaChat-2-Max")
+    monkeypatch.setenv(
+        "GIGACHAT_POOL",
+        '[{"credentials": "second", "model": "GigaChat-2-Pro"}, {"credentials": "third"}]',
+    )
+
+    with patch("app.llm.gigachat.GigaChat", side_effect=lambda **kw: kw) as mock_ctor:
+        pool = gigachat.get_llm()
+
+    assert mock_ctor.call_count == 3
+    assert [m.name for m in pool.members] == [
+        "GigaChat-2-Max#0",
+        "GigaChat-2-Pro#1",
+        "GigaChat-2-Max#2",
+    ]
+    assert pool.members[1].llm["credentials"] == "second"
+
+
+def test_get_llm_uses_separate_clients_and_models_per_role(monkeypatch):
+    monkeypatch.setenv("GIGACHAT_CREDENTIALS", "primary")
+    monkeypatch.setenv("GIGACHAT_MODEL", "GigaChat-2-Max")
+    monkeypatch.setenv("GIGACHAT_MODEL_CLASSIFY", "GigaChat-2-Lite")
+    monkeypatch.delenv("GIGACHAT_MODEL_GENERATE", raising=False)
+    monkeypatch.setenv("GIGACHAT_POOL", '[{"credentials": "second", "model": "GigaChat-2-Pro"}]')
+
+    with patch("app.llm.gigachat.GigaChat", side_effect=lambda **kw: kw):
+        classify = gigachat.get_llm("classify")
+        generate = gigachat.get_llm("generate")
+
+    assert classify is not generate
+    assert gigachat.get_llm("classify") is classify
+    assert [m.llm["model"] for m in classify.members] == ["GigaChat-2-Lite"] * 2
+    assert [m.llm["model"] for m in generate.members] == ["GigaChat-2-Max", "GigaChat-2-Pro"]
+    assert set(gigachat.llm_pool_snapshot()) == {"classify", "generate"}
+
+
+def test_get_llm_rejects_unknown_role():
+    with pytest.raises(ValueError):
+        gigachat.get_llm("translate")
+
+
 @pytest.mark.asyncio
 async def test_close_llm_uses_aclose():
     close_target = MagicMock()
@@ -35,12 +86,12 @@ async def test_close_llm_uses_aclose():
 
     llm_instance = MagicMock()
     llm_instance._client = close_target
-    gigachat._llm_instance = llm_instance
+    gigachat._llm_instances["generate"] = _pool_of(llm_instance)
 
     await gigachat.close_llm()
 
     close_target.aclose.assert_awaited_once()
-    assert gigachat._llm_instance is None
+    assert gigachat._llm_instances == {}
 
 
 @pytest.mark.asyncio
@@ -55,9 +106,178 @@ async def test_close_llm_uses_close_when_only_sync_close():
     close_target = SyncClient()
     llm_instance = MagicMock()
     llm_instance._client = close_target
-    gigachat._llm_instance = llm_instance
+    gigachat._llm_instances["generate"] = _pool_of(llm_instance)
 
     await gigachat.close_llm()
 
     assert close_target.closed is True
-    assert gigachat._llm_instance is None
+    assert gigachat._llm_instances == {}
+
+
+# ─── warm-up и фоновое обслуживание ───
+
+
+def _sdk_with_token(expires_at_ms: int) -> MagicMock:
+    sdk = MagicMock()
+    sdk._access_token = MagicMock(expires_at=expires_at_ms)
+    sdk.aget_token = AsyncMock()
+    sdk.aget_models = AsyncMock()
+    return sdk
+
+
+@pytest.mark.asyncio
+async def test_warmup_llm_builds_client_and_fetches_token(monkeypatch):
+    monkeypatch.setenv("GIGACHAT_CREDENTIALS", "test-credentials")
+    sdk = _sdk_with_token(0)
+    llm_instance = MagicMock(_client=sdk)
+
+    with patch("app.llm.gigachat.GigaChat", return_value=llm_instance) as mock_ctor:
+        await gigachat.warmup_llm()
+
+    assert mock_ctor.call_count == len(gigachat.LLM_ROLES)
+    assert sdk.aget_token.await_count == len(gigachat.LLM_ROLES)
+    assert sdk.aget_models.await_count == len(gigachat.LLM_ROLES)
+    assert set(gigachat._llm_instances) == set(gigachat.LLM_ROLES)
+
+
+@pytest.mark.asyncio
+async def test_maintenance_refreshes_token_before_expiry():
+    sdk = _sdk_with_token(int((time.time() + 0.05) * 1000))
+    refreshed = asyncio.Event()
+
+    def reset_token():
+        sdk._access_token = MagicMock(expires_at=int((time.time() + 3600) * 1000))
+        refreshed.set()
+
+    sdk._reset_token = MagicMock(side_effect=reset_token)
+    gigachat._llm_instances["generate"] = _pool_of(MagicMock(_client=sdk))
+
+    task = asyncio.create_task(gigachat._maintenance_loop(0.0, 0.0))
+    await asyncio.wait_for(refreshed.wait(), timeout=1)
+    await gigachat.stop_llm_maintenance(task)
+
+    sdk._reset_token.assert_called_once()
+    sdk.aget_token.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_maintenance_pings_connection_when_keepalive_enabled():
+    sdk = _sdk_with_token(0)
+    pinged = asyncio.Event()
+    sdk.aget_models = AsyncMock(side_effect=lambda: pinged.set())
+    gigachat._llm_instances["generate"] = _pool_of(MagicMock(_client=sdk))
+
+    task = asyncio.create_task(gigachat._maintenance_loop(60.0, 0.01))
+    await asyncio.wait_for(pinged.wait(), timeout=1)
+    await gigachat.stop_llm_maintenance(task)
+
+    sdk.aget_token.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_maintenance_token_refresh_does_not_trigger_keepalive_ping():
+    expiring = _sdk_with_token(int((time.time() + 0.01) * 1000))
+    idle = _sdk_with_token(0)
+    refreshes = 0
+    refreshed = asyncio.Event()
+
+    def reset_token():
+        nonlocal refreshes
+        refreshes += 1
+        expiring._access_token = MagicMock(expires_at=int((time.time() + 0.01) * 1000))
+        if refreshes >= 3:
+            refreshed.set()
+
+    expiring._reset_token = MagicMock(side_effect=reset_token)
+    gigachat._llm_instances["generate"] = _pool_of(
+        MagicMock(_client=expiring), MagicMock(_client=idle)
+    )
+
+    task = asyncio.create_task(gigachat._maintenance_loop(0.0, 60.0))
+    await asyncio.wait_for(refreshed.wait(), timeout=1)
+    await gigachat.stop_llm_maintenance(task)
+
+    idle.aget_models.assert_not_awaited()
+    expiring.aget_models.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_lifespan_warms_up_and_stops_maintenance(monkeypatch):
+    from app.main import app, lifespan
+
+    monkeypatch.setenv("GIGACHAT_CREDENTIALS", "test-credentials")
+    with (
+        patch("app.main.warmup_llm", new_callable=AsyncMock) as mock_warmup,
+        patch("app.main.close_llm", new_callable=AsyncMock) as mock_close,
+        patch("app.main.get_settings") as mock_settings,
+    ):
+        mock_settings.return_value.llm_warmup_enabled = True
+        mock_settings.return_value.llm_token_refresh_margin_seconds = 120.0
+        mock_settings.return_value.llm_keepalive_seconds = 0.0
+        async with lifespan(app):
+            pass
+
+    mock_warmup.assert_awaited_once()
+    mock_close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_lifespan_survives_warmup_failure():
+    from app.main import app, lifespan
+
+    with (
+        patch("app.main.warmup_llm", new_callable=AsyncMock, side_effect=RuntimeError("no creds")),
+        patch("app.main.start_llm_maintenance") as mock_start,
+        patch("app.main.close_llm", new_callable=AsyncMock),
+    ):
+        async with lifespan(app):
+            pass
+
+    mock_start.assert_not_called()
+
+
+def test_llm_session_sets_stable_session_id_per_thread_and_role():
+    from gigachat.context import session_id_cvar
+
+    with gigachat.llm_session("thread-1", "classify"):
+        classify_session = session_id_cvar.get()
+    with gigachat.llm_session("thread-1", "generate"):
+        generate_session = session_id_cvar.get()
+
+    assert classify_session == gigachat.session_id_for("thread-1", "classify")
+    assert classify_session != generate_session
+    assert session_id_cvar.get() is None
+
+
+def test_llm_session_is_noop_without_thread_or_when_disabled(monkeypatch):
+    from gigachat.context import session_id_cvar
+
+    with gigachat.llm_session(None, "classify"):
+        assert session_id_cvar.get() is None
+
+    monkeypatch.setenv("LLM_SESSION_CACHE_ENABLED", "false")
+    gigachat.get_settings.cache_clear()
+    try:
+        with gigachat.llm_session("thread-1", "classify"):
+            assert session_id_cvar.get() is None
+    finally:
+        gigachat.get_settings.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_standin_reports_precached_tokens_for_same_session():
+    import httpx
+
+    from benchmarks.gigachat_standin import create_app
+
+    transport = httpx.ASGITransport(app=create_app(base_latency=0, per_token_latency=0))
+    payload = {"model": "GigaChat", "messages": [{"role": "system", "content": "инструкции " * 50}]}
+    async with httpx.AsyncClient(transport=transport, base_url="http://standin") as client:
+        url = "/api/v1/chat/completions"
+        first = (await client.post(url, json=payload, headers={"X-Session-ID": "s1"})).json()
+        second = (await client.post(url, json=payload, headers={"X-Session-ID": "s1"})).json()
+        other = (await client.post(url, json=payload)).json()
+
+    assert first["usage"]["precached_prompt_tokens"] == 0
+    assert second["usage"]["precached_prompt_tokens"] == second["usage"]["prompt_tokens"]
+    assert other["usage"]["precached_prompt_tokens"] == 0
@@ -0,0 +1,58 @@
+"""Тесты нагрузочного бенчмарка: смесь intent, сравнение с базовым отчётом, короткий прогон."""
+
+import copy
+
+import pytest
+
+from benchmarks.load import build_report, compare_reports, parse_mix, run_benchmark
+from simulator.app import serve
+from simulator.profile import Latency, SimulatorConfig, UpstreamProfile
+
+FAST = UpstreamProfile(latency=Latency(distribution="fixed", median_ms=0))
+
+
+def _report(latency_ms: float, rps: float = 10.0) -> dict:
+    results = [
+        {"intent": "price", "status": 200, "answered_intent": "price", "latency": latency_ms / 1000}
+        for _ in range(20)
+    ]
+    stats = {"coingecko": {"/coins/markets": {"200": 20}}}
+    rss = {"start": 100.0, "end": 101.0, "peak": 101.0}
+    return build_report(results, 0, 20 / rps, 20 / rps, [0.001] * 10, rss, stats)
+
+
+def test_parse_mix_normalizes_weights():
+    assert parse_mix("price=3,chat=1") == {"price": 0.75, "chat": 0.25}
+    with pytest.raises(ValueError):
+        parse_mix("weather=1")
+
+
+def test_compare_reports_flags_regressions_beyond_noise():
+    baseline = _report(100.0)
+    noisy = _report(103.0)
+    slower = _report(150.0, rps=7.0)
+    chatty = copy.deepcopy(baseline)
+    chatty["upstream_calls"]["coingecko"]["per_request"] = 2.0
+
+    assert compare_reports(noisy, baseline, tolerance=0.15) == []
+    regressions = compare_reports(slower, baseline, tolerance=0.15)
+    assert any(r.startswith("throughput_rps") for r in regressions)
+    assert any(r.startswith("latency.price.p99_ms") for r in regressions)
+    assert compare_reports(chatty, baseline, tolerance=0.15) == [
+        "upstream_calls.coingecko.per_request: 2.0 > 1.0"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_short_run_against_simulator():
+    config = SimulatorConfig(seed=1, coingecko=FAST, newsapi=FAST, ddgs=FAST, gigachat=FAST)
+    async with serve(config) as sim:
+        report = await run_benchmark(
+            rps=20.0, duration=0.5, warmup=0.0, simulator_url=sim.state.base_url
+        )
+
+    assert report["requests"] > 0
+    assert report["error_rate"] == 0.0
+    assert report["latency"]["all"]["count"] == report["completed"]
+    assert report["upstream_calls"]["gigachat"]["per_request"] >= 1
+    assert report["event_loop_lag"]["count"] > 0
@@ -0,0 +1,129 @@
+"""Тесты снимка цен в разделяемой памяти (MARKET_SNAPSHOT_*)."""
+
+import subprocess
+import sys
+import time
+import uuid
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.agent.nodes import get_price_node
+from app.market_snapshot import (
+    VERSION,
+    VERSION_OFFSET,
+    MarketSnapshot,
+    lookup_price,
+    reset_market_snapshot,
+    start_market_snapshot,
+    stop_market_snapshot,
+)
+from app.metrics import CACHE_REQUESTS
+
+BTC = {
+    "name": "Bitcoin",
+    "symbol": "BTC",
+    "price_usd": 50000.0,
+    "price_change_24h_pct": 2.5,
+    "market_cap_usd": 1e12,
+    "total_volume_usd": None,
+}
+
+
+@pytest.fixture
+def name(monkeypatch):
+    name = f"test-snapshot-{uuid.uuid4().hex[:8]}"
+    monkeypatch.setenv("MARKET_SNAPSHOT_ENABLED", "true")
+    monkeypatch.setenv("MARKET_SNAPSHOT_NAME", name)
+    monkeypatch.setenv("MARKET_SNAPSHOT_COINS", '["btc", "eth"]')
+    reset_market_snapshot()
+    CACHE_REQUESTS.clear()
+    yield name
+    reset_market_snapshot()
+
+
+@pytest.fixture
+def owner(name):
+    snapshot = MarketSnapshot.create(name, 4)
+    yield snapshot
+    snapshot.close()
+    snapshot.unlink()
+
+
+def test_reader_sees_published_prices(owner, name):
+    reader = MarketSnapshot.attach(name)
+    try:
+        assert reader.read("bitcoin") is None
+
+        owner.publish({"bitcoin": BTC}, now=100.0)
+        data, published_at = reader.read("bitcoin")
+
+        assert data == BTC
+        assert published_at == 100.0
+        assert reader.read("ethereum") is None
+    finally:
+        reader.close()
+
+
+def test_read_during_write_returns_none(owner):
+    owner.publish({"bitcoin": BTC})
+    version = owner.version
+    VERSION.pack_into(owner._shm.buf, VERSION_OFFSET, version + 1)
+
+    assert owner.read("bitcoin") is None
+
+    VERSION.pack_into(owner._shm.buf, VERSION_OFFSET, version + 2)
+    assert owner.read("bitcoin")[0]["price_usd"] == 50000.0
+
+
+def test_other_process_reads_segment_and_exit_keeps_it(owner, name):
+    owner.publish({"bitcoin": BTC})
+    code = (
+        "from app.market_snapshot import MarketSnapshot\n"
+        f"print(MarketSnapshot.attach({name!r}).read('bitcoin')[0]['price_usd'])\n"
+    )
+
+    for _ in range(2):
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        assert result.stdout.strip() == "50000.0"
+
+
+@pytest.mark.asyncio
+async def test_first_process_publishes_and_lookup_uses_snapshot(name, monkeypatch):
+    markets = AsyncMock(return_value={"bitcoin": BTC})
+    with patch("app.market_snapshot.get_markets", markets):
+        publisher = await start_market_snapshot()
+        try:
+            # Блокировка занята: второй процесс только читает.
+            assert await start_market_snapshot() is None
+            await publisher.refresh()
+
+            assert lookup_price("btc") == BTC
+            assert lookup_price("dogecoin") is None
+
+            monkeypatch.setenv("MARKET_SNAPSHOT_MAX_AGE_SECONDS", "0")
+            from app.config import get_settings
+
+            get_settings.cache_clear()
+            publisher.snapshot.publish({"bitcoin": BTC}, now=time.time() - 10)
+            assert lookup_price("btc") is None
+        finally:
+            await stop_market_snapshot(publisher)
+
+    assert markets.await_args.args[0] == ["bitcoin", "ethereum"]
+    assert CACHE_REQUESTS.value("market_snapshot", "hit") == 1
+    assert CACHE_REQUESTS.value("market_snapshot", "miss") == 2
+
+
+@pytest.mark.asyncio
+async def test_get_price_node_reads_snapshot_without_http(owner):
+    owner.publish({"bitcoin": BTC})
+
+    with patch("app.agent.nodes.get_price", new_callable=AsyncMock) as get_price:
+        result = await get_price_node({"coin": "btc"})
+
+    get_price.assert_not_called()
+    assert result["api_data"]["price_usd"] == 50000.0
+    assert result["api_data"]["_api_calls"] == ["shm:market_snapshot"]
@@ -0,0 +1,137 @@
+"""Тесты метрик и эндпоинта /metrics."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from langchain_core.messages import AIMessage
+
+from app.metrics import (
+    CACHE_REQUESTS,
+    INTENTS,
+    LLM_SECONDS,
+    LLM_TOKENS,
+    NODE_SECONDS,
+    REGISTRY,
+    TIMEOUTS,
+    UPSTREAM_SECONDS,
+    MetricsRegistry,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    REGISTRY.clear()
+    yield
+    REGISTRY.clear()
+
+
+def test_render_text_exposition_format():
+    registry = MetricsRegistry()
+    latency = registry.histogram("demo_seconds", "Demo latency.", ("node",), buckets=(0.1, 1.0))
+    calls = registry.counter("demo_total", "Demo calls.", ("target",))
+
+    latency.observe(0.05, "classify")
+    latency.observe(0.5, "classify")
+    calls.inc('say "hi"')
+
+    text = registry.render()
+
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{node="classify",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{node="classify",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{node="classify",le="+Inf"} 2' in text
+    assert 'demo_seconds_count{node="classify"} 2' in text
+    assert "# TYPE demo_total counter" in text
+    assert 'demo_total{target="say \\"hi\\""} 1.0' in text
+
+
+def test_registry_rejects_duplicate_names():
+    registry = MetricsRegistry()
+    registry.counter("dup_total", "Dup.")
+
+    with pytest.raises(ValueError):
+        registry.counter("dup_total", "Dup.")
+
+
+@pytest.mark.asyncio
+async def test_graph_run_records_nodes_upstream_llm_and_intent():
+    from app.agent.graph import build_graph
+    from app.llm.pool import LLMPool, PoolMember
+
+    client = MagicMock()
+    client.ainvoke = AsyncMock(
+        side_effect=[
+            AIMessage(
+                content='{"intent": "price", "coin": "bitcoin"}',
+                usage_metadata={
+                    "input_tokens": 120,
+                    "output_tokens": 10,
+                    "total_tokens": 130,
+                    "input_token_details": {"cache_read": 100},
+                },
+            ),
+            AIMessage(content="Bitcoin стоит $50,000"),
+        ]
+    )
+    classify_pool = LLMPool([PoolMember(name="m#0", llm=client)], name="classify")
+    generate_pool = LLMPool([PoolMember(name="m#0", llm=client)], name="generate")
+    with (
+        patch("app.agent.router.get_llm", return_value=classify_pool),
+        patch("app.agent.nodes.get_llm", return_value=generate_pool),
+        patch("app.agent.nodes.get_price", new_callable=AsyncMock, return_value={"price_usd": 1.0}),
+    ):
+        graph = build_graph()
+        await graph.ainvoke(
+            {"messages": [], "user_query": "Сколько стоит биткоин?"},
+            config={"configurable": {"thread_id": "metrics-thread"}},
+        )
+
+    assert NODE_SECONDS.get("classify_intent").count == 1
+    assert NODE_SECONDS.get("get_price").count == 1
+    assert NODE_SECONDS.get("generate_response").count == 1
+    assert UPSTREAM_SECONDS.get("coingecko:/coins/markets", "ok").count == 1
+    assert INTENTS.value("price") == 1
+    assert LLM_TOKENS.value("classify", "input") == 120
+    assert LLM_TOKENS.value("classify", "cached") == 100
+    assert LLM_SECONDS.get("generate").count == 1
+    assert CACHE_REQUESTS.value("llm_session", "hit") == 1
+    assert CACHE_REQUESTS.value("llm_session", "miss") == 0
+
+
+@pytest.mark.asyncio
+async def test_upstream_error_and_branch_timeout_are_counted(monkeypatch):
+    import asyncio
+
+    from app.agent.nodes import analytics_market_node, analytics_news_node
+
+    monkeypatch.setenv("ANALYTICS_BRANCH_TIMEOUT_SECONDS", "0.05")
+
+    async def slow_news(_coin, max_results=3):
+        await asyncio.sleep(5)
+
+    with (
+        patch("app.agent.nodes.get_market_data", new_callable=AsyncMock, side_effect=RuntimeError),
+        patch("app.agent.nodes.get_crypto_news", side_effect=slow_news),
+    ):
+        await analytics_market_node({"coin": "bitcoin"})
+        await analytics_news_node({"coin": "bitcoin"})
+
+    assert UPSTREAM_SECONDS.get("coingecko:/coins/{id}", "error").count == 1
+    assert UPSTREAM_SECONDS.get("newsapi:/v2/everything", "cancelled").count == 1
+    assert TIMEOUTS.value("analytics_news") == 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_serves_text_format():
+    from app.main import app
+
+    INTENTS.inc("chat")
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'crypto_intent_total{intent="chat"} 1.0' in response.text
+    assert "# TYPE crypto_graph_node_seconds histogram" in response.text
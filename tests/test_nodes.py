@@ -7,11 +7,12 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 
 from app.agent.nodes import (
-    analyze_node,
+    analytics_market_node,
+    analytics_news_node,
     analytics_search_node,
+    analyze_node,
     clarify_coin_node,
     generate_response_node,
-    get_analytics_data_node,
     get_news_node,
     get_price_node,
     web_search_node,
@@ -46,6 +47,30 @@ async def test_get_price_node_error():
     assert "error" in result["api_data"]
 
 
+@pytest.mark.asyncio
+async def test_get_price_node_deduplicates_upstream_within_batch():
+    from app.singleflight import batch_flights
+
+    fetched = []
+
+    async def slow_price(coin):
+        fetched.append(coin)
+        await asyncio.sleep(0.01)
+        return {"name": "Bitcoin", "symbol": "BTC", "price_usd": 50000.0}
+
+    with patch("app.agent.nodes.get_price", side_effect=slow_price):
+        with batch_flights():
+            first, second = await asyncio.gather(
+                asyncio.create_task(get_price_node({"coin": "btc"})),
+                asyncio.create_task(get_price_node({"coin": "bitcoin"})),
+            )
+        outside = await get_price_node({"coin": "bitcoin"})
+
+    assert fetched == ["btc", "bitcoin"]
+    assert first["api_data"] == second["api_data"] == outside["api_data"]
+    assert first["api_data"] is not second["api_data"]
+
+
 # ─── get_news_node ───
 
 
@@ -63,94 +88,48 @@ async def test_get_news_node_success():
     assert result["api_data"]["_api_calls"] == ["newsapi:/v2/everything"]
 
 
-# ─── get_analytics_data_node ───
+# ─── ветки аналитики ───
 
 
 @pytest.mark.asyncio
-async def test_get_analytics_data_node_success():
+async def test_analytics_market_node_success():
     mock_market = {"price_usd": 50000.0}
-    mock_news = [{"title": "News 1"}]
-    with (
-        patch(
-            "app.agent.nodes.get_market_data",
-            new_callable=AsyncMock,
-            return_value=mock_market,
-        ),
-        patch(
-            "app.agent.nodes.get_crypto_news",
-            new_callable=AsyncMock,
-            return_value=mock_news,
-        ),
+    with patch(
+        "app.agent.nodes.get_market_data", new_callable=AsyncMock, return_value=mock_market
     ):
-        result = await get_analytics_data_node({"coin": "bitcoin"})
+        result = await analytics_market_node({"coin": "bitcoin"})
 
-    assert result["api_data"]["market"] == mock_market
-    assert result["api_data"]["news"] == mock_news
-    assert result["api_data"]["_api_calls"] == [
-        "coingecko:/coins/{id}",
-        "newsapi:/v2/everything",
-    ]
+    api_data = result["api_data"]
+    assert api_data["market"] == mock_market
+    assert api_data["_api_calls"] == ["coingecko:/coins/{id}"]
+    assert api_data["_timings_ms"]["market"] >= 0
 
 
 @pytest.mark.asyncio
-async def test_get_analytics_data_node_uses_parallel_gather():
-    mock_market = {"price_usd": 50000.0}
+async def test_analytics_news_node_success():
     mock_news = [{"title": "News 1"}]
-    with (
-        patch(
-            "app.agent.nodes.get_market_data",
-            new_callable=AsyncMock,
-            return_value=mock_market,
-        ),
-        patch(
-            "app.agent.nodes.get_crypto_news",
-            new_callable=AsyncMock,
-            return_value=mock_news,
-        ),
-        patch("app.agent.nodes.asyncio.gather", wraps=asyncio.gather) as gather_spy,
-    ):
-        result = await get_analytics_data_node({"coin": "bitcoin"})
+    with patch(
+        "app.agent.nodes.get_crypto_news", new_callable=AsyncMock, return_value=mock_news
+    ) as mock_get_news:
+        result = await analytics_news_node({"coin": "bitcoin"})
 
-    assert result["api_data"]["market"] == mock_market
     assert result["api_data"]["news"] == mock_news
-    gather_spy.assert_called_once()
-    assert gather_spy.call_args.kwargs.get("return_exceptions") is True
+    assert result["api_data"]["_api_calls"] == ["newsapi:/v2/everything"]
+    assert mock_get_news.await_args.kwargs["max_results"] == 3
 
 
 @pytest.mark.asyncio
-async def test_get_analytics_data_node_runs_market_and_news_in_parallel():
-    started = {"market": False, "news": False}
-    both_started = asyncio.Event()
-    release = asyncio.Event()
-
-    async def fake_market(_coin):
-        started["market"] = True
-        if started["news"]:
-            both_started.set()
-        await both_started.wait()
-        await release.wait()
-        return {"price_usd": 50000.0}
-
-    async def fake_news(_coin, max_results=3):
-        assert max_results == 3
-        started["news"] = True
-        if started["market"]:
-            both_started.set()
-        await both_started.wait()
-        await release.wait()
-        return [{"title": "News 1"}]
-
-    with (
-        patch("app.agent.nodes.get_market_data", side_effect=fake_market),
-        patch("app.agent.nodes.get_crypto_news", side_effect=fake_news),
-    ):
-        task = asyncio.create_task(get_analytics_data_node({"coin": "bitcoin"}))
-        await asyncio.wait_for(both_started.wait(), timeout=0.2)
-        release.set()
-        result = await task
+async def test_analytics_news_node_timeout_returns_error(monkeypatch):
+    monkeypatch.setenv("ANALYTICS_BRANCH_TIMEOUT_SECONDS", "0.05")
+
+    async def slow_news(_coin, max_results=3):
+        await asyncio.sleep(5)
+
+    with patch("app.agent.nodes.get_crypto_news", side_effect=slow_news):
+        result = await asyncio.wait_for(analytics_news_node({"coin": "bitcoin"}), 1)
 
-    assert result["api_data"]["market"]["price_usd"] == 50000.0
-    assert result["api_data"]["news"][0]["title"] == "News 1"
+    assert result["api_data"]["news"] == [{"error": "TimeoutError"}]
+    assert result["api_data"]["_timings_ms"]["news"] < 1000
 
 
 # ─── analytics_search_node ───
@@ -169,7 +148,8 @@ async def test_analytics_search_node_success():
         )
 
     assert result["api_data"]["web_search"] == mock_results
-    assert result["api_data"]["_api_calls"][-1] == "ddgs:text"
+    assert result["api_data"]["_api_calls"] == ["ddgs:text"]
+    assert "market" not in result["api_data"]
 
 
 @pytest.mark.asyncio
@@ -189,6 +169,16 @@ async def test_analytics_search_node_uses_current_year_query():
         assert "2025" not in query
 
 
+@pytest.mark.asyncio
+async def test_analytics_search_node_prefers_classifier_query():
+    with patch("app.agent.nodes.search_web", new_callable=AsyncMock, return_value=[]) as mock_search:
+        await analytics_search_node(
+            {"coin": "bitcoin", "api_data": {}, "search_query": "bitcoin ETF outlook"}
+        )
+
+    assert mock_search.await_args.args[0] == "bitcoin ETF outlook"
+
+
 # ─── analyze_node ───
 
 
@@ -254,6 +244,28 @@ async def test_generate_response_node(mock_llm):
     assert len(result["messages"]) == 1
 
 
+@pytest.mark.asyncio
+async def test_generate_response_node_fast_render_skips_llm(mock_llm, monkeypatch):
+    from app.metrics import RESPONSE_RENDERS
+
+    monkeypatch.setenv("FAST_RENDER_INTENTS", '["price"]')
+    RESPONSE_RENDERS.clear()
+    state = {
+        "user_query": "Сколько стоит BTC?",
+        "intent": "price",
+        "api_data": {"name": "Bitcoin", "symbol": "BTC", "price_usd": 50000.0},
+    }
+    with patch("app.agent.nodes.get_llm", return_value=mock_llm):
+        fast = await generate_response_node(state)
+        fallback = await generate_response_node({**state, "api_data": {"error": "timeout"}})
+
+    assert "Bitcoin (BTC)" in fast["response"]
+    assert fallback["response"] == "mocked response"
+    mock_llm.ainvoke.assert_awaited_once()
+    assert RESPONSE_RENDERS.value("price", "template") == 1
+    assert RESPONSE_RENDERS.value("price", "llm") == 1
+
+
 # ─── Форматирование ───
 
 
@@ -0,0 +1,211 @@
+"""Тесты пула LLM-клиентов: маршрутизация, failover, исключение клиентов."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+from app.llm.pool import LLMPool, PoolMember, is_retryable_error
+
+
+class StatusError(Exception):
+    """Ошибка с HTTP-статусом, как у gigachat.exceptions.ResponseError."""
+
+    def __init__(self, status_code: int, retry_after: float | None = None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        if retry_after is not None:
+            self.retry_after = retry_after
+
+
+def _member(name: str, content: str = "ok", **kwargs) -> PoolMember:
+    llm = MagicMock()
+    llm.ainvoke = AsyncMock(return_value=MagicMock(content=content))
+    return PoolMember(name=name, llm=llm, **kwargs)
+
+
+@pytest.mark.parametrize(
+    "exc,expected",
+    [
+        (StatusError(429), True),
+        (StatusError(503), True),
+        (StatusError(400), False),
+        (StatusError(401), False),
+        (httpx.ConnectError("boom"), True),
+        (ValueError("bad"), False),
+    ],
+)
+def test_is_retryable_error(exc, expected):
+    assert is_retryable_error(exc) is expected
+
+
+@pytest.mark.asyncio
+async def test_pool_routes_to_fastest_member():
+    slow = _member("slow", "slow", ewma_latency=2.0)
+    fast = _member("fast", "fast", ewma_latency=0.5)
+    pool = LLMPool([slow, fast])
+
+    result = await pool.ainvoke(["hi"])
+
+    assert result.content == "fast"
+    slow.llm.ainvoke.assert_not_awaited()
+    assert fast.calls_total == 1
+    assert fast.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_pool_prefers_less_loaded_member():
+    busy = _member("busy", "busy", ewma_latency=1.0, in_flight=3)
+    idle = _member("idle", "idle", ewma_latency=1.5)
+    pool = LLMPool([busy, idle])
+
+    result = await pool.ainvoke(["hi"])
+
+    assert result.content == "idle"
+
+
+@pytest.mark.asyncio
+async def test_pool_spreads_concurrent_calls_across_fresh_members():
+    release = asyncio.Event()
+
+    async def wait(*_args, **_kwargs):
+        await release.wait()
+        return MagicMock(content="ok")
+
+    first, second = _member("first"), _member("second")
+    first.llm.ainvoke.side_effect = wait
+    second.llm.ainvoke.side_effect = wait
+    pool = LLMPool([first, second])
+
+    calls = [asyncio.create_task(pool.ainvoke(["hi"])) for _ in range(4)]
+    await asyncio.sleep(0)
+
+    assert (first.in_flight, second.in_flight) == (2, 2)
+    release.set()
+    await asyncio.gather(*calls)
+
+
+@pytest.mark.asyncio
+async def test_pool_moves_off_failing_fresh_member():
+    failing = _member("failing")
+    failing.llm.ainvoke.side_effect = StatusError(503)
+    backup = _member("backup", ewma_latency=1.2)
+    pool = LLMPool([failing, backup], error_threshold=2.0)
+
+    await pool.ainvoke(["hi"])
+    await pool.ainvoke(["hi"])
+
+    assert failing.llm.ainvoke.await_count == 1
+    assert backup.llm.ainvoke.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_pool_fails_over_on_server_error():
+    broken = _member("broken", ewma_latency=0.1)
+    broken.llm.ainvoke.side_effect = StatusError(502)
+    backup = _member("backup", "backup", ewma_latency=1.0)
+    pool = LLMPool([broken, backup], error_threshold=0.9)
+
+    result = await pool.ainvoke(["hi"])
+
+    assert result.content == "backup"
+    assert broken.errors_total == 1
+    assert broken.ewma_error > 0
+    assert broken.is_healthy(0) is True
+
+
+@pytest.mark.asyncio
+async def test_pool_ejects_member_on_rate_limit():
+    limited = _member("limited", ewma_latency=0.1)
+    limited.llm.ainvoke.side_effect = StatusError(429, retry_after=60)
+    backup = _member("backup", "backup", ewma_latency=1.0)
+    pool = LLMPool([limited, backup])
+
+    await pool.ainvoke(["hi"])
+    await pool.ainvoke(["hi"])
+
+    assert limited.llm.ainvoke.await_count == 1
+    assert backup.llm.ainvoke.await_count == 2
+    snapshot = pool.snapshot()["members"]
+    assert snapshot[0]["healthy"] is False
+
+
+@pytest.mark.asyncio
+async def test_pool_ejects_member_after_error_rate_threshold():
+    flaky = _member("flaky", ewma_latency=0.1)
+    flaky.llm.ainvoke.side_effect = StatusError(500)
+    backup = _member("backup", "backup", ewma_latency=1.0)
+    pool = LLMPool([flaky, backup], eject_seconds=60, error_threshold=0.5)
+
+    for _ in range(3):
+        await pool.ainvoke(["hi"])
+
+    assert flaky.llm.ainvoke.await_count == 2
+    assert pool.candidates()[-1] is flaky
+
+
+@pytest.mark.asyncio
+async def test_pool_does_not_retry_client_errors():
+    bad = _member("bad", ewma_latency=0.1)
+    bad.llm.ainvoke.side_effect = StatusError(400)
+    backup = _member("backup", ewma_latency=1.0)
+    pool = LLMPool([bad, backup])
+
+    with pytest.raises(StatusError):
+        await pool.ainvoke(["hi"])
+
+    backup.llm.ainvoke.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_pool_releases_in_flight_on_cancellation():
+    async def hang(*_args, **_kwargs):
+        await asyncio.sleep(1)
+
+    member = _member("slow")
+    member.llm.ainvoke.side_effect = hang
+    pool = LLMPool([member])
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(pool.ainvoke(["hi"]), timeout=0.01)
+
+    assert member.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_pool_raises_last_error_when_all_members_fail():
+    first = _member("first")
+    first.llm.ainvoke.side_effect = StatusError(503)
+    second = _member("second")
+    second.llm.ainvoke.side_effect = StatusError(504)
+    pool = LLMPool([first, second])
+
+    with pytest.raises(StatusError) as exc_info:
+        await pool.ainvoke(["hi"])
+
+    assert exc_info.value.status_code in {503, 504}
+
+
+@pytest.mark.asyncio
+async def test_pool_updates_latency_ewma():
+    member = _member("only")
+    pool = LLMPool([member])
+
+    await pool.ainvoke(["hi"])
+    first = member.ewma_latency
+    await pool.ainvoke(["hi"])
+
+    assert first > 0
+    assert member.ewma_latency > 0
+
+
+@pytest.mark.asyncio
+async def test_pool_snapshot_reports_role_latency_histogram():
+    pool = LLMPool([_member("only")], name="classify")
+
+    await pool.ainvoke(["hi"])
+    snapshot = pool.snapshot()
+
+    assert pool.name == "classify"
+    assert snapshot["latency_seconds"]["count"] == 1
@@ -0,0 +1,98 @@
+"""Тесты компактной сериализации api_data для промптов."""
+
+import json
+
+from app.agent.prompt_data import compact_api_data, estimate_tokens
+from benchmarks.prompt_tokens import DEFAULT_RECORDS, build_report, load_records
+
+
+def _news(count: int, description_len: int = 300) -> list[dict]:
+    return [
+        {
+            "title": f"Headline {i}",
+            "description": "word " * (description_len // 5),
+            "url": f"https://example.com/{i}",
+            "source": "Example",
+        }
+        for i in range(count)
+    ]
+
+
+def test_estimate_tokens_counts_words_and_punctuation():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("BTC up") == 2
+    assert estimate_tokens('{"a":1}') == 7
+    assert estimate_tokens("криптовалюта") == 2
+
+
+def test_compact_api_data_drops_internal_keys_and_urls():
+    rendered = compact_api_data(
+        {
+            "market": {"name": "Bitcoin", "ath_usd": None},
+            "news": _news(1, 20),
+            "_api_calls": ["coingecko:/coins/{id}"],
+        }
+    )
+    data = json.loads(rendered)
+
+    assert "_api_calls" not in data
+    assert "url" not in data["news"][0]
+    assert "ath_usd" not in data["market"]
+    assert '": ' not in rendered and '", ' not in rendered
+
+
+def test_compact_api_data_rounds_numbers():
+    data = json.loads(
+        compact_api_data(
+            {
+                "price_usd": 67342.123456,
+                "price_change_24h_pct": -1.834521,
+                "small_price_usd": 0.0000123456,
+                "mid_price_usd": 148.2391,
+                "market_cap_usd": 1328410293847,
+            }
+        )
+    )
+
+    assert data == {
+        "price_usd": 67342,
+        "price_change_24h_pct": -1.83,
+        "small_price_usd": 1.235e-05,
+        "mid_price_usd": 148.24,
+        "market_cap_usd": 1328410293847,
+    }
+
+
+def test_compact_api_data_truncates_sections_to_budget():
+    api_data = {"market": {"name": "Bitcoin"}, "news": _news(10), "web_search": _news(5)}
+
+    unbounded = compact_api_data(api_data)
+    bounded = compact_api_data(api_data, budget_tokens=150)
+
+    assert estimate_tokens(unbounded) > 150
+    assert estimate_tokens(bounded) <= 150
+    data = json.loads(bounded)
+    assert data["market"] == {"name": "Bitcoin"}
+    assert 1 <= len(data["news"]) < 10
+
+
+def test_compact_api_data_shortens_texts_when_lists_cannot_shrink():
+    rendered = compact_api_data({"text": "слово " * 500}, budget_tokens=20)
+
+    assert estimate_tokens(rendered) <= 20
+    assert json.loads(rendered)["text"].endswith("…")
+
+
+def test_compact_api_data_hard_truncates_as_last_resort():
+    rendered = compact_api_data({f"metric_{i}": i for i in range(200)}, budget_tokens=20)
+
+    assert estimate_tokens(rendered) <= 21
+    assert rendered.endswith("…")
+
+
+def test_prompt_tokens_report_shows_savings_on_recorded_requests():
+    report = build_report(load_records(DEFAULT_RECORDS))
+
+    assert report["rows"]
+    assert report["tokens_after"] < report["tokens_before"]
+    assert all(row["tokens_after"] <= row["tokens_before"] for row in report["rows"])
@@ -0,0 +1,135 @@
+"""Тесты записи запросов /chat и их воспроизведения без сети."""
+
+import threading
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+
+import app.recording as recording_module
+from app.llm import gigachat as llm_module
+from app.recording import (
+    Recording,
+    RecordWriter,
+    ReplayedError,
+    ReplayMismatchError,
+    close_record_writer,
+    load_records,
+    replay_request,
+)
+from benchmarks.replay import run_replay
+from simulator.app import serve, simulator_env
+from simulator.profile import Latency, SimulatorConfig, UpstreamProfile
+
+FAST = UpstreamProfile(latency=Latency(distribution="fixed", median_ms=0))
+
+
+async def _price(coin: str) -> dict:
+    return {"symbol": coin.upper(), "price_usd": 1.0}
+
+
+async def _failing() -> dict:
+    raise ReplayedError("CoinGecko недоступен", status_code=503)
+
+
+@pytest_asyncio.fixture
+async def recorded(monkeypatch, tmp_path):
+    """Два хода одного диалога, записанные против симулятора."""
+    import app.main as main_module
+    from app.agent.graph import build_graph
+
+    path = tmp_path / "records.jsonl"
+    monkeypatch.setenv("RECORD_TRACE_PATH", str(path))
+    config = SimulatorConfig(seed=1, coingecko=FAST, newsapi=FAST, ddgs=FAST, gigachat=FAST)
+    async with serve(config) as sim:
+        for key, value in simulator_env(sim.state.base_url).items():
+            monkeypatch.setenv(key, value)
+        llm_module._llm_instances.clear()
+        monkeypatch.setattr(main_module, "agent_graph", build_graph())
+        transport = ASGITransport(app=main_module.app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            for message in ("Сколько стоит биткоин?", "Новости по эфиру"):
+                response = await client.post(
+                    "/chat", json={"message": message, "thread_id": "rec-1"}
+                )
+                assert response.status_code == 200
+        await llm_module.close_llm()
+    close_record_writer()
+    # Симулятор остановлен: воспроизведение не может сходить в сеть.
+    monkeypatch.delenv("RECORD_TRACE_PATH")
+    monkeypatch.setattr(main_module, "agent_graph", build_graph())
+    return load_records(path)
+
+
+@pytest.mark.asyncio
+async def test_recording_captures_upstream_and_llm_calls(recorded):
+    price, news = recorded
+
+    assert [r["message"] for r in recorded] == ["Сколько стоит биткоин?", "Новости по эфиру"]
+    assert price["status"] == 200 and price["intent"] == "price" and price["response"]
+    calls = [(c["kind"], c["name"]) for c in price["calls"]]
+    assert calls == [
+        ("llm", "classify"),
+        ("upstream", "coingecko:/coins/markets"),
+        ("llm", "generate"),
+    ]
+    upstream = price["calls"][1]
+    assert upstream["key"] == "bitcoin"
+    assert "_api_calls" not in upstream["result"]
+    assert news["calls"][1]["key"] == ["ethereum", 5]
+    assert all(c["duration_ms"] >= 0 for c in price["calls"])
+
+
+@pytest.mark.asyncio
+async def test_replay_reproduces_outputs_without_network(recorded):
+    report = await run_replay(recorded, timing="fast")
+
+    assert report["records"] == 2
+    assert report["outputs"] == {"identical": 2, "changed": 0, "examples": []}
+    assert report["calls"]["unmatched"] == {}
+    assert report["calls"]["unused"] == 0
+    assert report["latency"]["replayed"]["count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_replay_errors_mismatches_and_unused_calls():
+    recording = Recording("t", "q")
+    data = await recording.upstream("coingecko:/coins/markets", "bitcoin", _price("btc"))
+    data["_api_calls"] = ["coingecko:/coins/markets"]
+    with pytest.raises(ReplayedError):
+        await recording.upstream("coingecko:/coins/markets", "ethereum", _failing())
+    record = recording.to_dict()
+    record["calls"].append({"kind": "llm", "name": "generate", "result": {"content": "ok"}})
+
+    with replay_request(record) as replay:
+        replayed = await replay.upstream("coingecko:/coins/markets", "bitcoin", _price("x"))
+        with pytest.raises(ReplayedError) as exc_info:
+            await replay.upstream("coingecko:/coins/markets", "ethereum", _price("x"))
+        with pytest.raises(ReplayMismatchError):
+            await replay.upstream("newsapi:/v2/everything", ["bitcoin", 5], _price("x"))
+
+    assert replayed == {"symbol": "BTC", "price_usd": 1.0}
+    assert exc_info.value.status_code == 503
+    assert replay.unmatched == ["upstream:newsapi:/v2/everything"]
+    assert replay.unused == 1
+
+
+def test_record_writer_does_not_block_on_slow_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(recording_module, "WRITE_QUEUE_SIZE", 2)
+    path = tmp_path / "records.jsonl"
+    writer = RecordWriter(path)
+    unblock = threading.Event()
+    write_batch = writer._write
+
+    def slow_write(records):
+        unblock.wait(timeout=5)
+        write_batch(records)
+
+    monkeypatch.setattr(writer, "_write", slow_write)
+    for i in range(6):
+        writer.put({"thread_id": str(i), "started_at": float(i)})
+
+    assert writer.dropped > 0
+    unblock.set()
+    writer.close()
+    assert len(load_records(path)) == 6 - writer.dropped
@@ -1,10 +1,17 @@
 """Тесты для router: classify_intent, route_by_intent, route_needs_search."""
 
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
 import pytest
+from langchain_core.messages import AIMessage
 
-from app.agent.router import classify_intent, route_by_intent, route_needs_search
+from app.agent.router import (
+    analytics_branches,
+    classify_intent,
+    route_by_intent,
+    route_needs_search,
+)
 
 
 # ─── classify_intent ───
@@ -128,3 +135,121 @@ async def test_route_needs_search_yesterday_not_yes(mock_llm):
         )
 
     assert result == "no_search"
+
+
+@pytest.mark.asyncio
+async def test_router_requests_role_specific_llm(mock_llm):
+    mock_llm.ainvoke.return_value = MagicMock(content="no")
+    with patch("app.agent.router.get_llm", return_value=mock_llm) as mock_get_llm:
+        await classify_intent({"user_query": "Сколько стоит BTC?"})
+        await route_needs_search({"user_query": "Прогноз BTC", "api_data": {}})
+
+    assert [call.args for call in mock_get_llm.call_args_list] == [("classify",), ("route",)]
+
+
+# ─── structured-режим классификации ───
+
+
+def _function_call(args: dict) -> AIMessage:
+    return AIMessage(
+        content="",
+        tool_calls=[{"name": "classify_request", "args": args, "id": "call-1"}],
+    )
+
+
+@pytest.mark.asyncio
+async def test_classify_intent_structured_returns_search_decision(mock_llm, monkeypatch):
+    monkeypatch.setenv("CLASSIFY_MODE", "structured")
+    mock_llm.ainvoke.return_value = _function_call(
+        {
+            "intent": "analytics",
+            "coins": ["bitcoin", "ethereum"],
+            "needs_search": True,
+            "search_query": "bitcoin ETF outlook",
+        }
+    )
+    with patch("app.agent.router.get_llm", return_value=mock_llm):
+        result = await classify_intent({"user_query": "BTC или ETH, что брать?"})
+
+    assert result == {
+        "intent": "analytics",
+        "coin": "bitcoin",
+        "last_coin": "bitcoin",
+        "needs_search": True,
+        "search_query": "bitcoin ETF outlook",
+    }
+    kwargs = mock_llm.ainvoke.await_args.kwargs
+    assert kwargs["function_call"] == {"name": "classify_request"}
+    assert kwargs["functions"][0]["name"] == "classify_request"
+
+
+@pytest.mark.asyncio
+async def test_classify_intent_structured_reuses_previous_coin(mock_llm, monkeypatch):
+    monkeypatch.setenv("CLASSIFY_MODE", "structured")
+    mock_llm.ainvoke.return_value = _function_call({"intent": "price", "coins": []})
+    with patch("app.agent.router.get_llm", return_value=mock_llm):
+        result = await classify_intent({"user_query": "а сейчас сколько?", "coin": "solana"})
+
+    assert result["intent"] == "price"
+    assert result["coin"] == "solana"
+    assert result["needs_search"] is None
+
+
+@pytest.mark.asyncio
+async def test_classify_intent_structured_invalid_arguments(mock_llm, monkeypatch):
+    monkeypatch.setenv("CLASSIFY_MODE", "structured")
+    mock_llm.ainvoke.return_value = _function_call({"intent": "weather"})
+    with patch("app.agent.router.get_llm", return_value=mock_llm):
+        result = await classify_intent({"user_query": "какая погода?"})
+
+    assert result["intent"] == "chat"
+    assert result["coin"] == ""
+
+
+@pytest.mark.asyncio
+async def test_classify_intent_text_mode_leaves_search_undecided(mock_llm):
+    mock_llm.ainvoke.return_value = MagicMock(content='{"intent": "analytics", "coin": "btc"}')
+    with (
+        patch("app.agent.router.get_llm", return_value=mock_llm),
+        patch("app.agent.router.get_settings", return_value=SimpleNamespace(classify_mode="text")),
+    ):
+        result = await classify_intent({"user_query": "Прогноз BTC"})
+
+    assert result["needs_search"] is None
+    assert "functions" not in mock_llm.ainvoke.await_args.kwargs
+
+
+@pytest.mark.parametrize("decided,expected", [(True, "needs_search"), (False, "no_search")])
+@pytest.mark.asyncio
+async def test_route_needs_search_uses_structured_decision(mock_llm, decided, expected):
+    with patch("app.agent.router.get_llm", return_value=mock_llm) as mock_get_llm:
+        result = await route_needs_search(
+            {"user_query": "Прогноз BTC", "api_data": {}, "needs_search": decided}
+        )
+
+    assert result == expected
+    mock_get_llm.assert_not_called()
+    mock_llm.ainvoke.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_route_needs_search_skips_when_search_already_done(mock_llm):
+    with patch("app.agent.router.get_llm", return_value=mock_llm) as mock_get_llm:
+        result = await route_needs_search(
+            {"user_query": "Прогноз BTC", "api_data": {"web_search": []}, "needs_search": True}
+        )
+
+    assert result == "no_search"
+    mock_get_llm.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "decided,expected",
+    [
+        (True, ["analytics_market", "analytics_news", "analytics_search"]),
+        (False, ["analytics_market", "analytics_news"]),
+        (None, ["analytics_market", "analytics_news"]),
+    ],
+)
+def test_analytics_branches(decided, expected):
+    assert analytics_branches({"needs_search": decided}) == expected
@@ -0,0 +1,123 @@
+"""Тесты для планировщика вызовов LLM."""
+
+import asyncio
+
+import pytest
+
+from app.llm import scheduler as scheduler_module
+from app.llm.scheduler import (
+    LLMPriority,
+    LLMQueueFullError,
+    LLMQueueTimeoutError,
+    LLMScheduler,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_scheduler_singleton():
+    """Изолирует singleton планировщика между тестами."""
+    scheduler_module.reset_scheduler()
+    yield
+    scheduler_module.reset_scheduler()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_limits_in_flight():
+    scheduler = LLMScheduler(max_in_flight=2, max_queue=10, queue_timeout=1.0)
+    active = 0
+    peak = 0
+
+    async def call():
+        nonlocal active, peak
+        async with scheduler.slot():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(call() for _ in range(6)))
+
+    assert peak == 2
+    assert scheduler.in_flight == 0
+    assert scheduler.queued == 0
+    assert scheduler.wait_seconds.count == 6
+
+
+@pytest.mark.asyncio
+async def test_scheduler_serves_higher_priority_first():
+    scheduler = LLMScheduler(max_in_flight=1, max_queue=10, queue_timeout=1.0)
+    order: list[str] = []
+
+    await scheduler.acquire()
+
+    async def call(name: str, priority: LLMPriority):
+        async with scheduler.slot(priority):
+            order.append(name)
+
+    tasks = [
+        asyncio.create_task(call("analyze", LLMPriority.ANALYZE)),
+        asyncio.create_task(call("generate", LLMPriority.GENERATE)),
+        asyncio.create_task(call("classify", LLMPriority.CLASSIFY)),
+    ]
+    await asyncio.sleep(0)
+    assert scheduler.queued == 3
+
+    scheduler.release()
+    await asyncio.gather(*tasks)
+
+    assert order == ["classify", "generate", "analyze"]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_rejects_when_queue_full():
+    scheduler = LLMScheduler(max_in_flight=1, max_queue=1, queue_timeout=1.0)
+    await scheduler.acquire()
+    waiter = asyncio.create_task(scheduler.acquire())
+    await asyncio.sleep(0)
+
+    assert scheduler.is_saturated() is True
+    with pytest.raises(LLMQueueFullError):
+        await scheduler.acquire()
+    assert scheduler.rejected_total == 1
+
+    scheduler.release()
+    await waiter
+    scheduler.release()
+    assert scheduler.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_queue_timeout_frees_queue_position():
+    scheduler = LLMScheduler(max_in_flight=1, max_queue=5, queue_timeout=0.01)
+    await scheduler.acquire()
+
+    with pytest.raises(LLMQueueTimeoutError):
+        await scheduler.acquire()
+
+    assert scheduler.queued == 0
+    assert scheduler.timeouts_total == 1
+    scheduler.release()
+    assert scheduler.in_flight == 0
+
+
+def test_get_scheduler_reads_settings(monkeypatch):
+    monkeypatch.setenv("LLM_MAX_IN_FLIGHT", "3")
+    monkeypatch.setenv("LLM_MAX_QUEUE", "7")
+
+    scheduler = scheduler_module.get_scheduler()
+
+    assert scheduler.max_in_flight == 3
+    assert scheduler.max_queue == 7
+    assert scheduler_module.get_scheduler() is scheduler
+
+
+def test_scheduler_snapshot_exposes_histograms():
+    scheduler = LLMScheduler(max_in_flight=1, max_queue=1, queue_timeout=1.0)
+    scheduler.wait_seconds.observe(0.2)
+
+    snapshot = scheduler.snapshot()
+
+    assert snapshot["wait_seconds"]["count"] == 1
+    assert snapshot["wait_seconds"]["buckets"]["0.25"] == 1
+    assert snapshot["wait_seconds"]["buckets"]["0.1"] == 0
+    assert snapshot["queue_depth"]["buckets"]["+Inf"] == 0
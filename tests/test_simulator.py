@@ -0,0 +1,124 @@
+"""Тесты симулятора внешних API: настоящие HTTP-клиенты приложения против подделок."""
+
+import random
+
+import httpx
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from langchain_core.messages import HumanMessage
+
+from app.llm import gigachat as llm_module
+from app.tools.coingecko import get_market_data, get_markets, get_price
+from app.tools.news import get_crypto_news
+from app.tools.websearch import search_web
+from simulator.app import serve, simulator_env
+from simulator.gigachat import classify
+from simulator.profile import Latency, SimulatorConfig, UpstreamProfile
+
+FAST = UpstreamProfile(latency=Latency(distribution="fixed", median_ms=0))
+
+
+@pytest_asyncio.fixture
+async def simulator(monkeypatch):
+    config = SimulatorConfig(seed=1, coingecko=FAST, newsapi=FAST, ddgs=FAST, gigachat=FAST)
+    async with serve(config) as app:
+        for key, value in simulator_env(app.state.base_url).items():
+            monkeypatch.setenv(key, value)
+        llm_module._llm_instances.clear()
+        yield app
+        await llm_module.close_llm()
+
+
+def test_latency_distributions():
+    rng = random.Random(0)
+    fixed = Latency(distribution="fixed", median_ms=40)
+    lognormal = Latency(distribution="lognormal", median_ms=100, p99_ms=500)
+    samples = sorted(lognormal.sample(rng) for _ in range(5000))
+
+    assert fixed.sample(rng) == 0.04
+    assert 0.09 < samples[2500] < 0.11
+    assert 0.4 < samples[4950] < 0.6
+
+
+def test_classify_by_keywords():
+    assert classify("Сколько стоит биткоин?") == ("price", "bitcoin")
+    assert classify("Новости по эфиру") == ("news", "ethereum")
+    assert classify("Стоит ли покупать SOL?") == ("analytics", "solana")
+    assert classify("Что такое DeFi?") == ("chat", "")
+
+
+@pytest.mark.asyncio
+async def test_tools_parse_simulator_responses(simulator):
+    price = await get_price("btc")
+    market = await get_market_data("eth")
+    markets = await get_markets(["bitcoin", "tether"])
+    missing = await get_price("nonexistent")
+    news = await get_crypto_news("bitcoin", max_results=3)
+    results = await search_web("bitcoin etf", max_results=2)
+
+    assert price["symbol"] == "BTC" and 50000 < price["price_usd"] < 80000
+    assert market["price_change_7d_pct"] is not None and market["ath_usd"] > 0
+    assert set(markets) == {"bitcoin", "tether"}
+    assert "error" in missing
+    assert len(news) == 3 and "Bitcoin" in news[0]["title"]
+    assert len(results) == 2 and results[0]["url"].startswith("https://")
+    stats = simulator.state.simulator.snapshot()
+    assert stats["coingecko"]["/coins/markets"]["200"] == 3
+    assert stats["ddgs"]["/search"]["200"] == 1
+
+
+@pytest.mark.asyncio
+async def test_faults_and_rate_limits(simulator):
+    async with AsyncClient(base_url=simulator.state.base_url) as client:
+        await client.put("/_sim/config", json={"coingecko": {"rate_limit_rate": 1.0}})
+        limited = await client.get(
+            "/coingecko/api/v3/coins/markets", params={"vs_currency": "usd"}
+        )
+        await client.put(
+            "/_sim/config", json={"coingecko": {"rate_limit_rate": 0.0, "error_rate": 1.0}}
+        )
+        with pytest.raises(httpx.HTTPStatusError):
+            await get_price("btc")
+        invalid = await client.put("/_sim/config", json={"newsapi": {"error_rate": 2}})
+
+    assert limited.status_code == 429
+    assert limited.headers["retry-after"] == "1"
+    assert invalid.status_code == 422
+    assert simulator.state.simulator.snapshot()["coingecko"]["/coins/markets"] == {
+        "429": 1,
+        "500": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_gigachat_client_and_streaming(simulator):
+    llm = llm_module.get_llm("generate").members[0].llm
+
+    answer = await llm.ainvoke([HumanMessage(content="Расскажи про стейкинг")])
+    payload = {"model": "GigaChat-2", "messages": [{"role": "user", "content": "Привет"}]}
+    chunks = [chunk async for chunk in llm._client.astream(payload)]
+
+    assert answer.content
+    assert answer.response_metadata["token_usage"]["prompt_tokens"] > 0
+    assert len(chunks) > 1
+    assert "".join(chunk.choices[0].delta.content for chunk in chunks).endswith(".")
+    assert chunks[-1].choices[0].finish_reason == "stop"
+
+
+@pytest.mark.asyncio
+async def test_chat_runs_full_graph_against_simulator(simulator, monkeypatch):
+    import app.main as main_module
+    from app.agent.graph import build_graph
+
+    monkeypatch.setattr(main_module, "agent_graph", build_graph())
+    transport = ASGITransport(app=main_module.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        price = await client.post("/chat", json={"message": "Сколько стоит биткоин?"})
+        news = await client.post("/chat", json={"message": "Новости по эфиру"})
+
+    assert price.status_code == 200 and price.json()["intent"] == "price"
+    assert news.status_code == 200 and news.json()["intent"] == "news"
+    stats = simulator.state.simulator.snapshot()
+    assert stats["gigachat"]["/oauth"]["200"] >= 1
+    assert stats["newsapi"]["/v2/everything"]["200"] == 1
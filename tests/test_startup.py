@@ -0,0 +1,68 @@
+"""Тесты холодного старта: ленивые импорты и компиляция графа в lifespan."""
+
+import subprocess
+import sys
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from benchmarks.startup import HEAVY_MODULES, importtime_report, parse_importtime
+
+
+def _loaded_modules(statement: str) -> set[str]:
+    proc = subprocess.run(
+        [sys.executable, "-c", f"{statement}; import sys; print('\\n'.join(sys.modules))"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(proc.stdout.split())
+
+
+def test_import_app_main_does_not_load_heavy_dependencies():
+    report = importtime_report("app.main")
+
+    assert report["heavy_loaded"] == []
+    assert report["total_ms"] > 0
+    assert report["top_imports_ms"]
+
+
+def test_import_config_stays_lightweight():
+    loaded = _loaded_modules("import app.config")
+
+    assert not loaded & {*HEAVY_MODULES, "fastapi", "langchain_core"}
+
+
+def test_parse_importtime_tracks_nesting():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:        10 |         10 |   child\n"
+        "import time:        20 |         30 | parent\n"
+    )
+
+    rows = parse_importtime(stderr)
+
+    assert [(row["module"], row["depth"], row["cumulative_us"]) for row in rows] == [
+        ("child", 1, 10),
+        ("parent", 0, 30),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_lifespan_compiles_graph_once(monkeypatch):
+    import app.main as main_module
+    from app.agent import graph as graph_module
+
+    monkeypatch.setenv("LLM_WARMUP_ENABLED", "false")
+    monkeypatch.setattr(main_module, "agent_graph", None)
+    monkeypatch.setattr(graph_module, "_agent_graph", None)
+    with (
+        patch.object(graph_module, "build_graph", wraps=graph_module.build_graph) as build_spy,
+        patch("app.main.close_llm", new_callable=AsyncMock),
+    ):
+        async with main_module.lifespan(main_module.app):
+            compiled = main_module.agent_graph
+            assert main_module.get_graph() is compiled
+
+    assert compiled is not None
+    build_spy.assert_called_once()
@@ -0,0 +1,104 @@
+"""Тесты шаблонных ответов без LLM."""
+
+from app.agent.templates import (
+    PRICE_INTROS,
+    format_usd,
+    format_usd_compact,
+    is_open_ended,
+    render_answer,
+    render_news,
+    render_price,
+)
+
+NBSP = "\u00a0"
+
+PRICE_DATA = {
+    "name": "Bitcoin",
+    "symbol": "BTC",
+    "price_usd": 67432.15,
+    "price_change_24h_pct": -1.234,
+    "market_cap_usd": 1_320_000_000_000,
+    "total_volume_usd": 28_500_000_000,
+}
+
+
+def test_number_formatting_is_russian():
+    assert format_usd(67432.15) == f"$67{NBSP}432,15"
+    assert format_usd(0.00001234) == "$0,00001234"
+    assert format_usd(0.5) == "$0,5"
+    assert format_usd_compact(1_320_000_000_000) == f"$1,32{NBSP}трлн"
+    assert format_usd_compact(28_500_000_000) == f"$28,50{NBSP}млрд"
+    assert format_usd_compact(950_000) == f"$950{NBSP}000"
+
+
+def test_number_formatting_rounds_before_choosing_format():
+    assert format_usd(0.99999) == "$1,00"
+    assert format_usd(0.99995) == "$1,00"
+    assert format_usd(0.9999) == "$0,9999"
+    assert format_usd(1.0001) == "$1,00"
+    assert format_usd(0.0099999) == "$0,01"
+    assert format_usd(1e-12) == "$0,00"
+    assert format_usd_compact(999_999_999_999.9) == f"$1,00{NBSP}трлн"
+    assert format_usd_compact(999_995_000) == f"$1,00{NBSP}млрд"
+    assert format_usd_compact(999_999.7) == f"$1,00{NBSP}млн"
+    assert format_usd_compact(994_999.0) == f"$994{NBSP}999"
+    assert not any(
+        format_usd(value).endswith(",") for value in (0.99999, 0.0999999, 1e-12, 1e-9)
+    )
+
+
+def test_render_price_builds_full_answer():
+    text = render_price(PRICE_DATA, seed="thread-1:Сколько стоит BTC?")
+
+    assert "Bitcoin (BTC)" in text
+    assert f"$67{NBSP}432,15" in text
+    assert f"1,23{NBSP}%" in text
+    assert "снизился" in text or "потеряла" in text
+    assert f"Капитализация — $1,32{NBSP}трлн" in text
+
+
+def test_render_price_variants_depend_on_seed():
+    intros = {render_price(PRICE_DATA, seed=f"t-{i}").split(" $")[0] for i in range(30)}
+
+    assert len(intros) == len(PRICE_INTROS)
+
+
+def test_render_price_falls_back_on_error_or_missing_price():
+    assert render_price({"error": "Монета не найдена"}) is None
+    assert render_price({**PRICE_DATA, "price_usd": None}) is None
+
+
+def test_render_price_skips_missing_fields():
+    text = render_price({"name": "Solana", "symbol": "SOL", "price_usd": 150.0})
+
+    assert text.endswith("$150,00.")
+    assert "Капитализация" not in text
+
+
+def test_render_news_lists_articles():
+    data = {
+        "articles": [
+            {
+                "title": "ETF inflows hit record",
+                "source": "CoinDesk",
+                "published_at": "2025-03-01T10:00:00Z",
+                "url": "https://example.com/a",
+            }
+        ]
+    }
+
+    text = render_news(data, coin="ethereum")
+
+    assert "по Ethereum:" in text
+    assert "1. ETF inflows hit record (CoinDesk, 01.03.2025)" in text
+    assert "https://example.com/a" in text
+    assert render_news({"articles": [{"error": "NEWS_API_KEY не задан"}]}) is None
+    assert "криптовалютам" in render_news({"articles": []}, coin="crypto")
+
+
+def test_open_ended_questions_go_to_llm():
+    assert is_open_ended("Почему биткоин упал?")
+    assert is_open_ended("Стоит ли покупать ETH сейчас?")
+    assert not is_open_ended("Сколько стоит биткоин?")
+    assert render_answer("price", "Какой прогноз по BTC?", PRICE_DATA) is None
+    assert render_answer("search", "Кто создал биткоин?", {}) is None
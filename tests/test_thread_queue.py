@@ -0,0 +1,153 @@
+"""Тесты очереди ходов диалога (CHAT_THREAD_MODE)."""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.metrics import CHAT_THREAD_TURNS
+from app.thread_queue import ThreadQueue, reset_thread_queue
+
+
+@pytest.fixture(autouse=True)
+def fresh_queue():
+    reset_thread_queue()
+    CHAT_THREAD_TURNS.clear()
+    yield
+    reset_thread_queue()
+
+
+class Recorder:
+    """execute-заглушка: пишет порядок ходов и пиковую параллельность."""
+
+    def __init__(self, delay: float = 0.02):
+        self.delay = delay
+        self.turns: list[str] = []
+        self.active = 0
+        self.peak = 0
+
+    async def __call__(self, message: str) -> str:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        if "boom" in message:
+            raise ValueError("boom")
+        self.turns.append(message)
+        return f"ok: {message}"
+
+
+async def _send(queue: ThreadQueue, thread_id: str, messages: list[str], execute) -> list:
+    tasks = []
+    for message in messages:
+        tasks.append(asyncio.create_task(queue.run(thread_id, message, execute)))
+        await asyncio.sleep(0)  # фиксируем порядок поступления
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_serialize_runs_turns_one_at_a_time_in_order():
+    queue = ThreadQueue("serialize")
+    execute = Recorder()
+
+    results = await _send(queue, "t", ["1", "2", "3"], execute)
+    other = await queue.run("other", "x", execute)
+
+    assert results == ["ok: 1", "ok: 2", "ok: 3"]
+    assert execute.turns == ["1", "2", "3", "x"]
+    assert execute.peak == 1
+    assert other == "ok: x"
+    assert CHAT_THREAD_TURNS.value("queued") == 2
+    assert len(queue) == 0
+
+
+@pytest.mark.asyncio
+async def test_serialize_keeps_different_threads_parallel():
+    queue = ThreadQueue("serialize")
+    execute = Recorder()
+
+    await asyncio.gather(queue.run("a", "1", execute), queue.run("b", "2", execute))
+
+    assert execute.peak == 2
+
+
+@pytest.mark.asyncio
+async def test_coalesce_merges_messages_arriving_during_run():
+    queue = ThreadQueue("coalesce")
+    execute = Recorder()
+
+    results = await _send(queue, "t", ["первое", "второе", "третье"], execute)
+
+    assert execute.turns == ["первое", "второе\nтретье"]
+    assert results == ["ok: первое", "ok: второе\nтретье", "ok: второе\nтретье"]
+    assert CHAT_THREAD_TURNS.value("coalesced") == 1
+    assert len(queue) == 0
+
+
+@pytest.mark.asyncio
+async def test_coalesced_turn_failure_reaches_every_waiter():
+    queue = ThreadQueue("coalesce")
+    execute = Recorder()
+
+    results = await _send(queue, "t", ["1", "boom", "boom"], execute)
+
+    assert results[0] == "ok: 1"
+    assert execute.turns == ["1"]
+    assert [type(r) for r in results[1:]] == [ValueError, ValueError]
+    assert len(queue) == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["serialize", "coalesce"])
+async def test_exclusive_job_runs_between_turns(mode):
+    queue = ThreadQueue(mode)
+    execute = Recorder()
+
+    async def compact() -> str:
+        return await execute("compact")
+
+    first = asyncio.create_task(queue.run("t", "1", execute))
+    await asyncio.sleep(0)
+    job = asyncio.create_task(queue.exclusive("t", compact))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(queue.run("t", "2", execute))
+    await asyncio.gather(first, job, second)
+
+    assert execute.turns == ["1", "compact", "2"]
+    assert execute.peak == 1
+    assert CHAT_THREAD_TURNS.value("direct") == 1
+    assert len(queue) == 0
+
+
+@pytest.mark.asyncio
+async def test_chat_serializes_same_thread(monkeypatch):
+    from app.main import app
+
+    monkeypatch.setenv("GIGACHAT_CREDENTIALS", "test-credentials")
+    stats = {"active": 0, "peak": 0}
+
+    async def ainvoke(state, config):
+        stats["active"] += 1
+        stats["peak"] = max(stats["peak"], stats["active"])
+        await asyncio.sleep(0.02)
+        stats["active"] -= 1
+        return {"response": state["user_query"], "intent": "chat"}
+
+    graph = AsyncMock()
+    graph.ainvoke = ainvoke
+    with patch("app.main.agent_graph", graph):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(
+                *(
+                    client.post("/chat", json={"message": m, "thread_id": "tg-1"})
+                    for m in ("a", "b", "c")
+                )
+            )
+
+    assert [r.status_code for r in responses] == [200, 200, 200]
+    assert sorted(r.json()["response"] for r in responses) == ["a", "b", "c"]
+    assert stats["peak"] == 1
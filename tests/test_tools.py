@@ -10,6 +10,10 @@ from app.tools.coingecko import get_market_data, get_price, resolve_coin_id
 from app.tools.news import get_crypto_news
 from app.tools.websearch import _search_sync, search_web
 
+NEWS_SETTINGS = SimpleNamespace(
+    news_api_key="fake-api-key", newsapi_base_url="https://newsapi.org/v2"
+)
+
 
 # ─── resolve_coin_id ───
 
@@ -138,7 +142,7 @@ async def test_get_crypto_news_success(mock_httpx_response):
 
     with (
         patch("app.tools.news.httpx.AsyncClient", return_value=mock_client),
-        patch("app.tools.news.get_settings", return_value=SimpleNamespace(news_api_key="fake-api-key")),
+        patch("app.tools.news.get_settings", return_value=NEWS_SETTINGS),
     ):
         result = await get_crypto_news("bitcoin")
 
@@ -161,7 +165,7 @@ async def test_get_crypto_news_clamps_page_size(mock_httpx_response):
 
     with (
         patch("app.tools.news.httpx.AsyncClient", return_value=mock_client),
-        patch("app.tools.news.get_settings", return_value=SimpleNamespace(news_api_key="fake-api-key")),
+        patch("app.tools.news.get_settings", return_value=NEWS_SETTINGS),
     ):
         await get_crypto_news("bitcoin", max_results=999)
         high_kwargs = mock_client.get.await_args.kwargs
@@ -185,7 +189,7 @@ async def test_get_crypto_news_http_error_message(mock_httpx_response):
 
     with (
         patch("app.tools.news.httpx.AsyncClient", return_value=mock_client),
-        patch("app.tools.news.get_settings", return_value=SimpleNamespace(news_api_key="fake-api-key")),
+        patch("app.tools.news.get_settings", return_value=NEWS_SETTINGS),
     ):
         with pytest.raises(RuntimeError) as exc_info:
             await get_crypto_news("bitcoin")
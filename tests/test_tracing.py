@@ -0,0 +1,204 @@
+"""Тесты трассировки запросов и эндпоинта /debug/traces."""
+
+import asyncio
+import json
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from langchain_core.messages import AIMessage
+
+import app.main as main_module
+import app.tracing as tracing_module
+from app.tracing import (
+    NULL_SPAN,
+    TraceStore,
+    critical_path,
+    get_trace_store,
+    reset_trace_store,
+    span,
+    trace_request,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_trace_store():
+    reset_trace_store()
+    yield
+    reset_trace_store()
+
+
+def _find(node: dict, kind: str, name: str) -> dict:
+    if node["kind"] == kind and node["name"] == name:
+        return node
+    for child in node["children"]:
+        found = _find(child, kind, name)
+        if found:
+            return found
+    return {}
+
+
+def test_span_outside_request_is_noop():
+    with span("get_price", "node") as current:
+        current.set(attempts=1)
+
+    assert current is NULL_SPAN
+    assert len(get_trace_store()) == 0
+
+
+def test_trace_request_builds_span_tree_and_records_errors():
+    with pytest.raises(ValueError):
+        with trace_request("thread-1", query="q"):
+            with span("classify_intent", "node"):
+                with span("classify", "llm") as llm_span:
+                    llm_span.set(input_tokens=10)
+            with span("get_price", "node"):
+                raise ValueError("boom")
+
+    [trace] = get_trace_store().latest("thread-1")
+    root = trace["root"]
+    assert root["attrs"] == {"query": "q", "error": "ValueError"}
+    assert [c["name"] for c in root["children"]] == ["classify_intent", "get_price"]
+    assert root["children"][0]["children"][0]["attrs"] == {"input_tokens": 10}
+    assert root["children"][1]["attrs"]["error"] == "ValueError"
+
+
+def test_trace_store_is_bounded_and_exports_jsonl(tmp_path):
+    export = tmp_path / "traces" / "traces.jsonl"
+    store = TraceStore(max_traces=2, export_path=str(export))
+    for i in range(3):
+        store.add({"trace_id": str(i), "thread_id": "t", "root": {}})
+    store.close()
+
+    assert [t["trace_id"] for t in store.latest("t", limit=5)] == ["2", "1"]
+    lines = export.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["trace_id"] for line in lines] == ["0", "1", "2"]
+
+
+def test_trace_export_does_not_block_add(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing_module, "EXPORT_QUEUE_SIZE", 2)
+    export = tmp_path / "traces.jsonl"
+    store = TraceStore(max_traces=10, export_path=str(export))
+    unblock = threading.Event()
+    export_batch = store._export
+
+    def slow_export(traces):
+        unblock.wait(timeout=5)
+        export_batch(traces)
+
+    monkeypatch.setattr(store, "_export", slow_export)
+    store.add({"trace_id": "0", "thread_id": "t", "root": {}})
+    for i in range(1, 6):
+        store.add({"trace_id": str(i), "thread_id": "t", "root": {}})
+
+    assert len(store.latest("t", limit=10)) == 6
+    assert store.export_dropped > 0
+    unblock.set()
+    store.close()
+    lines = export.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 6 - store.export_dropped
+
+
+def test_critical_path_skips_overlapping_parallel_branch():
+    def node(name, start, duration, children=()):
+        return {"name": name, "start_ms": start, "duration_ms": duration, "children": list(children)}
+
+    market = node("market", 10, 30)
+    news = node("news", 10, 80)
+    join = node("join", 95, 1)
+    root = node("request", 0, 100, [node("classify", 0, 9), market, news, join])
+
+    marked = {n["name"] for n in [*root["children"], root] if id(n) in critical_path(root)}
+
+    assert marked == {"request", "classify", "news", "join"}
+
+
+@pytest.mark.asyncio
+async def test_chat_records_waterfall_for_parallel_analytics():
+    from app.agent.graph import build_graph
+    from app.llm.pool import LLMPool, PoolMember
+
+    client = MagicMock()
+    client.ainvoke = AsyncMock(
+        side_effect=[
+            AIMessage(
+                content='{"intent": "analytics", "coin": "bitcoin"}',
+                usage_metadata={
+                    "input_tokens": 120,
+                    "output_tokens": 10,
+                    "total_tokens": 130,
+                    "input_token_details": {"cache_read": 100},
+                },
+            ),
+            AIMessage(content="no"),
+            AIMessage(content="Аналитика по BTC"),
+        ]
+    )
+
+    def pool(role):
+        return LLMPool([PoolMember(name="m#0", llm=client)], name=role)
+
+    async def market(_coin):
+        await asyncio.sleep(0.01)
+        return {"price_usd": 1.0}
+
+    async def slow_news(_coin, max_results=3):
+        await asyncio.sleep(0.05)
+        return []
+
+    original_graph = main_module.agent_graph
+    try:
+        with (
+            patch("app.main.require_gigachat_credentials"),
+            patch("app.agent.router.get_llm", side_effect=pool),
+            patch("app.agent.nodes.get_llm", side_effect=pool),
+            patch("app.agent.nodes.get_market_data", side_effect=market),
+            patch("app.agent.nodes.get_crypto_news", side_effect=slow_news),
+        ):
+            main_module.agent_graph = build_graph()
+            transport = ASGITransport(app=main_module.app)
+            async with AsyncClient(transport=transport, base_url="http://test") as http:
+                chat = await http.post(
+                    "/chat", json={"message": "Стоит ли покупать BTC?", "thread_id": "trace-1"}
+                )
+                as_json = await http.get("/debug/traces/trace-1", params={"format": "json"})
+                as_text = await http.get("/debug/traces/trace-1")
+                missing = await http.get("/debug/traces/unknown")
+    finally:
+        main_module.agent_graph = original_graph
+
+    assert chat.status_code == 200
+    [trace] = as_json.json()
+    root = trace["root"]
+    assert root["attrs"]["intent"] == "analytics"
+    assert root["attrs"]["status"] == 200
+
+    classify = _find(root, "node", "classify_intent")
+    assert _find(classify, "queue", "llm_queue")["attrs"] == {"priority": "CLASSIFY"}
+    assert _find(classify, "llm", "classify")["attrs"]["cached_tokens"] == 100
+
+    market_node = _find(root, "node", "analytics_market")
+    news_node = _find(root, "node", "analytics_news")
+    assert market_node in root["children"] and news_node in root["children"]
+    assert market_node["start_ms"] < news_node["start_ms"] + news_node["duration_ms"]
+    assert _find(news_node, "upstream", "newsapi:/v2/everything")["duration_ms"] >= 40
+
+    assert as_text.status_code == 200
+    lines = as_text.text.splitlines()
+    assert lines[0].startswith("trace ")
+    assert any(line.startswith("*") and "node:analytics_news" in line for line in lines)
+    assert any(line.startswith(" ") and "node:analytics_market" in line for line in lines)
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_trace_disabled_records_nothing(monkeypatch):
+    monkeypatch.setenv("TRACE_ENABLED", "false")
+
+    with trace_request("thread-off") as root:
+        with span("get_price", "node"):
+            pass
+
+    assert root is NULL_SPAN
+    assert len(get_trace_store()) == 0